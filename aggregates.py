@@ -0,0 +1,120 @@
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+# Agrégats pré-calculés des résultats pour le dashboard.
+# Pour chaque niveau (ticker, secteur) et chaque granularité (jour, semaine, mois), une table
+# `agg_<niveau>_<granularité>` contient par clé et par période le nombre d'observations, les sommes,
+# les sommes des carrés et des produits croisés de Return, Volatility et Delta_ESTR.
+# Ces sommes sont additives : moyennes et corrélations d'une sélection quelconque (tickers, secteurs,
+# dates) s'obtiennent exactement en sommant les lignes retenues, sans relire les résultats détaillés.
+
+GRANULARITIES = {"daily": "D", "weekly": "W", "monthly": "M"}
+GRANULARITY_DAYS = {"daily": 1, "weekly": 7, "monthly": 30}
+LEVELS = {"ticker": "Ticker", "sector": "Sector"}
+AGGREGATED_COLUMNS = ["Return", "Volatility", "Delta_ESTR"]
+
+
+def table_name(level: str, granularity: str) -> str:
+    return f"agg_{level}_{granularity}"
+
+
+def table_indexes() -> Dict[str, List[List[str]]]:
+    """
+    Index SQLite des tables d'agrégats : (clé, Date).
+    """
+    return {
+        table_name(level, granularity): [[key, "Date"]]
+        for level, key in LEVELS.items()
+        for granularity in GRANULARITIES
+    }
+
+
+def _sum_columns() -> List[str]:
+    cols = AGGREGATED_COLUMNS
+    return [f"Sum_{a}" for a in cols] + [
+        f"Sum_{a}_{b}" for i, a in enumerate(cols) for b in cols[i:]
+    ]
+
+
+def build_aggregates(results: pd.DataFrame, level: str, granularity: str) -> pd.DataFrame:
+    """
+    Agrège les résultats par clé (Ticker ou Sector) et par période (début de période dans `Date`).
+    Seules les lignes où Return, Volatility et Delta_ESTR sont renseignés sont comptées.
+    Colonnes : clé, Date, N, moyennes (Return, Volatility, Delta_ESTR), sommes et produits croisés.
+    """
+    key = LEVELS[level]
+    df = results[[key, "Date"] + AGGREGATED_COLUMNS].dropna(subset=AGGREGATED_COLUMNS)
+    period = pd.to_datetime(df["Date"]).dt.to_period(GRANULARITIES[granularity]).dt.start_time
+
+    values = df[AGGREGATED_COLUMNS].to_numpy(dtype=float)
+    products = {f"Sum_{a}": values[:, i] for i, a in enumerate(AGGREGATED_COLUMNS)}
+    for i, a in enumerate(AGGREGATED_COLUMNS):
+        for j in range(i, len(AGGREGATED_COLUMNS)):
+            products[f"Sum_{a}_{AGGREGATED_COLUMNS[j]}"] = values[:, i] * values[:, j]
+
+    frame = pd.DataFrame(products, index=df.index)
+    frame.insert(0, "N", 1)
+    grouped = frame.groupby([df[key].astype(str).to_numpy(), period.to_numpy()], sort=True).sum()
+    grouped.index.names = [key, "Date"]
+    grouped = grouped.reset_index()
+
+    for col in AGGREGATED_COLUMNS:
+        grouped.insert(grouped.columns.get_loc("N") + 1 + AGGREGATED_COLUMNS.index(col), col,
+                       grouped[f"Sum_{col}"] / grouped["N"])
+    return grouped
+
+
+def build_all_aggregates(results: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+    """
+    Toutes les tables d'agrégats (niveaux × granularités), indexées par nom de table.
+    """
+    return {
+        table_name(level, granularity): build_aggregates(results, level, granularity)
+        for level in LEVELS
+        for granularity in GRANULARITIES
+    }
+
+
+def choose_granularity(start, end, max_points: int) -> str:
+    """
+    Granularité la plus fine dont le nombre de périodes sur [start, end] ne dépasse pas `max_points`.
+    """
+    days = (pd.Timestamp(end) - pd.Timestamp(start)).days + 1
+    for granularity, period_days in GRANULARITY_DAYS.items():
+        if days / period_days <= max_points:
+            return granularity
+    return "monthly"
+
+
+def combine(aggregates: pd.DataFrame, by: List[str]) -> pd.DataFrame:
+    """
+    Regroupe des lignes d'agrégats (ex. plusieurs secteurs d'une même période) en sommant
+    les compteurs et les sommes, puis recalcule les moyennes.
+    """
+    sums = aggregates.groupby(by, observed=True, sort=True)[["N"] + _sum_columns()].sum()
+    for col in AGGREGATED_COLUMNS:
+        sums[col] = sums[f"Sum_{col}"] / sums["N"]
+    return sums
+
+
+def correlation_from_sums(aggregates: pd.DataFrame) -> pd.DataFrame:
+    """
+    Matrice de corrélation (Pearson) de Return, Volatility et Delta_ESTR sur toutes les
+    observations couvertes par les lignes d'agrégats, à partir des sommes et produits croisés.
+    """
+    n = aggregates["N"].sum()
+    cols = AGGREGATED_COLUMNS
+    sums = np.array([aggregates[f"Sum_{a}"].sum() for a in cols])
+
+    cov = np.empty((len(cols), len(cols)))
+    for i, a in enumerate(cols):
+        for j in range(i, len(cols)):
+            cross = aggregates[f"Sum_{a}_{cols[j]}"].sum()
+            cov[i, j] = cov[j, i] = cross / n - sums[i] * sums[j] / n ** 2
+
+    std = np.sqrt(np.diag(cov))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        corr = cov / np.outer(std, std)
+    return pd.DataFrame(corr, index=cols, columns=cols)
@@ -0,0 +1,233 @@
+import argparse
+import copy
+import csv
+import json
+import os
+import time
+import tracemalloc
+from typing import Callable, Dict, List
+
+import numpy as np
+import pandas as pd
+
+from etl import Etl
+from helpers_serialize import get_serialized_data
+from instrumentation import export_run_log, new_run
+from model import Model
+from repository import Repository
+from view import View
+
+# Banc de mesure du pipeline ETL → Model → View sur des données synthétiques.
+# Aucune donnée n'est téléchargée : les fichiers d'entrée sont générés au format de
+# stock_data.csv / estr_clean.csv / companies.csv (séparateur ";") pour N tickers × M jours,
+# puis chaque étape est chronométrée (temps réel, temps CPU, pic mémoire, lignes produites).
+#
+# Exemple : python benchmark.py --tickers 10 100 --days 250 1250 --output bench
+
+SECTORS = ["Luxe", "Energie", "Banque", "Aeronautique", "Sante", "Telecom", "BTP", "Distribution"]
+
+
+def generate_synthetic_inputs(config: dict, input_dir: str, n_tickers: int, n_days: int, seed: int = 0) -> None:
+    """
+    Génère des fichiers d'entrée synthétiques (cours en marche aléatoire log-normale,
+    volumes, taux €STR, secteurs) dans `input_dir`, au même schéma que les fichiers réels.
+    """
+    os.makedirs(input_dir, exist_ok=True)
+    rng = np.random.default_rng(seed)
+
+    dates = pd.bdate_range("2020-10-01", periods=n_days)
+    tickers = [f"T{i:04d}.PA" for i in range(n_tickers)]
+
+    log_returns = rng.normal(0.0003, 0.015, size=(n_tickers, n_days))
+    prices = 100 * np.exp(np.cumsum(log_returns, axis=1))
+    df_stock = pd.DataFrame({
+        "Date": np.tile(dates.strftime("%Y-%m-%d"), n_tickers),
+        "Ticker": np.repeat(tickers, n_days),
+        "Adj Close": prices.ravel(),
+        "Volume": rng.integers(10_000, 5_000_000, size=n_tickers * n_days),
+    })
+    df_stock.to_csv(os.path.join(input_dir, config["files"]["stock_source_file"]), sep=";", index=False)
+
+    # €STR publié les jours ouvrés, avec quelques jours manquants
+    estr = -0.5 + np.cumsum(rng.normal(0, 0.002, size=n_days))
+    df_macro = pd.DataFrame({"Date": dates.strftime("%Y-%m-%d"), "Indicator": "estr", "Value": estr})
+    df_macro = df_macro.sample(frac=0.98, random_state=seed).sort_values("Date")
+    macro_sources = config["files"]["macro_source_file"]
+    macro_file = macro_sources if isinstance(macro_sources, str) else macro_sources[0]
+    df_macro.to_csv(os.path.join(input_dir, macro_file), sep=";", index=False)
+
+    df_companies = pd.DataFrame({"Ticker": tickers, "Sector": [SECTORS[i % len(SECTORS)] for i in range(n_tickers)]})
+    df_companies.to_csv(os.path.join(input_dir, config["files"]["static_companies_file"]), sep=";", index=False)
+
+
+class StageTimer:
+    """
+    Chronomètre les étapes du pipeline et accumule une ligne de mesures par étape.
+    """
+    def __init__(self, trace_memory: bool = True):
+        self.trace_memory = trace_memory
+        self.records: List[Dict] = []
+
+    def run(self, stage: str, func: Callable, rows: Callable = None, **labels) -> None:
+        """
+        Exécute `func` et enregistre le temps réel, le temps CPU, le pic mémoire Python
+        de l'étape et le nombre de lignes produites (`rows()` après exécution).
+        """
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+        wall, cpu = time.perf_counter(), time.process_time()
+
+        func()
+
+        record = dict(labels)
+        record.update({
+            "stage": stage,
+            "wall_s": round(time.perf_counter() - wall, 4),
+            "cpu_s": round(time.process_time() - cpu, 4),
+            "peak_mb": round(tracemalloc.get_traced_memory()[1] / 1e6, 2) if self.trace_memory else None,
+            "rows": rows() if rows else None,
+        })
+        self.records.append(record)
+        print(f"  {stage:<22} {record['wall_s']:>8.3f} s  peak={record['peak_mb']} Mo  rows={record['rows']}")
+
+
+def compare_engines(config: dict, repo: Repository) -> Dict[str, float]:
+    """
+    Compare les indicateurs calculés par les moteurs pandas et NumPy (écart absolu maximal).
+    """
+    results = {}
+    for engine in ["pandas", "numpy"]:
+        engine_config = copy.deepcopy(config)
+        engine_config["model_parameters"]["engine"] = engine
+        model = Model(engine_config, repo)
+        model.join()
+        model._compute_indicators()
+        results[engine] = model.results
+
+    return {
+        f"max_abs_diff_{col}": float(np.nanmax(np.abs(results["pandas"][col].to_numpy() - results["numpy"][col].to_numpy())))
+        for col in ["Return", "Delta_ESTR", "Volatility"]
+    }
+
+
+def compare_regressions(model: Model, n_samples: int = 20, seed: int = 0) -> Dict[str, float]:
+    """
+    Vérifie les régressions glissantes par ticker contre statsmodels sur un échantillon
+    de fenêtres tirées au hasard (écart absolu maximal sur les coefficients, t-stats et R²).
+    """
+    import statsmodels.api as sm
+
+    regressors = model.config["model_parameters"]["regression_regressors"]
+    df = model.results.dropna(subset=["Return"] + regressors).sort_values(by=["Ticker", "Date"], kind="stable")
+    rng = np.random.default_rng(seed)
+    diffs = {"coef": 0.0, "tstat": 0.0, "r_squared": 0.0}
+
+    for window in model.config["model_parameters"]["regression_windows"]:
+        rolling = model.sheets_pivots[f"rolling_regression_{window}"]
+        for i in rng.choice(len(rolling), size=min(n_samples, len(rolling)), replace=False):
+            row = rolling.iloc[i]
+            sample = df[(df["Ticker"] == row["Ticker"]) & (df["Date"] <= row["Date"])].tail(window)
+            fit = sm.OLS(sample["Return"].astype(float), sm.add_constant(sample[regressors].astype(float))).fit()
+            labels = ["const"] + regressors
+            diffs["coef"] = max(diffs["coef"], max(abs(row[f"Beta_{v}"] - fit.params[v]) for v in labels))
+            diffs["tstat"] = max(diffs["tstat"], max(abs(row[f"T-stat_{v}"] - fit.tvalues[v]) for v in labels))
+            diffs["r_squared"] = max(diffs["r_squared"], abs(row["R-squared"] - fit.rsquared))
+
+    return {f"max_abs_diff_ols_{name}": float(value) for name, value in diffs.items()}
+
+
+def run_benchmark(config: dict, work_dir: str, n_tickers: int, n_days: int, trace_memory: bool = True) -> Dict:
+    """
+    Génère un jeu synthétique N tickers × M jours dans `work_dir` puis exécute et mesure
+    chaque étape du pipeline. Retourne les mesures par étape et la comparaison des moteurs.
+    """
+    config = copy.deepcopy(config)
+    input_dir = os.path.join(work_dir, "input")
+    output_dir = os.path.join(work_dir, "output")
+    config["file_parameters"]["input_dir"] = input_dir
+    config["file_parameters"]["output_dir"] = output_dir
+    os.makedirs(output_dir, exist_ok=True)
+
+    version = config["file_parameters"]["version"]
+    excel_path = os.path.join(output_dir, config["file_parameters"]["output_file_excel"].format(version))
+    sqlite_path = os.path.join(output_dir, config["file_parameters"]["output_file_sqlite"].format(version))
+    final_path = os.path.join(output_dir, config["file_parameters"]["output_file_excel_final"].format(version))
+    parquet_path = os.path.join(output_dir, config["file_parameters"]["output_dir_parquet"].format(version))
+
+    print(f"Benchmark {n_tickers} tickers × {n_days} jours")
+    generate_synthetic_inputs(config, input_dir, n_tickers, n_days)
+
+    new_run()
+    timer = StageTimer(trace_memory)
+    labels = {"n_tickers": n_tickers, "n_days": n_days}
+
+    etl = Etl(config, input_dir, excel_path, sqlite_path, parquet_path)
+    timer.run("etl.extract", etl.extract, lambda: len(etl.df_stock_raw), **labels)
+    timer.run("etl.transform", etl.transform, lambda: etl.n_stock_rows, **labels)
+    timer.run("etl.validate", etl.validate, lambda: etl.n_stock_rows, **labels)
+    timer.run("etl.load", etl.load, lambda: etl.n_stock_rows, **labels)
+    timer.run("etl.sanity_check", etl.sanity_check, **labels)
+
+    repo = Repository(config, sqlite_path, parquet_path)
+    timer.run("repository.get_data", repo.get_data, lambda: len(repo.stock_data), **labels)
+
+    model = Model(config, repo)
+    timer.run("model.join", model.join, lambda: len(model.results), **labels)
+    timer.run("model.compute", model.compute, lambda: len(model.results), **labels)
+    timer.run("model.process_pivots", model.process_pivots, lambda: len(model.sheets_pivots), **labels)
+
+    view = View(config, repo, model, final_path)
+    timer.run("view.export", view.export, **labels)
+
+    export_run_log(os.path.join(output_dir, config["file_parameters"]["run_log"]))
+    repo.get_data()
+    checks = dict(labels, **compare_regressions(model))
+    checks.update(compare_engines(config, repo))
+    return {"stages": timer.records, "engines": checks}
+
+
+def write_report(reports: List[Dict], output_dir: str) -> None:
+    """
+    Écrit le rapport de benchmark en JSON (mesures complètes) et en CSV (une ligne par étape).
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    json_path = os.path.join(output_dir, "benchmark_report.json")
+    csv_path = os.path.join(output_dir, "benchmark_report.csv")
+
+    with open(json_path, mode="w") as file:
+        json.dump(reports, file, indent=4)
+
+    stages = [record for report in reports for record in report["stages"]]
+    with open(csv_path, mode="w", newline="") as file:
+        writer = csv.DictWriter(file, fieldnames=list(stages[0].keys()), delimiter=";")
+        writer.writeheader()
+        writer.writerows(stages)
+
+    print(f"Rapport de benchmark : {json_path}, {csv_path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark du pipeline ETL → Model → View sur données synthétiques")
+    parser.add_argument("--config", default="config.yaml", help="fichier de configuration de référence")
+    parser.add_argument("--tickers", type=int, nargs="+", default=[10, 50], help="nombres de tickers à tester")
+    parser.add_argument("--days", type=int, nargs="+", default=[250, 1250], help="nombres de jours à tester")
+    parser.add_argument("--output", default="benchmark", help="répertoire de travail et des rapports")
+    parser.add_argument("--no-memory", action="store_true", help="désactive la mesure du pic mémoire (tracemalloc)")
+    args = parser.parse_args()
+
+    config = get_serialized_data(args.config)
+    trace_memory = not args.no_memory
+    if trace_memory:
+        tracemalloc.start()
+
+    reports = []
+    for n_tickers in args.tickers:
+        for n_days in args.days:
+            work_dir = os.path.abspath(os.path.join(args.output, f"{n_tickers}x{n_days}"))
+            reports.append(run_benchmark(config, work_dir, n_tickers, n_days, trace_memory))
+
+    write_report(reports, args.output)
+
+
+if __name__ == "__main__":
+    main()
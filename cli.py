@@ -0,0 +1,120 @@
+import time
+
+_STARTED = time.perf_counter()
+
+import argparse
+import os
+import subprocess
+import sys
+from typing import List, Optional
+
+# Ligne de commande du pipeline, sans interface Streamlit (tâches planifiées, cron).
+# Seuls les modules nécessaires aux étapes demandées sont chargés ; le temps de démarrage
+# (imports + lecture de la configuration) est mesuré et enregistré dans le journal d'exécution.
+#
+# Exemples :
+#   python cli.py run --stages etl,model,export --config config.yaml
+#   python cli.py run --stages etl
+#   python cli.py run --force         (exécute aussi les étapes dont les sorties sont à jour)
+#   python cli.py sweep --variants sweep.yaml --workers 4
+#   python cli.py dashboard
+
+DASHBOARD_ENTRY_POINT = "main.py"
+HEAVY_MODULES = ["streamlit", "matplotlib", "seaborn", "statsmodels", "openpyxl", "xlsxwriter"]
+
+
+def loaded_heavy_modules() -> List[str]:
+    """
+    Bibliothèques lourdes déjà importées dans le processus.
+    """
+    return [name for name in HEAVY_MODULES if name in sys.modules]
+
+
+def run(config_path: str, stages: Optional[List[str]], force: bool = False) -> int:
+    """
+    Exécute les étapes demandées du pipeline (toutes celles de `run_mode` si `stages` est None).
+    Retourne le code de sortie du processus (2 si une étape demandée est inconnue).
+    """
+    from instrumentation import measure, new_run
+
+    new_run()
+    with measure("cli.startup") as record:
+        from helpers_serialize import get_serialized_data
+        from pipeline import resolve_stages, run_pipeline
+
+        config = get_serialized_data(config_path)
+        if stages is not None:
+            try:
+                stages = resolve_stages(stages)
+            except ValueError as error:
+                print(error)
+                return 2
+    startup = time.perf_counter() - _STARTED
+    record["wall_s"] = round(startup, 4)
+    print(f"Démarrage : {startup:.2f} s (modules lourds chargés : {', '.join(loaded_heavy_modules()) or 'aucun'})")
+
+    run_pipeline(config, stages, start_run=False, force=force)
+    print(f"Modules lourds chargés en fin d'exécution : {', '.join(loaded_heavy_modules()) or 'aucun'}")
+    return 0
+
+
+def sweep(config_path: str, variants_path: Optional[str], workers: Optional[int]) -> int:
+    """
+    Balayage de paramètres (sweep.py) : variantes de `sweep_parameters`, ou du fichier `variants_path`
+    (clés `grid` et / ou `variants`). Retourne 2 si une variante référence un paramètre inconnu.
+    """
+    from instrumentation import new_run
+    from helpers_serialize import get_serialized_data
+    from sweep import run_sweep
+
+    new_run()
+    config = get_serialized_data(config_path)
+    params = get_serialized_data(variants_path) if variants_path else None
+    try:
+        run_sweep(config, params, workers)
+    except ValueError as error:
+        print(error)
+        return 2
+    return 0
+
+
+def dashboard() -> int:
+    """
+    Lance le dashboard Streamlit dans un sous-processus et retourne son code de sortie.
+    """
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), DASHBOARD_ENTRY_POINT)
+    return subprocess.run([sys.executable, "-m", "streamlit", "run", path]).returncode
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Pipeline ETL finance (ETL → Model → Export)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="exécute le pipeline sans interface")
+    run_parser.add_argument("--stages", type=lambda value: [s.strip() for s in value.split(",") if s.strip()],
+                            default=None, help="étapes séparées par des virgules : etl,model,export "
+                                               "(par défaut selon run_mode)")
+    run_parser.add_argument("--config", default="config.yaml", help="fichier de configuration")
+    run_parser.add_argument("--force", action="store_true", help="exécute aussi les étapes à jour")
+
+    sweep_parser = commands.add_parser("sweep", help="évalue des variantes de configuration sur un seul chargement")
+    sweep_parser.add_argument("--config", default="config.yaml", help="fichier de configuration")
+    sweep_parser.add_argument("--variants", default=None, help="fichier des variantes (grid / variants), "
+                                                               "par défaut sweep_parameters")
+    sweep_parser.add_argument("--workers", type=int, default=None, help="processus de calcul")
+
+    commands.add_parser("dashboard", help="lance le dashboard Streamlit")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    if args.command == "dashboard":
+        return dashboard()
+    if args.command == "sweep":
+        return sweep(args.config, args.variants, args.workers)
+    return run(args.config, args.stages, args.force)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
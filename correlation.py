@@ -0,0 +1,135 @@
+import json
+import os
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+from helpers_numeric import rolling_cov_corr
+
+# Corrélations et covariances glissantes entre tickers (et entre secteurs).
+# Les rendements sont pivotés une seule fois en une matrice dates × tickers, puis les matrices
+# glissantes de toutes les paires sont calculées par sommes incrémentales de produits croisés
+# (helpers_numeric.rolling_cov_corr) et conservées en tableaux 3-D float32 (dates × séries × séries).
+# Les tableaux peuvent être enregistrés en .npy et relus en mémoire mappée : seules les dates
+# ou paires consultées sont lues sur disque.
+
+MATRICES = ["cov", "corr"]
+
+
+def returns_matrix(results: pd.DataFrame, key: str = "Ticker", value: str = "Return") -> pd.DataFrame:
+    """
+    Pivote une colonne des résultats en matrice dates × clés (NaN si la clé n'a pas de cotation à la date).
+    """
+    date_codes, dates = pd.factorize(results["Date"], sort=True)
+    key_codes, keys = pd.factorize(results[key].astype(str), sort=True)
+    matrix = np.full((len(dates), len(keys)), np.nan)
+    matrix[date_codes, key_codes] = results[value].to_numpy(dtype=float)
+    return pd.DataFrame(matrix, index=pd.DatetimeIndex(dates, name="Date"), columns=pd.Index(keys, name=key))
+
+
+def sector_returns_matrix(returns: pd.DataFrame, sectors: pd.Series) -> pd.DataFrame:
+    """
+    Rendement équipondéré de chaque secteur (moyenne des tickers cotés à la date).
+    :param sectors: secteur de chaque ticker, indexé par ticker
+    """
+    sector_of = sectors.reindex(returns.columns).astype(str).to_numpy()
+    values = returns.to_numpy()
+    valid = ~np.isnan(values)
+
+    columns = {}
+    for name in np.unique(sector_of):
+        members = sector_of == name
+        count = valid[:, members].sum(axis=1)
+        total = np.where(valid[:, members], values[:, members], 0.0).sum(axis=1)
+        columns[name] = np.where(count > 0, total / np.maximum(count, 1), np.nan)
+    return pd.DataFrame(columns, index=returns.index).rename_axis(columns="Sector")
+
+
+class RollingMatrices:
+    """
+    Matrices glissantes (covariance et / ou corrélation) indexées par date et par série.
+    `matrices[name][i]` est la matrice à la i-ème date de `dates`.
+    """
+    def __init__(self, dates: pd.DatetimeIndex, labels: List[str], window: int, matrices: dict):
+        self.dates = pd.DatetimeIndex(dates)
+        self.labels = list(labels)
+        self.window = window
+        self.matrices = matrices
+
+    @classmethod
+    def compute(cls, series: pd.DataFrame, window: int, min_periods: int = None,
+                names: List[str] = None) -> "RollingMatrices":
+        """
+        Calcule les matrices glissantes de toutes les paires de colonnes de `series` (dates × séries).
+        """
+        cov, corr = rolling_cov_corr(series.to_numpy(dtype=float), window, min_periods)
+        computed = {"cov": cov, "corr": corr}
+        return cls(series.index, series.columns.astype(str), window,
+                   {name: computed[name] for name in (names or MATRICES)})
+
+    def at(self, date, name: str = "corr") -> pd.DataFrame:
+        """
+        Matrice à la dernière date disponible inférieure ou égale à `date`.
+        """
+        position = self.dates.searchsorted(pd.Timestamp(date), side="right") - 1
+        if position < 0:
+            raise KeyError(f"Aucune matrice avant le {date}")
+        return pd.DataFrame(np.asarray(self.matrices[name][position], dtype=float),
+                            index=self.labels, columns=self.labels)
+
+    def pair(self, first: str, second: str, name: str = "corr") -> pd.Series:
+        """
+        Série temporelle de la corrélation (ou covariance) d'une paire.
+        """
+        i, j = self.labels.index(first), self.labels.index(second)
+        return pd.Series(np.asarray(self.matrices[name][:, i, j], dtype=float), index=self.dates,
+                         name=f"{first} / {second}")
+
+    def pairs_frame(self, name: str = "corr", key: str = "Series") -> pd.DataFrame:
+        """
+        Format long (Date, <key>_1, <key>_2, valeur) des paires distinctes, dates complètes uniquement.
+        Destiné aux petites matrices (secteurs) : le volume est dates × k(k-1)/2 lignes.
+        """
+        i, j = np.triu_indices(len(self.labels), k=1)
+        values = np.asarray(self.matrices[name][:, i, j], dtype=float)
+        labels = np.array(self.labels)
+        frame = pd.DataFrame({
+            "Date": np.repeat(self.dates.to_numpy(), len(i)),
+            f"{key}_1": np.tile(labels[i], len(self.dates)),
+            f"{key}_2": np.tile(labels[j], len(self.dates)),
+            name.capitalize(): values.ravel(),
+        })
+        return frame.dropna().reset_index(drop=True)
+
+    def save(self, path: str) -> None:
+        """
+        Enregistre chaque matrice en .npy et les dates / libellés en JSON dans le répertoire `path`.
+        """
+        os.makedirs(path, exist_ok=True)
+        for name in MATRICES:
+            file_path = os.path.join(path, f"{name}.npy")
+            if name in self.matrices:
+                np.save(file_path, self.matrices[name])
+            elif os.path.exists(file_path):
+                os.remove(file_path)
+        with open(os.path.join(path, "index.json"), mode="w", encoding="utf-8") as file:
+            json.dump({
+                "dates": self.dates.strftime("%Y-%m-%d").tolist(),
+                "labels": self.labels,
+                "window": self.window,
+            }, file)
+
+    @classmethod
+    def load(cls, path: str, mmap_mode: str = "r") -> "RollingMatrices":
+        """
+        Relit des matrices enregistrées par `save`, en mémoire mappée par défaut.
+        """
+        with open(os.path.join(path, "index.json"), mode="r", encoding="utf-8") as file:
+            index = json.load(file)
+        matrices = {
+            name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mmap_mode)
+            for name in MATRICES
+            if os.path.exists(os.path.join(path, f"{name}.npy"))
+        }
+        return cls(pd.to_datetime(index["dates"]), index["labels"], index["window"], matrices)
@@ -1,37 +1,71 @@
 import os
+from typing import Iterator
+
+import numpy as np
 import pandas as pd
-import yaml
-from helpers_export import dataframes_to_excel, dataframes_to_db
+
+from instrumentation import instrument, measure
+from helpers_export import (
+    create_db_indexes, dataframes_to_excel, dataframes_to_db, dataframes_to_parquet, read_db_table,
+    upsert_dataframe_to_db,
+)
+from quality import QUARANTINE_COLUMNS, QUARANTINE_TABLE, superseded_keys, validate_macro, validate_stock
+
+# Table SQLite mémorisant, pour chaque ticker / indicateur, la dernière date chargée
+ETL_STATE_TABLE = "_etl_state"
+ETL_STATE_COLUMNS = ["Source", "Key", "Last_Date"]
 
 
 def enforce_dtypes(df, dtypes: dict) -> pd.DataFrame:
 # Fonction utilitaire pour le typage des colonnes
 # Cette fonction applique un type explicite à chaque colonne d’un DataFrame
 # en se basant sur un dictionnaire {nom_colonne: type_attendu}.
-# Elle permet d’assurer la cohérence des types (float, int, datetime, str)
+# Elle permet d’assurer la cohérence des types (float, int, datetime, str, category)
 # avant d’enregistrer les données (par ex. dans une base SQLite ou un fichier Excel).
- # Les valeurs non conformes sont converties automatiquement ou remplacées par NaN (avec errors="coerce").
+# Les types sont choisis compacts en mémoire :
+#   → "category" pour les colonnes répétitives (Ticker, Sector, Indicator)
+#   → "int" en int64 (largeur fixe : les blocs et les fichiers Parquet gardent le même schéma),
+#     "int32" explicite pour réduire la mémoire, "Int64" si valeurs manquantes
+#   → "float32" accepté lorsque 7 chiffres significatifs suffisent, "float" reste en float64
+#   → dates en datetime64 natif (jamais en objets date Python)
+# Les valeurs non conformes sont converties automatiquement ou remplacées par NaN (avec errors="coerce").
 
     for col, dtype in dtypes.items():
         if col not in df.columns:
             continue
         if dtype.startswith("datetime"):
             df[col] = pd.to_datetime(df[col], errors="coerce")
+        elif dtype == "float32":
+            df[col] = pd.to_numeric(df[col], errors="coerce").astype("float32")
         elif dtype.startswith("float"):
-            df[col] = pd.to_numeric(df[col], errors="coerce")
+            df[col] = pd.to_numeric(df[col], errors="coerce").astype("float64")
         elif dtype.startswith("int"):
-            df[col] = pd.to_numeric(df[col], errors="coerce").astype("Int64")
+            values = pd.to_numeric(df[col], errors="coerce")
+            if values.isna().any():
+                df[col] = values.astype("Int64")
+            else:
+                df[col] = values.astype("int64" if dtype == "int" else dtype)
+        elif dtype == "category":
+            df[col] = df[col].astype("category")
         elif dtype.startswith("str"):
             df[col] = df[col].astype(str)
     return df
 
 
+def memory_usage_mb(df: pd.DataFrame) -> float:
+    """
+    Empreinte mémoire d'un DataFrame en Mo (chaînes comprises).
+    """
+    return df.memory_usage(deep=True).sum() / 1e6
+
+
 class Etl:
-    def __init__(self, config: dict, input_dir: str, excel_path: str, sqlite_path: str):
+    def __init__(self, config: dict, input_dir: str, excel_path: str, sqlite_path: str, parquet_path: str = None):
         self.config = config
         self.input_dir = input_dir
         self.excel_path = excel_path
         self.sqlite_path = sqlite_path
+        self.parquet_path = parquet_path
 
         self.df_stock_raw = pd.DataFrame()
         self.df_stock = pd.DataFrame()
@@ -39,61 +73,436 @@ class Etl:
         self.df_macro = pd.DataFrame()
         self.df_companies_raw = pd.DataFrame()
         self.df_companies = pd.DataFrame()
+        self.etl_state = pd.DataFrame(columns=ETL_STATE_COLUMNS)
+        self.n_stock_rows = 0
+        self.memory_report = {}
+        self.quarantine = pd.DataFrame(columns=QUARANTINE_COLUMNS)
+        self.quality_counts = {}
+
+    def is_streaming(self) -> bool:
+        """
+        Mode streaming : le fichier stock est lu et chargé dans SQLite par blocs de `chunk_size` lignes.
+        """
+        params = self.config["etl_main_parameters"]
+        return bool(params["chunk_size"]) and (params["to_sqlite"] or params["to_parquet"])
+
+    def is_incremental(self) -> bool:
+        """
+        Mode incrémental : seules les dates postérieures au dernier chargement SQLite sont ingérées.
+        """
+        params = self.config["etl_main_parameters"]
+        return params["incremental"] and params["to_sqlite"]
 
+    def _db_dtypes(self) -> dict:
+        """
+        Types déclarés (`data_types`) des tables stock et macro, indexés par nom de table.
+        """
+        return {
+            self.config["files"]["stock_sheet_name"]: self.config["data_types"]["stock"],
+            self.config["files"]["macro_sheet_name"]: self.config["data_types"]["macro"],
+        }
+
+    def _upsert(self, df: pd.DataFrame, table_name: str, keys: list) -> None:
+        """
+        Upsert d'une table de données avec son schéma typé et ses index.
+        """
+        upsert_dataframe_to_db(
+            df,
+            self.sqlite_path,
+            table_name,
+            keys=keys,
+            dtypes=self._db_dtypes().get(table_name),
+            indexes=self.config["sqlite_indexes"].get(table_name),
+        )
+
+    def _keep_new_rows(self, df: pd.DataFrame, source: str, key_col: str) -> pd.DataFrame:
+        """
+        Ne conserve que les lignes postérieures à la dernière date chargée (high-water mark)
+        pour chaque valeur de `key_col` (ticker ou indicateur).
+        Les clés inconnues de l'état sont conservées intégralement.
+        """
+        state = self.etl_state[self.etl_state["Source"] == source]
+        if state.empty or df.empty:
+            return df
+
+        last_dates = pd.to_datetime(state.set_index("Key")["Last_Date"])
+        hwm = df[key_col].astype(str).map(last_dates)
+        dates = pd.to_datetime(df["Date"])
+        return df[hwm.isna() | (dates > hwm)]
+
+    def _update_state(self, df: pd.DataFrame, source: str, key_col: str) -> None:
+        """
+        Met à jour la table d'état avec la dernière date chargée par ticker / indicateur.
+        """
+        if df.empty or not self.config["etl_main_parameters"]["to_sqlite"]:
+            return
+
+        last = pd.to_datetime(df["Date"]).groupby(df[key_col].astype(str)).max()
+        state = pd.DataFrame({
+            "Source": source,
+            "Key": last.index,
+            "Last_Date": last.dt.strftime("%Y-%m-%d").values,
+        })
+        upsert_dataframe_to_db(state, self.sqlite_path, ETL_STATE_TABLE, keys=["Source", "Key"])
+
+    @instrument("etl.extract", rows_out=lambda self: len(self.df_stock_raw))
     def extract(self):
         """
         Extrait les fichiers CSV (stock, macro, companies) depuis le répertoire input.
+        En mode streaming, le fichier stock n'est pas lu ici mais bloc par bloc dans `load()`.
         """
-        stock_path = os.path.join(self.input_dir, self.config["files"]["stock_source_file"])
-        self.df_stock_raw = pd.read_csv(stock_path, sep=";")
+        if self.is_incremental():
+            state = read_db_table(self.sqlite_path, ETL_STATE_TABLE)
+            if state.empty:
+                # Base ou table d'état absente (premier run incrémental) : chargement complet
+                print(f"Mode incrémental : table {ETL_STATE_TABLE} absente ou vide, chargement complet.")
+                state = pd.DataFrame(columns=ETL_STATE_COLUMNS)
+            self.etl_state = state
 
-        macro_path = os.path.join(self.input_dir, self.config["files"]["macro_source_file"])
-        self.df_macro_raw = pd.read_csv(macro_path, sep=";")
+        if not self.is_streaming():
+            stock_path = os.path.join(self.input_dir, self.config["files"]["stock_source_file"])
+            self.df_stock_raw = self._keep_new_stock_rows(pd.read_csv(stock_path, sep=";"))
+
+        self.df_macro_raw = pd.concat(
+            [self._read_macro_source(path) for path in self.macro_source_paths()], ignore_index=True
+        )
 
         companies_path = os.path.join(self.input_dir, self.config["files"]["static_companies_file"])
         self.df_companies_raw = pd.read_csv(companies_path, sep=";")
 
+    def macro_source_paths(self) -> list:
+        """
+        Fichiers macro à charger : `macro_source_file` accepte un nom de fichier ou une liste.
+        """
+        sources = self.config["files"]["macro_source_file"]
+        sources = [sources] if isinstance(sources, str) else sources
+        return [os.path.join(self.input_dir, source) for source in sources]
+
+    @staticmethod
+    def _read_macro_source(path: str) -> pd.DataFrame:
+        """
+        Lit un fichier macro au format long (Date;Indicator;Value ou export BCE TIME_PERIOD / OBS_VALUE).
+        Sans colonne Indicator, le nom du fichier (sans extension) sert de nom d'indicateur.
+        """
+        df = pd.read_csv(path, sep=";")
+        df = df.rename(columns={"TIME_PERIOD": "Date", "OBS_VALUE": "Value"})
+        if "Indicator" not in df.columns:
+            df["Indicator"] = os.path.splitext(os.path.basename(path))[0]
+        return df[["Date", "Indicator", "Value"]]
+
+    def _keep_new_stock_rows(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        En mode incrémental, ne garde que les lignes stock postérieures au dernier chargement.
+        """
+        if not self.is_incremental():
+            return df
+        return self._keep_new_rows(df, self.config["files"]["stock_sheet_name"], "Ticker")
+
+    def iter_stock_chunks(self) -> Iterator[pd.DataFrame]:
+        """
+        Lit le fichier stock par blocs de `chunk_size` lignes et renvoie chaque bloc transformé.
+        Un seul bloc est présent en mémoire à la fois. Une première lecture des seules clés
+        (Ticker, Date) repère les lignes remplacées par une occurrence plus loin dans le fichier :
+        comme en lecture complète, c'est la dernière occurrence d'un doublon qui est chargée.
+        """
+        superseded = self._superseded_stock_rows()
+        offset = 0
+        for chunk in self._read_stock_chunks():
+            # Index = position dans le fichier, conservée par les filtres suivants
+            chunk.index = pd.RangeIndex(offset, offset + len(chunk))
+            offset += len(chunk)
+            df_stock = self.transform_stock(self._keep_new_stock_rows(chunk))
+            yield self._validate_stock(df_stock, superseded[df_stock.index.to_numpy()])
+
+    def _read_stock_chunks(self, **kwargs) -> Iterator[pd.DataFrame]:
+        stock_path = os.path.join(self.input_dir, self.config["files"]["stock_source_file"])
+        chunk_size = self.config["etl_main_parameters"]["chunk_size"]
+        return pd.read_csv(stock_path, sep=";", chunksize=chunk_size, **kwargs)
+
+    def _superseded_stock_rows(self) -> np.ndarray:
+        """
+        Masque, par position dans le fichier stock, des lignes dont la clé (Ticker, Date) réapparaît plus loin.
+        Seules les clés sont conservées (environ 12 octets par ligne).
+        """
+        ticker_codes, parts = {}, []
+        for chunk in self._read_stock_chunks(usecols=["Ticker", "Date"]):
+            local, uniques = pd.factorize(chunk["Ticker"].astype(str))
+            codes = np.array([ticker_codes.setdefault(t, len(ticker_codes)) for t in uniques], dtype=np.int32)
+            parts.append(pd.DataFrame({
+                "Ticker": codes[local],
+                "Date": pd.to_datetime(chunk["Date"], errors="coerce"),
+            }))
+        if not parts:
+            return np.zeros(0, dtype=bool)
+        keys = pd.concat(parts, ignore_index=True)
+        return superseded_keys(keys["Ticker"], keys["Date"])
+
+    def transform_stock(self, df_stock: pd.DataFrame) -> pd.DataFrame:
+        """
+        Transformation appliquée aux données boursières, sur le fichier complet
+        ou sur un bloc en mode streaming : typage selon `data_types.stock`.
+        """
+        return enforce_dtypes(df_stock, self.config["data_types"]["stock"])
+
+    @instrument("etl.transform", rows_in=lambda self: len(self.df_stock_raw), rows_out=lambda self: self.n_stock_rows)
     def transform(self):
         """
         Transforme les données brutes : copie les données financières,
-        nettoie et reformate les données macroéconomiques (estr).
+        nettoie et reformate les données macroéconomiques (un ou plusieurs indicateurs).
         """
-        self.df_stock = self.df_stock_raw.copy(deep=True)
-        self.df_companies = self.df_companies_raw.copy(deep=True)
+        self.df_stock = self.transform_stock(self.df_stock_raw.copy(deep=True))
+        self.n_stock_rows = len(self.df_stock)
+        self.df_companies = enforce_dtypes(self.df_companies_raw.copy(deep=True), self.config["data_types"]["companies"])
 
-        #   → renommage des colonnes
-        #   → conversion de la date au format sans heure
-        #   → ajout d'une colonne "Indicator" avec la valeur "estr"
+        #   → colonnes Date / Indicator / Value harmonisées à la lecture de chaque fichier source
+        #   → conversion de la date au format sans heure (datetime64 à minuit)
+        #   → typage selon `data_types.macro`
         # L’objectif est d’harmoniser les noms de colonnes et les types pour faciliter les jointures et l’analyse.
         df_macro = self.df_macro_raw.copy()
-        df_macro = df_macro.rename(columns={"TIME_PERIOD": "Date", "OBS_VALUE": "Value"})
-        df_macro["Date"] = pd.to_datetime(df_macro["Date"]).dt.date  # ← ici on retire l'heure
-        df_macro["Indicator"] = "estr"
-        self.df_macro = df_macro[["Date", "Indicator", "Value"]]
+        df_macro["Date"] = pd.to_datetime(df_macro["Date"]).dt.normalize()  # ← ici on retire l'heure
+        self.df_macro = enforce_dtypes(df_macro, self.config["data_types"]["macro"])
 
-    def load(self):
+        # Mémoire occupée avant / après typage, par jeu de données (hors mode streaming)
+        self.memory_report = {
+            name: (memory_usage_mb(raw), memory_usage_mb(typed))
+            for name, raw, typed in [
+                ("stock", self.df_stock_raw, self.df_stock),
+                ("macro", self.df_macro_raw, self.df_macro),
+                ("companies", self.df_companies_raw, self.df_companies),
+            ]
+            if not raw.empty
+        }
+
+        if self.is_incremental():
+            macro_table = self.config["files"]["macro_sheet_name"]
+            self.df_macro = self._keep_new_rows(self.df_macro, macro_table, "Indicator")
+
+    def validate(self):
         """
-        Exporte les données transformées vers un fichier Excel et une base SQLite,
-        selon les paramètres spécifiés dans la configuration.
+        Contrôles de qualité avant chargement (cf. quality.py) : doublons de clé, cours manquants
+        ou négatifs, volumes invalides, sauts de cours (z-score des rendements), trous de publication macro.
+        Les lignes rejetées sont retirées des données et, avec les lignes signalées, placées en quarantaine ;
+        le nombre de lignes par règle est ajouté au journal d'exécution (champ `quality`).
+        En mode streaming, les cours sont contrôlés bloc par bloc pendant le chargement.
         """
-        export = {
+        with measure("etl.validate", rows_in=self.n_stock_rows + len(self.df_macro)) as record:
+            params = self.config["quality_parameters"]
+            self.df_macro, quarantine, counts = validate_macro(self.df_macro, params["macro_max_gap_days"])
+            self._add_quality(quarantine, counts)
+            if not self.is_streaming():
+                self.df_stock = self._validate_stock(self.df_stock)
+                self.n_stock_rows = len(self.df_stock)
+
+            record["rows_out"] = self.n_stock_rows + len(self.df_macro)
+            record["quality"] = dict(self.quality_counts)
+        print(f"Contrôles qualité : {self.quality_counts}")
+
+    def _validate_stock(self, df_stock: pd.DataFrame, superseded: np.ndarray = None) -> pd.DataFrame:
+        df_stock, quarantine, counts = validate_stock(
+            df_stock, self.config["quality_parameters"]["return_z_threshold"], superseded
+        )
+        self._add_quality(quarantine, counts)
+        return df_stock
+
+    def _add_quality(self, quarantine: pd.DataFrame, counts: dict) -> None:
+        """
+        Cumule les lignes en quarantaine et les compteurs par règle (plusieurs jeux ou blocs).
+        """
+        if not quarantine.empty:
+            self.quarantine = quarantine if self.quarantine.empty else pd.concat([self.quarantine, quarantine],
+                                                                                 ignore_index=True)
+        for name, count in counts.items():
+            self.quality_counts[name] = self.quality_counts.get(name, 0) + count
+
+    def _write_quarantine(self, append_data: bool) -> None:
+        """
+        Écrit la table de quarantaine dans la base SQLite (remplacée lors d'un chargement complet,
+        complétée en mode incrémental ou streaming).
+        """
+        if not self.config["etl_main_parameters"]["to_sqlite"]:
+            return
+        if append_data and self.quarantine.empty:
+            return
+        dataframes_to_db(
+            {QUARANTINE_TABLE: self.quarantine},
+            db_path=self.sqlite_path,
+            append_data=append_data,
+            dtypes={QUARANTINE_TABLE: {"Date": "datetime64[ns]"}},
+        )
+        print(f"Quarantaine : {len(self.quarantine)} ligne(s) → table {QUARANTINE_TABLE}")
+
+    def is_split_load(self) -> bool:
+        """
+        Chargement complet : les exports Excel, SQLite et Parquet sont indépendants
+        et peuvent être exécutés séparément (cf. scheduler.py).
+        """
+        return not (self.is_streaming() or self.is_incremental())
+
+    def _export_tables(self) -> dict:
+        return {
             self.config["files"]["stock_sheet_name"]: self.df_stock,
             self.config["files"]["macro_sheet_name"]: self.df_macro,
             "companies": self.df_companies
         }
 
+    @instrument("etl.load", rows_in=lambda self: self.n_stock_rows, rows_out=lambda self: self.n_stock_rows)
+    def load(self):
+        """
+        Exporte les données transformées vers un fichier Excel et une base SQLite,
+        selon les paramètres spécifiés dans la configuration.
+        """
+        if self.is_streaming():
+            self._load_streaming()
+            return
+
+        if self.is_incremental():
+            self._load_incremental()
+            return
+
+        self.load_excel()
+        self.load_sqlite()
+        self.load_parquet()
+
+    @instrument("etl.load_excel", rows_in=lambda self: self.n_stock_rows)
+    def load_excel(self):
+        """
+        Snapshot Excel des données transformées (chargement complet uniquement).
+        """
         if self.config["etl_main_parameters"]["to_excel"]:
-            dataframes_to_excel(export, self.excel_path)
+            dataframes_to_excel(
+                self._export_tables(),
+                self.excel_path,
+                max_rows=self.config["export_parameters"]["excel_max_rows"],
+                oversized_format=self.config["export_parameters"]["oversized_format"],
+            )
             print(f"Export Excel : {self.excel_path}")
 
+    @instrument("etl.load_sqlite", rows_in=lambda self: self.n_stock_rows)
+    def load_sqlite(self):
+        """
+        Chargement complet de la base SQLite (tables, index, état incrémental, quarantaine).
+        """
         if self.config["etl_main_parameters"]["to_sqlite"]:
             dataframes_to_db(
-                export,
+                self._export_tables(),
                 db_path=self.sqlite_path,
                 drop_all_tables=self.config["etl_main_parameters"]["drop_all_tables"],
+                dtypes=self._db_dtypes(),
+                indexes=self.config["sqlite_indexes"],
             )
             print(f"Export SQLite : {self.sqlite_path}")
 
+            # L'état est initialisé pour qu'un prochain run incrémental reparte de ce chargement
+            self._update_state(self.df_stock, self.config["files"]["stock_sheet_name"], "Ticker")
+            self._update_state(self.df_macro, self.config["files"]["macro_sheet_name"], "Indicator")
+            self._write_quarantine(append_data=False)
+
+    @instrument("etl.load_parquet", rows_in=lambda self: self.n_stock_rows)
+    def load_parquet(self):
+        """
+        Export complet des datasets Parquet partitionnés.
+        """
+        if self.config["etl_main_parameters"]["to_parquet"]:
+            self._export_parquet(self._export_tables())
+            print(f"Export Parquet : {self.parquet_path}")
+
+    def _export_parquet(self, dataframes: dict, append_data: bool = False):
+        """
+        Exporte des tables au format Parquet (partitionnées selon `parquet_partitions`) si l'option est activée.
+        """
+        if self.config["etl_main_parameters"]["to_parquet"]:
+            dataframes_to_parquet(
+                dataframes,
+                self.parquet_path,
+                partition_cols=self.config["parquet_partitions"],
+                append_data=append_data,
+            )
+
+    def _load_incremental(self):
+        """
+        Chargement incrémental : les nouvelles lignes sont insérées (upsert sur la clé
+        (Ticker, Date) ou (Indicator, Date)) sans réécrire l'historique, puis l'état est mis à jour.
+        Le snapshot Excel n'est pas produit dans ce mode (il ne contiendrait que le delta).
+        """
+        stock_table = self.config["files"]["stock_sheet_name"]
+        macro_table = self.config["files"]["macro_sheet_name"]
+
+        self._upsert(self.df_stock, stock_table, keys=["Ticker", "Date"])
+        self._upsert(self.df_macro, macro_table, keys=["Indicator", "Date"])
+        dataframes_to_db({"companies": self.df_companies}, db_path=self.sqlite_path)
+
+        self._export_parquet({stock_table: self.df_stock, macro_table: self.df_macro}, append_data=True)
+        self._export_parquet({"companies": self.df_companies})
+
+        self._update_state(self.df_stock, stock_table, "Ticker")
+        self._update_state(self.df_macro, macro_table, "Indicator")
+        self._write_quarantine(append_data=True)
+        print(f"Export SQLite incrémental : {self.sqlite_path} "
+              f"(+{len(self.df_stock)} lignes stock, +{len(self.df_macro)} lignes macro)")
+
+    def _load_streaming(self):
+        """
+        Chargement par blocs : chaque bloc du fichier stock est transformé puis écrit
+        directement dans SQLite (ajout, ou upsert en mode incrémental) et / ou en Parquet.
+
+        Plafond mémoire : seuls les petits jeux macro / entreprises et un bloc stock sont
+        présents simultanément. Le pic est d'environ 3 × chunk_size × taille d'une ligne
+        (buffer du parseur CSV, bloc transformé, lot d'insertion), soit de l'ordre de
+        40 Mo pour 100 000 lignes au format de stock_data.csv, indépendamment de la taille du fichier.
+        Le snapshot Excel n'est pas produit dans ce mode (il nécessiterait tout le fichier en mémoire).
+        """
+        stock_table = self.config["files"]["stock_sheet_name"]
+        macro_table = self.config["files"]["macro_sheet_name"]
+        to_sqlite = self.config["etl_main_parameters"]["to_sqlite"]
+        incremental = self.is_incremental()
+
+        if incremental:
+            self._upsert(self.df_macro, macro_table, keys=["Indicator", "Date"])
+            dataframes_to_db({"companies": self.df_companies}, db_path=self.sqlite_path)
+        elif to_sqlite:
+            dataframes_to_db(
+                {macro_table: self.df_macro, "companies": self.df_companies},
+                db_path=self.sqlite_path,
+                drop_all_tables=self.config["etl_main_parameters"]["drop_all_tables"],
+                dtypes=self._db_dtypes(),
+                indexes=self.config["sqlite_indexes"],
+            )
+        self._export_parquet({macro_table: self.df_macro}, append_data=incremental)
+        self._export_parquet({"companies": self.df_companies})
+
+        # Dernière date par ticker de chaque bloc, pour mettre à jour l'état en fin de chargement
+        last_dates = []
+        self.n_stock_rows = 0
+        for i, chunk in enumerate(self.iter_stock_chunks()):
+            if incremental:
+                self._upsert(chunk, stock_table, keys=["Ticker", "Date"])
+            elif to_sqlite:
+                # Les index sont créés une seule fois, après le dernier bloc
+                dataframes_to_db(
+                    {stock_table: chunk},
+                    db_path=self.sqlite_path,
+                    append_data=i > 0,
+                    dtypes=self._db_dtypes(),
+                )
+            self._export_parquet({stock_table: chunk}, append_data=incremental or i > 0)
+
+            last_dates.append(chunk.groupby("Ticker", as_index=False)["Date"].max())
+            self.n_stock_rows += len(chunk)
+            self.df_stock = chunk.head(0)
+
+        if to_sqlite and not incremental:
+            create_db_indexes(self.sqlite_path, {stock_table: self.config["sqlite_indexes"].get(stock_table)})
+        if last_dates:
+            self._update_state(pd.concat(last_dates, ignore_index=True), stock_table, "Ticker")
+        self._update_state(self.df_macro, macro_table, "Indicator")
+        self._write_quarantine(append_data=incremental)
+
+        # Compteurs des contrôles faits bloc par bloc, ajoutés au journal d'exécution
+        with measure("etl.validate_chunks", rows_in=self.n_stock_rows) as record:
+            record["quality"] = {name: n for name, n in self.quality_counts.items() if name.startswith("stock.")}
+        print(f"Export par blocs : {self.n_stock_rows} lignes stock chargées")
+
+    @instrument("etl.sanity_check", rows_in=lambda self: self.n_stock_rows)
     def sanity_check(self):
         """
         Vérifie la cohérence des données transformées :
@@ -102,10 +511,17 @@ class Etl:
         - Exporte un rapport des types de colonnes dans un fichier Excel
         """
         print("**** Sanity check ****")
-        print(f"df_stock.shape = {self.df_stock.shape}")
+        print(f"df_stock.shape = {(self.n_stock_rows, self.df_stock.shape[1])}")
         print(f"df_macro.shape = {self.df_macro.shape}")
         print(f"df_companies.shape = {self.df_companies.shape}")
 
+        # Gain mémoire du typage (data_types) par rapport aux types par défaut de la lecture CSV
+        for name, (raw_mb, typed_mb) in self.memory_report.items():
+            saved = 100 * (1 - typed_mb / raw_mb) if raw_mb else 0.0
+            # Petites tables : le dictionnaire des catégories peut coûter plus que les chaînes qu'il remplace
+            gain = f"{saved:.0f} % économisés" if saved > 0 else "pas de gain"
+            print(f"Mémoire {name} : {raw_mb:.2f} Mo → {typed_mb:.2f} Mo ({gain})")
+
         # Vérification des types de colonnes
         report = {
             self.config["files"]["stock_sheet_name"]: self.df_stock.dtypes,
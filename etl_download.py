@@ -1,46 +1,244 @@
+import json
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
 import pandas as pd
-import yfinance as yf
-import requests
-import yaml
-from io import StringIO
-
-# Charger la config
-def load_config(path="config.yaml"):
-    with open(path, "r") as f:
-        return yaml.safe_load(f)
-
-config = load_config()
-
-# Paramètres
-tickers = ["MC.PA", "TTE.PA", "BNP.PA", "AIR.PA", "SAN.PA", "ORA.PA", "DG.PA", "CA.PA"]
-start = config["start_date"]
-end = config["end_date"]
-
-# Données actions CAC 40 via yfinance
-print("Téléchargement des données boursières...")
-df = yf.download(tickers, start=start, end=end, group_by="ticker", auto_adjust=True)
-
-all_data = []
-for ticker in tickers:
-    if ticker in df.columns.get_level_values(0):
-        df_ticker = df[ticker].copy()
-        df_ticker["Ticker"] = ticker
-        df_ticker = df_ticker.reset_index()[["Date", "Ticker", "Close", "Volume"]]
-        df_ticker.rename(columns={"Close": "Adj Close"}, inplace=True)
-        all_data.append(df_ticker)
-
-df_stock = pd.concat(all_data, ignore_index=True)
-df_stock.to_csv("input/stock_data.csv", index=False, sep=";")
-print(" Fichier stock_data.csv généré.")
-
-# Nettoyage du fichier estr brut et création d'un fichier clean
-estr_raw_path = "input/estr.csv"
-estr_clean_path = "input/estr_clean.csv"
-
-if os.path.exists(estr_raw_path):
-    print("Nettoyage des données macro (estr)...")
 
+from helpers_serialize import get_serialized_data
+
+# Téléchargement des données sources de l'ETL (cours des actions, €STR, secteurs).
+# Les cours sont mis en cache par ticker sur disque (un fichier Parquet par ticker) avec la
+# période déjà couverte : seules les plages de dates manquantes sont demandées à la source,
+# par lots de tickers traités en parallèle.
+#
+# La source est un "fetcher" interchangeable : fonction(tickers, start, end) → DataFrame
+# au schéma de stock_data.csv (Date, Ticker, Adj Close, Volume), `end` exclu.
+# Par défaut yfinance ; `csv_fetcher` permet de rejouer un fichier local (tests, hors ligne).
+#
+# Exemple : python etl_download.py
+
+STOCK_COLUMNS = ["Date", "Ticker", "Adj Close", "Volume"]
+COVERAGE_FILE = "coverage.json"
+
+# Mapping Ticker → Secteur utilisé pour créer companies.csv s'il n'existe pas encore
+DEFAULT_COMPANIES = [
+    {"Ticker": "MC.PA", "Sector": "Luxe"},
+    {"Ticker": "TTE.PA", "Sector": "Energie"},
+    {"Ticker": "BNP.PA", "Sector": "Banque"},
+    {"Ticker": "AIR.PA", "Sector": "Aeronautique"},
+    {"Ticker": "SAN.PA", "Sector": "Sante"},
+    {"Ticker": "ORA.PA", "Sector": "Telecom"},
+    {"Ticker": "DG.PA", "Sector": "BTP"},
+    {"Ticker": "CA.PA", "Sector": "Distribution"},
+]
+
+Fetcher = Callable[[List[str], pd.Timestamp, pd.Timestamp], pd.DataFrame]
+DateRange = Tuple[pd.Timestamp, pd.Timestamp]
+
+
+def yfinance_fetcher(tickers: List[str], start: pd.Timestamp, end: pd.Timestamp) -> pd.DataFrame:
+    """
+    Télécharge les cours ajustés et volumes via yfinance (un appel par lot de tickers).
+    """
+    import yfinance as yf
+
+    df = yf.download(tickers, start=start, end=end, group_by="ticker", auto_adjust=True, progress=False)
+
+    all_data = []
+    for ticker in tickers:
+        if ticker in df.columns.get_level_values(0):
+            df_ticker = df[ticker].copy()
+            df_ticker["Ticker"] = ticker
+            df_ticker = df_ticker.reset_index()[["Date", "Ticker", "Close", "Volume"]]
+            df_ticker.rename(columns={"Close": "Adj Close"}, inplace=True)
+            all_data.append(df_ticker.dropna(subset=["Adj Close"]))
+
+    if not all_data:
+        return pd.DataFrame(columns=STOCK_COLUMNS)
+    return pd.concat(all_data, ignore_index=True)
+
+
+def csv_fetcher(path: str, sep: str = ";") -> Fetcher:
+    """
+    Construit un fetcher qui lit un fichier local au format de stock_data.csv
+    (source de substitution pour les tests ou un poste sans accès réseau).
+    """
+    df_source = pd.read_csv(path, sep=sep, parse_dates=["Date"])
+
+    def fetch(tickers: List[str], start: pd.Timestamp, end: pd.Timestamp) -> pd.DataFrame:
+        mask = df_source["Ticker"].isin(tickers) & (df_source["Date"] >= start) & (df_source["Date"] < end)
+        return df_source.loc[mask, STOCK_COLUMNS].copy()
+
+    return fetch
+
+
+def read_tickers(config: dict, input_dir: str) -> List[str]:
+    """
+    Lit la liste des tickers dans le fichier des entreprises (companies.csv).
+    Le fichier est créé à partir de DEFAULT_COMPANIES s'il n'existe pas.
+    """
+    path = os.path.join(input_dir, config["files"]["static_companies_file"])
+    if not os.path.exists(path):
+        os.makedirs(input_dir, exist_ok=True)
+        pd.DataFrame(DEFAULT_COMPANIES).to_csv(path, index=False, sep=";")
+        print(f"Fichier {path} généré.")
+    return pd.read_csv(path, sep=";")["Ticker"].dropna().unique().tolist()
+
+
+class StockCache:
+    """
+    Cache disque des cours par ticker : un fichier Parquet par ticker et un fichier
+    coverage.json indiquant la période [start, end) déjà téléchargée pour chacun.
+    """
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+        self.coverage_path = os.path.join(cache_dir, COVERAGE_FILE)
+        self._lock = threading.Lock()
+        self._ticker_locks: Dict[str, threading.Lock] = {}
+        os.makedirs(cache_dir, exist_ok=True)
+
+        self.coverage: Dict[str, List[str]] = {}
+        if os.path.exists(self.coverage_path):
+            with open(self.coverage_path, mode="r", encoding="utf-8") as file:
+                self.coverage = json.load(file)
+
+    def _path(self, ticker: str) -> str:
+        return os.path.join(self.cache_dir, f"{ticker}.parquet")
+
+    def _ticker_lock(self, ticker: str) -> threading.Lock:
+        # Un même ticker peut figurer dans deux lots concurrents (plage de début et plage de fin)
+        with self._lock:
+            return self._ticker_locks.setdefault(ticker, threading.Lock())
+
+    def read(self, ticker: str) -> pd.DataFrame:
+        path = self._path(ticker)
+        if not os.path.exists(path):
+            return pd.DataFrame(columns=STOCK_COLUMNS)
+        return pd.read_parquet(path)
+
+    def missing_ranges(self, ticker: str, start: pd.Timestamp, end: pd.Timestamp) -> List[DateRange]:
+        """
+        Plages [start, end) non couvertes par le cache pour ce ticker.
+        """
+        if ticker not in self.coverage:
+            return [(start, end)]
+
+        covered_start, covered_end = (pd.Timestamp(d) for d in self.coverage[ticker])
+        ranges = []
+        if start < covered_start:
+            ranges.append((start, min(end, covered_start)))
+        if end > covered_end:
+            ranges.append((max(start, covered_end), end))
+        return ranges
+
+    def update(self, df_new: pd.DataFrame, tickers: List[str], start: pd.Timestamp, end: pd.Timestamp) -> None:
+        """
+        Fusionne les lignes téléchargées dans le cache de chaque ticker du lot
+        et étend sa période couverte à [start, end). Un ticker pour lequel la source
+        n'a renvoyé aucune ligne n'est pas marqué couvert : il sera redemandé au prochain appel.
+        """
+        df_new = df_new.copy()
+        df_new["Date"] = pd.to_datetime(df_new["Date"]).dt.tz_localize(None)
+
+        for ticker, df_ticker in df_new.groupby("Ticker"):
+            with self._ticker_lock(ticker):
+                df_cached = self.read(ticker)
+                df_ticker = pd.concat([df_cached, df_ticker[STOCK_COLUMNS]], ignore_index=True)
+                df_ticker["Date"] = pd.to_datetime(df_ticker["Date"])
+                df_ticker = df_ticker.drop_duplicates("Date", keep="last").sort_values("Date")
+                df_ticker.to_parquet(self._path(ticker), index=False)
+
+        returned = set(df_new["Ticker"].unique())
+        with self._lock:
+            for ticker in tickers:
+                if ticker not in returned:
+                    continue
+                # La période couverte n'est étendue que si elle reste contiguë
+                if ticker in self.coverage:
+                    covered_start, covered_end = (pd.Timestamp(d) for d in self.coverage[ticker])
+                    if end < covered_start or start > covered_end:
+                        continue
+                    start_, end_ = min(start, covered_start), max(end, covered_end)
+                else:
+                    start_, end_ = start, end
+                self.coverage[ticker] = [start_.strftime("%Y-%m-%d"), end_.strftime("%Y-%m-%d")]
+
+            with open(self.coverage_path, mode="w", encoding="utf-8") as file:
+                json.dump(self.coverage, file, indent=2, sort_keys=True)
+
+
+def _plan_batches(cache: StockCache, tickers: List[str], start: pd.Timestamp, end: pd.Timestamp,
+                  batch_size: int) -> List[Tuple[List[str], pd.Timestamp, pd.Timestamp]]:
+    """
+    Regroupe les tickers qui ont la même plage manquante (cas courant : la fin de période)
+    en lots d'au plus `batch_size` tickers, un appel à la source par lot.
+    """
+    by_range: Dict[DateRange, List[str]] = {}
+    for ticker in tickers:
+        for date_range in cache.missing_ranges(ticker, start, end):
+            by_range.setdefault(date_range, []).append(ticker)
+
+    return [
+        (group[i:i + batch_size], range_start, range_end)
+        for (range_start, range_end), group in by_range.items()
+        for i in range(0, len(group), batch_size)
+    ]
+
+
+def download_stock_data(config: dict, input_dir: str, fetcher: Optional[Fetcher] = None,
+                        tickers: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    Met à jour le cache des cours pour les tickers de companies.csv sur [start_date, end_date]
+    puis écrit stock_data.csv à partir du cache. Seules les plages manquantes sont téléchargées,
+    par lots (`download_parameters.batch_size`) traités en parallèle (`download_parameters.workers`).
+    """
+    params = config["download_parameters"]
+    fetcher = fetcher or yfinance_fetcher
+    tickers = tickers or read_tickers(config, input_dir)
+
+    start = pd.Timestamp(config["start_date"])
+    # La date du jour n'est considérée couverte qu'une fois la séance publiée
+    end = min(pd.Timestamp(config["end_date"]), pd.Timestamp.today().normalize())
+
+    cache = StockCache(os.path.join(input_dir, params["cache_dir"]))
+    batches = _plan_batches(cache, tickers, start, end, params["batch_size"])
+    print(f"Téléchargement des données boursières : {len(tickers)} tickers, {len(batches)} lot(s) à télécharger")
+
+    def fetch_batch(batch):
+        batch_tickers, batch_start, batch_end = batch
+        df_batch = fetcher(batch_tickers, batch_start, batch_end)
+        cache.update(df_batch, batch_tickers, batch_start, batch_end)
+        return len(df_batch)
+
+    with ThreadPoolExecutor(max_workers=max(1, params["workers"])) as executor:
+        n_rows = sum(executor.map(fetch_batch, batches))
+    print(f"{n_rows} lignes téléchargées")
+
+    df_stock = pd.concat([cache.read(ticker) for ticker in tickers], ignore_index=True)
+    df_stock = df_stock[(df_stock["Date"] >= start) & (df_stock["Date"] < end)]
+    df_stock["Date"] = pd.to_datetime(df_stock["Date"]).dt.strftime("%Y-%m-%d")
+
+    path = os.path.join(input_dir, config["files"]["stock_source_file"])
+    df_stock[STOCK_COLUMNS].to_csv(path, index=False, sep=";")
+    print(f"Fichier {path} généré.")
+    return df_stock
+
+
+def clean_estr(config: dict, input_dir: str) -> None:
+    """
+    Nettoie le fichier estr brut (export BCE) et crée le fichier macro au format de l'ETL.
+    """
+    estr_raw_path = os.path.join(input_dir, "estr.csv")
+    macro_sources = config["files"]["macro_source_file"]
+    estr_clean_path = os.path.join(input_dir, macro_sources if isinstance(macro_sources, str) else macro_sources[0])
+
+    if not os.path.exists(estr_raw_path):
+        print(f"Le fichier estr.csv est manquant dans le dossier {input_dir}/")
+        return
+
+    print("Nettoyage des données macro (estr)...")
     df = pd.read_csv(estr_raw_path, skiprows=1, header=None)
     df = df.iloc[:, [0, 2]]  # Garder la Date et la Valeur
 
@@ -51,26 +249,14 @@ if os.path.exists(estr_raw_path):
 
     df.to_csv(estr_clean_path, index=False, sep=";")
     print(f"Fichier {estr_clean_path} généré proprement.")
-else:
-    print("Le fichier estr.csv est manquant dans le dossier input/")
-
 
 
+def main(config_path: str = "config.yaml") -> None:
+    config = get_serialized_data(config_path)
+    input_dir = config["file_parameters"]["input_dir"]
+    download_stock_data(config, input_dir)
+    clean_estr(config, input_dir)
 
-# création d'un fichier csv avec le nom des entreprises associé à leur secteur
-
-# Définir les données manuellement
-data = [
-    {"Ticker": "MC.PA", "Sector": "Luxe"},
-    {"Ticker": "TTE.PA", "Sector": "Energie"},
-    {"Ticker": "BNP.PA", "Sector": "Banque"},
-    {"Ticker": "AIR.PA", "Sector": "Aeronautique"},
-    {"Ticker": "SAN.PA", "Sector": "Sante"},
-    {"Ticker": "ORA.PA", "Sector": "Telecom"},
-    {"Ticker": "DG.PA", "Sector": "BTP"},
-    {"Ticker": "CA.PA", "Sector": "Distribution"},
-]
 
-df = pd.DataFrame(data)
-df.to_csv("input/companies.csv", index=False, sep=";")
-print("Fichier companies.csv généré dans input/")
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+import hashlib
+import json
+import os
+from typing import Dict, Iterable, List
+
+# Sections de config.yaml sans effet sur les données produites par le pipeline :
+# elles sont exclues de l'empreinte pour ne pas invalider le cache inutilement.
+CACHE_EXCLUDED_SECTIONS = ["run_mode", "scheduler_parameters", "sweep_parameters"]
+
+# Mémoïsation des hash de fichiers, indexée par (chemin, mtime, taille) :
+# un fichier non modifié n'est jamais relu entre deux reruns Streamlit.
+_HASH_CACHE: Dict[tuple, str] = {}
+
+
+def file_fingerprint(path: str) -> Dict:
+    """
+    Calcule l'empreinte d'un fichier (mtime, taille, hash SHA-1 du contenu) ou d'un répertoire.
+    Le hash n'est recalculé que si le mtime ou la taille ont changé.
+    """
+    if not os.path.exists(path):
+        return {"path": path, "missing": True}
+
+    # Répertoire (ex. dataset Parquet) : empreinte de chacun des fichiers qu'il contient
+    if os.path.isdir(path):
+        files = sorted(
+            os.path.join(root, name) for root, _, names in os.walk(path) for name in names
+        )
+        return {"path": path, "files": [file_fingerprint(file) for file in files]}
+
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+    if key not in _HASH_CACHE:
+        sha = hashlib.sha1()
+        with open(path, mode="rb") as file:
+            for block in iter(lambda: file.read(1 << 20), b""):
+                sha.update(block)
+        _HASH_CACHE[key] = sha.hexdigest()
+
+    return {"path": path, "mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "sha1": _HASH_CACHE[key]}
+
+
+def input_files(config: dict, input_dir: str) -> List[str]:
+    """
+    Retourne les chemins des fichiers sources lus par l'ETL (stock, macro, entreprises).
+    """
+    macro_sources = config["files"]["macro_source_file"]
+    macro_sources = [macro_sources] if isinstance(macro_sources, str) else macro_sources
+    return [
+        os.path.join(input_dir, config["files"]["stock_source_file"]),
+        *[os.path.join(input_dir, source) for source in macro_sources],
+        os.path.join(input_dir, config["files"]["static_companies_file"]),
+    ]
+
+
+def pipeline_fingerprint(config: dict, paths: Iterable[str]) -> str:
+    """
+    Construit une clé de cache à partir des empreintes des fichiers sources
+    et des sections de la configuration qui influencent les résultats.
+    """
+    payload = {
+        "files": [file_fingerprint(path) for path in paths],
+        "config": {k: v for k, v in config.items() if k not in CACHE_EXCLUDED_SECTIONS},
+    }
+    serialized = json.dumps(payload, sort_keys=True, default=str)
+    return hashlib.sha1(serialized.encode("utf-8")).hexdigest()
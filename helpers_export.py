@@ -1,89 +1,133 @@
 import os
-from typing import Dict, Literal
-from openpyxl.styles import PatternFill, Font
-from openpyxl.utils import get_column_letter
-from openpyxl import load_workbook
+import shutil
+import uuid
+from typing import Dict, List, Literal, Optional
 
 import numpy as np
 import pandas as pd
-from sqlalchemy import create_engine, MetaData
+from sqlalchemy import create_engine, event, inspect, text, types, MetaData
 
 IfExists = Literal["fail", "replace", "append"]
 
+# Nombre maximal de lignes d'une feuille Excel (limite du format .xlsx, en-tête compris)
+EXCEL_MAX_ROWS = 1_048_575
+
+
 # Cette fonction prend un dictionnaire de DataFrames {nom_feuille: DataFrame}
 # et les enregistre dans un fichier Excel unique, avec un onglet par DataFrame.
 # Des styles personnalisés (coloration conditionnelle, mise en gras) sont appliqués
 # à certaines feuilles comme 'regression' et 'mean_by_sector' pour faciliter la lecture.
 # Le répertoire est créé automatiquement si nécessaire.
 def dataframes_to_excel(
-        dataframes: Dict[str, pd.DataFrame], excel_full_path: str
+        dataframes: Dict[str, pd.DataFrame],
+        excel_full_path: str,
+        max_rows: Optional[int] = None,
+        oversized_format: Literal["csv", "parquet"] = "csv",
 ) -> None:
     """
     Exporte des DataFrames dans un fichier Excel à partir d’un dictionnaire
     où les clés correspondent aux noms des feuilles et les valeurs aux DataFrames.
     Applique des couleurs conditionnelles aux feuilles 'regression' et 'mean_by_sector'.
+    Le fichier est écrit en une seule passe (moteur xlsxwriter) : la mise en forme est
+    déclarée au moment de l'écriture sous forme de formats conditionnels.
+    Les feuilles de plus de `max_rows` lignes sont écrites à côté du classeur (CSV ou Parquet)
+    et remplacées dans le classeur par un lien vers le fichier.
     """
     os.makedirs(os.path.dirname(excel_full_path), exist_ok=True)
+    max_rows = min(max_rows or EXCEL_MAX_ROWS, EXCEL_MAX_ROWS)
 
-    with pd.ExcelWriter(excel_full_path) as writer:
+    with pd.ExcelWriter(excel_full_path, engine="xlsxwriter") as writer:
         for sheet, df in dataframes.items():
             if isinstance(df, pd.Series):
-                df.to_frame().to_excel(writer, sheet_name=sheet, merge_cells=False, index=True)
+                df = df.to_frame()
+                index = True
             elif isinstance(df.columns, pd.MultiIndex):
-                df.to_excel(writer, sheet_name=sheet, merge_cells=False)
+                index = True
             elif df.index.dtype == np.int64 and df.index.nlevels == 1:
-                df.to_excel(writer, sheet_name=sheet, merge_cells=False, index=False)
+                index = False
             else:
-                df.to_excel(writer, sheet_name=sheet, merge_cells=False, index=True)
-
-    # Coloration conditionnelle après sauvegarde si p-value <0;05
-    wb = load_workbook(excel_full_path)
-    for sheet_name in wb.sheetnames:
-        ws = wb[sheet_name]
-
-        if sheet_name == "regression":
-            # Couleur verte si p-value < 0.05
-            green_fill = PatternFill(start_color="C6EFCE", end_color="C6EFCE", fill_type="solid")
-            for row in range(2, ws.max_row + 1):
-                cell = ws[f"C{row}"]  # colonne C = P-value
-                try:
-                    if isinstance(cell.value, (float, int)) and float(cell.value) < 0.05:
-                        cell.fill = green_fill
-                except Exception:
-                    continue
-            # Mettre en gras les noms de variables
-            for row in ws.iter_rows(min_row=2, max_row=ws.max_row, min_col=1, max_col=1):
-                for cell in row:
-                    cell.font = Font(bold=True)
-
-        if sheet_name == "mean_by_sector":
-            # Colorier en bleu le plus grand rendement journalier et en orange la plus faible volatilité
-            blue_fill = PatternFill(start_color="BDD7EE", end_color="BDD7EE", fill_type="solid")
-            orange_fill = PatternFill(start_color="FCE4D6", end_color="FCE4D6", fill_type="solid")
-
-            # Trouver les colonnes
-            headers = {cell.value: idx + 1 for idx, cell in enumerate(ws[1])}
-            col_return = get_column_letter(headers.get("Return"))
-            col_volatility = get_column_letter(headers.get("Volatility"))
-
-            # Récupération des valeurs
-            returns = [ws[f"{col_return}{i}"].value for i in range(2, ws.max_row + 1)]
-            volatilities = [ws[f"{col_volatility}{i}"].value for i in range(2, ws.max_row + 1)]
-
-            try:
-                max_return = max(filter(lambda x: x is not None, returns))
-                min_volatility = min(filter(lambda x: x is not None, volatilities))
-            except ValueError:
+                index = True
+
+            if len(df) > max_rows:
+                _write_oversized_sheet(writer, sheet, df, excel_full_path, oversized_format, index)
                 continue
 
-            for i in range(2, ws.max_row + 1):
-                if ws[f"{col_return}{i}"].value == max_return:
-                    ws[f"{col_return}{i}"].fill = blue_fill
-                if ws[f"{col_volatility}{i}"].value == min_volatility:
-                    ws[f"{col_volatility}{i}"].fill = orange_fill
+            df.to_excel(writer, sheet_name=sheet, merge_cells=False, index=index)
+
+            formatter = _SHEET_FORMATTERS.get(sheet)
+            if formatter is not None:
+                offset = df.index.nlevels if index else 0
+                formatter(writer.book, writer.sheets[sheet], df, offset)
+
+
+def _format_regression_sheet(workbook, worksheet, df: pd.DataFrame, offset: int) -> None:
+    """
+    Feuille 'regression' : p-values < 0.05 en vert, noms de variables en gras.
+    """
+    if len(df) == 0:
+        return
+
+    # Couleur verte si p-value < 0.05 (colonne C = P-value)
+    green_fill = workbook.add_format({"bg_color": "#C6EFCE"})
+    worksheet.conditional_format(1, 2, len(df), 2, {
+        "type": "formula",
+        "criteria": "=AND(ISNUMBER(C2),C2<0.05)",
+        "format": green_fill,
+    })
+    # Mettre en gras les noms de variables
+    worksheet.set_column(0, 0, None, workbook.add_format({"bold": True}))
+
+
+def _format_mean_by_sector_sheet(workbook, worksheet, df: pd.DataFrame, offset: int) -> None:
+    """
+    Feuille 'mean_by_sector' : plus grand rendement en bleu, plus faible volatilité en orange.
+    """
+    if len(df) == 0:
+        return
+
+    blue_fill = workbook.add_format({"bg_color": "#BDD7EE"})
+    orange_fill = workbook.add_format({"bg_color": "#FCE4D6"})
+
+    # Trouver les colonnes
+    columns = list(df.columns)
+    if "Return" in columns:
+        col = offset + columns.index("Return")
+        worksheet.conditional_format(1, col, len(df), col, {"type": "top", "value": 1, "format": blue_fill})
+    if "Volatility" in columns:
+        col = offset + columns.index("Volatility")
+        worksheet.conditional_format(1, col, len(df), col, {"type": "bottom", "value": 1, "format": orange_fill})
+
+
+_SHEET_FORMATTERS = {
+    "regression": _format_regression_sheet,
+    "mean_by_sector": _format_mean_by_sector_sheet,
+}
+
+
+def _write_oversized_sheet(
+        writer: pd.ExcelWriter,
+        sheet: str,
+        df: pd.DataFrame,
+        excel_full_path: str,
+        oversized_format: str,
+        index: bool,
+) -> None:
+    """
+    Écrit une feuille trop volumineuse pour Excel dans un fichier séparé (CSV ou Parquet)
+    placé à côté du classeur, et la remplace par un lien relatif vers ce fichier.
+    """
+    base, _ = os.path.splitext(excel_full_path)
+    side_path = f"{base}_{sheet}.{oversized_format}"
+    if oversized_format == "parquet":
+        df.to_parquet(side_path, index=index)
+    else:
+        df.to_csv(side_path, sep=";", index=index)
 
-    # Sauvegarde finale
-    wb.save(excel_full_path)
+    file_name = os.path.basename(side_path)
+    worksheet = writer.book.add_worksheet(sheet)
+    worksheet.write(0, 0, f"Feuille trop volumineuse ({len(df)} lignes), exportée dans :")
+    worksheet.write_url(1, 0, f"external:{file_name}", string=file_name)
+    print(f"Feuille '{sheet}' exportée séparément : {side_path}")
 
 
 def dataframes_to_db(
@@ -91,19 +135,24 @@ def dataframes_to_db(
         db_path: str,
         drop_all_tables: bool = False,
         append_data: bool = False,
+        dtypes: Optional[Dict[str, Dict[str, str]]] = None,
+        indexes: Optional[Dict[str, List[List[str]]]] = None,
 ) -> None:
     """
     Export DataFrames to a SQLite database
+    Chargement en bloc : une transaction unique, insertions par lots via executemany,
+    pragmas de chargement (WAL, synchronous=OFF), schéma typé et index créés après insertion.
     :param dataframes: DataFrames as Dict(table_name, DataFrame)
     :param db_path: full path of SQLite database
     :param drop_all_tables: if True, drop all existing tables
     :param append_data: if True, add to existing tables instead of replacing
+    :param dtypes: types déclarés par table, ex. {"stock": {"Date": "datetime64[ns]", ...}}
+    :param indexes: index à créer par table, ex. {"stock": [["Ticker", "Date"]]}
     """
     path, _ = os.path.split(db_path)
     os.makedirs(path, exist_ok=True)
 
-    engine = create_engine(f"sqlite:///{db_path}", echo=True)
-    con = engine.connect()
+    engine = _create_sqlite_engine(db_path, bulk_load=True)
     meta = MetaData()
 
     if drop_all_tables:
@@ -112,8 +161,221 @@ def dataframes_to_db(
 
     if_exists: IfExists = "append" if append_data else "replace"
 
-    for sheet_name, df in dataframes.items():
-        df.to_sql(name=sheet_name, con=con, if_exists=if_exists, index=False)
+    with engine.begin() as con:
+        for sheet_name, df in dataframes.items():
+            _bulk_insert(con, df, sheet_name, if_exists, (dtypes or {}).get(sheet_name))
+            _create_indexes(con, sheet_name, (indexes or {}).get(sheet_name))
+    engine.dispose()
+
+
+# Nombre de lignes par lot d'insertion
+SQLITE_CHUNK_SIZE = 50_000
+
+
+class _SqliteDate(types.UserDefinedType):
+    """
+    Colonne déclarée DATE dans le schéma SQLite, alimentée par des chaînes ISO 'YYYY-MM-DD'
+    (SQLite n'a pas de type date natif : le texte ISO reste triable et comparable).
+    """
+    cache_ok = True
+
+    def get_col_spec(self, **kw):
+        return "DATE"
+
+
+def _create_sqlite_engine(db_path: str, bulk_load: bool = False):
+    """
+    Crée un moteur SQLAlchemy sur la base SQLite.
+    En mode chargement, chaque connexion passe en journal WAL sans synchronisation disque
+    (les écritures ne sont pas durables en cas de coupure pendant le chargement, qui peut être rejoué).
+    """
+    engine = create_engine(f"sqlite:///{db_path}")
+
+    if bulk_load:
+        @event.listens_for(engine, "connect")
+        def _set_load_pragmas(dbapi_connection, _):
+            cursor = dbapi_connection.cursor()
+            cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute("PRAGMA synchronous=OFF")
+            cursor.execute("PRAGMA temp_store=MEMORY")
+            cursor.close()
+
+    return engine
+
+
+def _sql_schema(df: pd.DataFrame, dtypes: Optional[Dict[str, str]]):
+    """
+    Convertit les types déclarés (config.yaml `data_types`) en types SQLAlchemy.
+    Les colonnes de dates sont converties en texte ISO.
+    Retourne le DataFrame prêt à l'insertion et le schéma {colonne: type}.
+    """
+    schema = {}
+    for col in df.columns:
+        declared = (dtypes or {}).get(col, "")
+        if declared.startswith("datetime") or pd.api.types.is_datetime64_any_dtype(df[col]):
+            if not df.empty:
+                df = df.assign(**{col: pd.to_datetime(df[col]).dt.strftime("%Y-%m-%d")})
+            schema[col] = _SqliteDate()
+        elif declared.startswith("float"):
+            schema[col] = types.Float()
+        elif declared.startswith("int"):
+            schema[col] = types.BigInteger()
+        elif declared.startswith("str") or declared == "category":
+            schema[col] = types.Text()
+    return df, schema
+
+
+def _sqlite_executemany(table, con, keys, data_iter) -> None:
+    """
+    Méthode d'insertion pour `to_sql` : executemany direct du driver sqlite3,
+    nettement plus rapide sous SQLite que method="multi" ou l'insertion par défaut.
+    """
+    columns = ", ".join(f'"{k}"' for k in keys)
+    placeholders = ", ".join("?" * len(keys))
+    cursor = con.connection.cursor()
+    cursor.executemany(f'INSERT INTO "{table.name}" ({columns}) VALUES ({placeholders})', data_iter)
+    cursor.close()
+
+
+def _bulk_insert(con, df: pd.DataFrame, table_name: str, if_exists: IfExists, dtypes=None) -> None:
+    """
+    Insère un DataFrame par lots de SQLITE_CHUNK_SIZE lignes avec un schéma typé.
+    """
+    df, schema = _sql_schema(df, dtypes)
+    df.to_sql(
+        name=table_name,
+        con=con,
+        if_exists=if_exists,
+        index=False,
+        dtype=schema,
+        chunksize=SQLITE_CHUNK_SIZE,
+        method=_sqlite_executemany,
+    )
+
+
+def create_db_indexes(db_path: str, indexes: Dict[str, List[List[str]]]) -> None:
+    """
+    Crée les index demandés sur des tables existantes (ex. après un chargement par blocs).
+    :param indexes: index à créer par table, ex. {"stock": [["Ticker", "Date"]]}
+    """
+    engine = _create_sqlite_engine(db_path)
+    with engine.begin() as con:
+        for table_name, table_indexes in indexes.items():
+            if inspect(con).has_table(table_name):
+                _create_indexes(con, table_name, table_indexes)
+    engine.dispose()
+
+
+def _create_indexes(con, table_name: str, indexes: Optional[List[List[str]]]) -> None:
+    """
+    Crée les index demandés sur une table, ex. [["Ticker", "Date"]] → ix_stock_ticker_date.
+    """
+    for columns in indexes or []:
+        index_name = "_".join(["ix", table_name] + [to_db_format(c) for c in columns])
+        column_list = ", ".join(f'"{c}"' for c in columns)
+        con.execute(text(f'CREATE INDEX IF NOT EXISTS "{index_name}" ON "{table_name}" ({column_list})'))
+
+
+def dataframes_to_parquet(
+        dataframes: Dict[str, pd.DataFrame],
+        root_dir: str,
+        partition_cols: Optional[Dict[str, List[str]]] = None,
+        append_data: bool = False,
+) -> None:
+    """
+    Exporte des DataFrames en datasets Parquet (un répertoire par table sous `root_dir`).
+    La colonne `Date` est stockée en datetime64 et une colonne `Year` en est dérivée
+    pour permettre un partitionnement par année (ex. Ticker / Year).
+    :param dataframes: DataFrames as Dict(table_name, DataFrame)
+    :param root_dir: répertoire racine des datasets
+    :param partition_cols: colonnes de partitionnement par table, ex. {"stock": ["Ticker", "Year"]}
+    :param append_data: if True, add files to existing datasets instead of replacing them
+    """
+    partition_cols = partition_cols or {}
+    os.makedirs(root_dir, exist_ok=True)
+
+    for table_name, df in dataframes.items():
+        table_dir = os.path.join(root_dir, table_name)
+        if not append_data and os.path.exists(table_dir):
+            shutil.rmtree(table_dir)
+        if df.empty:
+            continue
+
+        df = df.copy()
+        if "Date" in df.columns:
+            df["Date"] = pd.to_datetime(df["Date"])
+            df["Year"] = df["Date"].dt.year
+
+        # Nom de fichier unique : un ajout ne remplace jamais les fichiers existants
+        part_name = f"part-{uuid.uuid4().hex}"
+        partitions = partition_cols.get(table_name)
+        if partitions:
+            df.to_parquet(
+                table_dir,
+                index=False,
+                partition_cols=partitions,
+                basename_template=f"{part_name}-{{i}}.parquet",
+                existing_data_behavior="overwrite_or_ignore",
+            )
+        else:
+            os.makedirs(table_dir, exist_ok=True)
+            df.to_parquet(os.path.join(table_dir, f"{part_name}.parquet"), index=False)
+
+
+def read_db_table(db_path: str, table_name: str) -> pd.DataFrame:
+    """
+    Lit une table de la base SQLite.
+    Retourne un DataFrame vide si la base ou la table n'existe pas encore.
+    """
+    if not os.path.exists(db_path):
+        return pd.DataFrame()
+
+    engine = create_engine(f"sqlite:///{db_path}")
+    with engine.connect() as con:
+        if not inspect(con).has_table(table_name):
+            return pd.DataFrame()
+        return pd.read_sql(text(f'SELECT * FROM "{table_name}"'), con)
+
+
+def upsert_dataframe_to_db(
+        df: pd.DataFrame,
+        db_path: str,
+        table_name: str,
+        keys: List[str],
+        dtypes: Optional[Dict[str, str]] = None,
+        indexes: Optional[List[List[str]]] = None,
+) -> None:
+    """
+    Insère ou remplace les lignes d'un DataFrame dans une table SQLite, sans toucher
+    aux autres lignes. Les lignes existantes ayant les mêmes clés sont remplacées.
+    :param df: lignes à insérer
+    :param db_path: full path of SQLite database
+    :param table_name: table cible (créée si absente)
+    :param keys: colonnes identifiant une ligne, ex. ["Ticker", "Date"]
+    :param dtypes: types déclarés des colonnes, ex. {"Date": "datetime64[ns]"}
+    :param indexes: index à créer sur la table, ex. [["Ticker", "Date"]]
+    """
+    path, _ = os.path.split(db_path)
+    os.makedirs(path, exist_ok=True)
+
+    engine = _create_sqlite_engine(db_path, bulk_load=True)
+    with engine.begin() as con:
+        if inspect(con).has_table(table_name):
+            # Table de transit : suppression des clés existantes puis insertion en bloc
+            staging = f"_staging_{table_name}"
+            _bulk_insert(con, df, staging, "replace", dtypes)
+
+            key_list = ", ".join(f'"{k}"' for k in keys)
+            columns = ", ".join(f'"{c}"' for c in df.columns)
+            con.execute(text(
+                f'DELETE FROM "{table_name}" WHERE ({key_list}) IN (SELECT {key_list} FROM "{staging}")'
+            ))
+            con.execute(text(f'INSERT INTO "{table_name}" ({columns}) SELECT {columns} FROM "{staging}"'))
+            con.execute(text(f'DROP TABLE "{staging}"'))
+        else:
+            _bulk_insert(con, df, table_name, "fail", dtypes)
+        _create_indexes(con, table_name, indexes)
+    engine.dispose()
 
 
 def to_db_format(name: str) -> str:
@@ -0,0 +1,269 @@
+import numpy as np
+
+# Fonctions de calcul vectorisées sur des tableaux NumPy contigus, triés par groupe (ex. Ticker puis Date).
+# Les groupes sont décrits par le masque de leurs premières lignes : aucun calcul ne franchit
+# une frontière de groupe, ce qui remplace les groupby / rolling de pandas.
+
+
+def group_starts(keys: np.ndarray) -> np.ndarray:
+    """
+    Retourne un masque booléen valant True sur la première ligne de chaque groupe.
+    Les clés doivent être triées (les lignes d'un même groupe sont contiguës).
+    """
+    starts = np.ones(len(keys), dtype=bool)
+    if len(keys) > 1:
+        starts[1:] = keys[1:] != keys[:-1]
+    return starts
+
+
+def position_in_group(starts: np.ndarray) -> np.ndarray:
+    """
+    Retourne, pour chaque ligne, sa position (0, 1, 2...) dans son groupe.
+    """
+    index = np.arange(len(starts))
+    return index - np.maximum.accumulate(np.where(starts, index, 0))
+
+
+def grouped_shift(values: np.ndarray, starts: np.ndarray, periods: int = 1) -> np.ndarray:
+    """
+    Décale les valeurs de `periods` lignes à l'intérieur de chaque groupe (NaN en début de groupe).
+    """
+    shifted = np.full(len(values), np.nan)
+    if periods < len(values):
+        shifted[periods:] = values[:-periods]
+    shifted[position_in_group(starts) < periods] = np.nan
+    return shifted
+
+
+def grouped_pct_change(values: np.ndarray, starts: np.ndarray) -> np.ndarray:
+    """
+    Variation relative d'une ligne à la suivante dans chaque groupe (équivalent de groupby().pct_change()).
+    """
+    values = np.asarray(values, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return values / grouped_shift(values, starts) - 1
+
+
+def grouped_diff(values: np.ndarray, starts: np.ndarray) -> np.ndarray:
+    """
+    Différence d'une ligne à la suivante dans chaque groupe (équivalent de groupby().diff()).
+    """
+    values = np.asarray(values, dtype=float)
+    return values - grouped_shift(values, starts)
+
+
+def _window_sum(cumsum: np.ndarray, window: int) -> np.ndarray:
+    """
+    Somme glissante sur `window` lignes à partir d'une somme cumulée (préfixée d'un zéro).
+    Les dimensions supplémentaires (ex. produits croisés n × k × k) sont conservées.
+    """
+    sums = cumsum[window:] - cumsum[:-window]
+    padding = np.full((min(window - 1, len(cumsum) - 1),) + cumsum.shape[1:], np.nan)
+    return np.concatenate([padding, sums])
+
+
+def grouped_rolling_std(values: np.ndarray, starts: np.ndarray, window: int, ddof: int = 1) -> np.ndarray:
+    """
+    Écart-type glissant sur `window` lignes dans chaque groupe, en O(n) à partir des sommes
+    cumulées des valeurs et de leurs carrés (équivalent de groupby().rolling(window).std()).
+    Une fenêtre incomplète (début de groupe) ou contenant un NaN donne NaN, comme pandas.
+    Les valeurs sont centrées avant cumul pour limiter les erreurs d'arrondi sur de longues séries.
+    """
+    values = np.asarray(values, dtype=float)
+    n = len(values)
+    if n == 0 or window <= ddof:
+        return np.full(n, np.nan)
+
+    valid = np.isfinite(values)
+    centered = np.where(valid, values - (values[valid].mean() if valid.any() else 0.0), 0.0)
+
+    zero = np.zeros(1)
+    count = _window_sum(np.concatenate([zero, np.cumsum(valid)]), window)
+    sum_x = _window_sum(np.concatenate([zero, np.cumsum(centered)]), window)
+    sum_x2 = _window_sum(np.concatenate([zero, np.cumsum(centered ** 2)]), window)
+
+    variance = (sum_x2 - sum_x ** 2 / window) / (window - ddof)
+    std = np.sqrt(np.maximum(variance, 0.0))
+
+    complete = (position_in_group(starts) >= window - 1) & (count == window)
+    return np.where(complete, std, np.nan)
+
+
+def group_means(values: np.ndarray, starts: np.ndarray) -> np.ndarray:
+    """
+    Moyenne de chaque groupe, diffusée sur les lignes du groupe (valeurs n ou n × k).
+    """
+    ids = np.cumsum(starts) - 1
+    counts = np.bincount(ids).reshape((-1,) + (1,) * (values.ndim - 1))
+    sums = np.add.reduceat(values, np.flatnonzero(starts), axis=0)
+    return (sums / counts)[ids]
+
+
+def _ols_from_moments(xtx: np.ndarray, xty: np.ndarray, yty: np.ndarray, nobs: np.ndarray,
+                      mean_x: np.ndarray, mean_y: np.ndarray) -> dict:
+    """
+    Résout par lots les régressions MCO à partir de leurs moments sur données centrées :
+    X'X (m × p × p, constante en première colonne), X'y (m × p), y'y (m), nombre d'observations (m).
+    Les coefficients et leur matrice de covariance sont ensuite ramenés aux données d'origine
+    (constante = moyenne de y - moyennes de X · pentes). Une régression singulière ou sans degré
+    de liberté donne NaN.
+    """
+    m, p = xty.shape
+    finite = np.isfinite(xtx).all(axis=(1, 2)) & (nobs > p)
+    identity = np.broadcast_to(np.eye(p), xtx.shape)
+    xtx = np.where(finite[:, None, None], xtx, identity)
+    solvable = finite & (np.linalg.cond(xtx) < 1e12)
+    inverse = np.linalg.inv(np.where(solvable[:, None, None], xtx, identity))
+
+    xty = np.where(solvable[:, None], xty, 0.0)
+    beta = np.einsum("mij,mj->mi", inverse, xty)
+    rss = yty - np.einsum("mi,mi->m", beta, xty)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        tss = yty - xty[:, 0] ** 2 / nobs
+        r_squared = 1 - rss / tss
+        sigma2 = np.maximum(rss, 0.0) / (nobs - p)
+
+    # Retour à l'échelle d'origine : beta = T · beta_centré, V = T · V_centré · T'
+    transform = np.tile(np.eye(p), (m, 1, 1))
+    transform[:, 0, 1:] = -mean_x
+    covariance = transform @ (sigma2[:, None, None] * inverse) @ transform.transpose(0, 2, 1)
+    beta = np.einsum("mij,mj->mi", transform, beta)
+    beta[:, 0] += mean_y
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        tstat = beta / np.sqrt(np.diagonal(covariance, axis1=1, axis2=2))
+
+    beta[~solvable] = np.nan
+    tstat[~solvable] = np.nan
+    r_squared[~solvable] = np.nan
+    return {"coef": beta, "tstat": tstat, "r_squared": r_squared, "nobs": nobs}
+
+
+def _centered_design(y: np.ndarray, X: np.ndarray, starts: np.ndarray):
+    """
+    Centre y et X par groupe (stabilité numérique des sommes cumulées) et ajoute la constante.
+    """
+    mean_y, mean_x = group_means(y, starts), group_means(X, starts)
+    design = np.column_stack([np.ones(len(y)), X - mean_x])
+    return y - mean_y, design, mean_y, mean_x
+
+
+def _valid_rows(y: np.ndarray, X: np.ndarray, keys: np.ndarray):
+    """
+    Lignes sans valeur manquante et débuts de groupe recalculés sur ces seules lignes.
+    """
+    y = np.asarray(y, dtype=float)
+    X = np.asarray(X, dtype=float).reshape(len(y), -1)
+    valid = np.isfinite(y) & np.isfinite(X).all(axis=1)
+    return valid, y[valid], X[valid], group_starts(np.asarray(keys)[valid])
+
+
+def grouped_ols(y: np.ndarray, X: np.ndarray, keys: np.ndarray) -> dict:
+    """
+    Régression MCO de y sur X (constante ajoutée) pour chaque groupe de `keys` (clés triées),
+    sur les lignes sans valeur manquante. Retourne, par groupe, les coefficients et t-stats
+    (m × (k + 1), constante en premier), le R², le nombre d'observations et la clé du groupe.
+    """
+    valid, y, X, starts = _valid_rows(y, X, keys)
+    if not valid.any():
+        p = X.shape[1] + 1
+        return {"coef": np.empty((0, p)), "tstat": np.empty((0, p)), "r_squared": np.empty(0),
+                "nobs": np.empty(0), "keys": np.asarray(keys)[:0]}
+    yc, design, mean_y, mean_x = _centered_design(y, X, starts)
+    first = np.flatnonzero(starts)
+
+    xtx = np.add.reduceat(design[:, :, None] * design[:, None, :], first, axis=0)
+    xty = np.add.reduceat(design * yc[:, None], first, axis=0)
+    yty = np.add.reduceat(yc ** 2, first)
+    nobs = np.diff(np.append(first, len(y))).astype(float)
+
+    results = _ols_from_moments(xtx, xty, yty, nobs, mean_x[first], mean_y[first])
+    results["keys"] = np.asarray(keys)[valid][first]
+    return results
+
+
+def grouped_rolling_ols(y: np.ndarray, X: np.ndarray, keys: np.ndarray, window: int) -> dict:
+    """
+    Régressions MCO glissantes de y sur X (constante ajoutée) sur les `window` dernières
+    observations valides de chaque groupe, en O(n) à partir des sommes cumulées des produits
+    croisés (X'X, X'y, y'y) : aucune régression n'est ajustée individuellement.
+    Retourne des tableaux alignés sur les lignes d'entrée (NaN si la fenêtre est incomplète
+    ou si la ligne contient une valeur manquante).
+    """
+    n = len(y)
+    valid, y, X, starts = _valid_rows(y, X, keys)
+    if not valid.any():
+        p = X.shape[1] + 1
+        return {"coef": np.full((n, p), np.nan), "tstat": np.full((n, p), np.nan),
+                "r_squared": np.full(n, np.nan), "nobs": np.full(n, np.nan)}
+    yc, design, mean_y, mean_x = _centered_design(y, X, starts)
+    p = design.shape[1]
+
+    def rolling(products):
+        cumsum = np.concatenate([np.zeros((1,) + products.shape[1:]), np.cumsum(products, axis=0)])
+        return _window_sum(cumsum, window)
+
+    xtx = rolling(design[:, :, None] * design[:, None, :])
+    xty = rolling(design * yc[:, None])
+    yty = rolling(yc ** 2)
+    complete = position_in_group(starts) >= window - 1
+
+    results = _ols_from_moments(
+        np.where(complete[:, None, None], xtx, np.nan), xty, yty,
+        np.where(complete, float(window), 0.0), mean_x, mean_y,
+    )
+
+    # Réalignement sur les lignes d'origine
+    aligned = {}
+    for name, values in results.items():
+        full = np.full((n,) + values.shape[1:], np.nan)
+        full[valid] = values
+        aligned[name] = full
+    return aligned
+
+
+def rolling_cov_corr(values: np.ndarray, window: int, min_periods: int = None,
+                     dtype=np.float32) -> tuple:
+    """
+    Matrices de covariance et de corrélation glissantes entre toutes les colonnes de `values`
+    (dates × séries), sur les `window` dernières lignes, observations manquantes exclues par paire
+    (mêmes valeurs que pandas rolling().cov() / .corr()).
+    Les sommes de produits croisés (effectifs, sommes, carrés, produits) sont tenues à jour
+    de manière incrémentale : la ligne qui entre est ajoutée, celle qui sort de la fenêtre retirée.
+    Les séries sont centrées au préalable pour limiter les erreurs d'arrondi.
+    Retourne (cov, corr) de forme (dates, séries, séries), NaN si moins de `min_periods` observations.
+    """
+    min_periods = window if min_periods is None else min_periods
+    n_dates, k = values.shape
+    valid = ~np.isnan(values)
+    mask = valid.astype(float)
+    with np.errstate(invalid="ignore"):
+        centered = np.where(valid, values - np.nanmean(np.where(valid, values, np.nan), axis=0), 0.0)
+    centered = np.nan_to_num(centered)
+
+    cov = np.full((n_dates, k, k), np.nan, dtype=dtype)
+    corr = np.full((n_dates, k, k), np.nan, dtype=dtype)
+    # Sommes empilées [effectifs ; sommes ; sommes des carrés] (3k × k) et produits croisés (k × k)
+    moments = np.zeros((3 * k, k))
+    sum_xy = np.zeros((k, k))
+    stacked = np.concatenate([mask, centered, centered ** 2], axis=1)
+
+    for t in range(n_dates):
+        # Ligne entrante (+) et ligne sortante (−) en un seul produit matriciel
+        rows = [t] if t < window else [t, t - window]
+        signs = np.array([1.0, -1.0][:len(rows)])[:, None]
+        moments += stacked[rows].T @ (signs * mask[rows])
+        sum_xy += centered[rows].T @ (signs * centered[rows])
+
+        count, sum_x, sum_xx = moments[:k], moments[k:2 * k], moments[2 * k:]
+        enough = count >= max(min_periods, 2)
+        if not enough.any():
+            continue
+        with np.errstate(divide="ignore", invalid="ignore"):
+            mean_x = sum_x / count
+            c = (sum_xy - sum_x * mean_x.T) / (count - 1)
+            var = np.maximum((sum_xx - sum_x * mean_x) / (count - 1), 0.0)
+            r = c / np.sqrt(var * var.T)
+        cov[t] = np.where(enough, c, np.nan)
+        corr[t] = np.where(enough, np.clip(r, -1.0, 1.0), np.nan)
+    return cov, corr
@@ -0,0 +1,160 @@
+import hashlib
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Rendu des graphiques PNG hors du processus principal.
+# Chaque graphique est une tâche (fonction de rendu, fichier, données) : les fonctions sont
+# définies au niveau du module pour être transmises à un pool de processus, et dessinent sur
+# un objet Figure (backend Agg) sans passer par l'état global de pyplot.
+# Un manifeste (hash des données tracées par fichier) permet de ne pas redessiner un graphique inchangé.
+# matplotlib / seaborn ne sont importés qu'au moment du rendu (dans les processus du pool).
+
+PLOT_MANIFEST_FILE = "plots_manifest.json"
+
+# Au-delà, la légende du graphique de volatilité n'est plus lisible : elle est omise
+MAX_LEGEND_ENTRIES = 20
+
+PlotJob = Tuple[str, str, dict]
+
+
+def _figure(figsize):
+    from matplotlib.figure import Figure
+
+    return Figure(figsize=figsize)
+
+
+def _save(fig, path: str) -> str:
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    FigureCanvasAgg(fig)
+    fig.tight_layout()
+    fig.savefig(path)
+    return path
+
+
+def render_sector_plot(path: str, sectors: List[str], returns: np.ndarray, volatilities: np.ndarray) -> str:
+    """
+    Histogramme des rendements et volatilités moyens par secteur.
+    """
+    bar_width = 0.35
+    x = np.arange(len(sectors))
+
+    fig = _figure(figsize=(10, 6))
+    ax = fig.add_subplot()
+    ax.bar(x - bar_width / 2, returns, width=bar_width, label="Return")
+    ax.bar(x + bar_width / 2, volatilities, width=bar_width, label="Volatility")
+
+    ax.set_xticks(list(x))
+    ax.set_xticklabels(sectors, rotation=45, ha="right")
+    ax.set_ylabel("Values")
+    ax.set_title("Average Return and Volatility by Sector")
+    ax.legend()
+    return _save(fig, path)
+
+
+def render_return_plot(path: str, ticker: str, dates: np.ndarray, returns: np.ndarray) -> str:
+    """
+    Évolution du Return d'un ticker.
+    """
+    fig = _figure(figsize=(10, 4))
+    ax = fig.add_subplot()
+    ax.plot(dates, returns, label=ticker, linewidth=1.2)
+    ax.set_title(f"Évolution du Return – {ticker}")
+    ax.set_xlabel("Date")
+    ax.set_ylabel("Return")
+    ax.grid(True)
+    ax.legend()
+    return _save(fig, path)
+
+
+def render_volatility_plot(path: str, df: pd.DataFrame) -> str:
+    """
+    Évolution de la Volatilité par entreprise (colonnes Date, Ticker, Volatility).
+    """
+    import seaborn as sns
+
+    fig = _figure(figsize=(12, 6))
+    ax = fig.add_subplot()
+    show_legend = df["Ticker"].nunique() <= MAX_LEGEND_ENTRIES
+    sns.lineplot(data=df, x="Date", y="Volatility", hue="Ticker", ax=ax, legend="auto" if show_legend else False)
+    ax.set_title("Évolution de la Volatilité par entreprise")
+    ax.set_xlabel("Date")
+    ax.set_ylabel("Volatility")
+    if show_legend:
+        ax.legend(title="Ticker", bbox_to_anchor=(1.05, 1), loc="upper left")
+    return _save(fig, path)
+
+
+RENDERERS = {
+    "sector": render_sector_plot,
+    "return": render_return_plot,
+    "volatility": render_volatility_plot,
+}
+
+
+def _run_job(job: PlotJob) -> str:
+    kind, path, kwargs = job
+    return RENDERERS[kind](path, **kwargs)
+
+
+def plot_data_hash(kind: str, kwargs: dict) -> str:
+    """
+    Hash SHA-1 des données d'un graphique (type de graphique + tableaux / DataFrame tracés).
+    """
+    sha = hashlib.sha1(kind.encode("utf-8"))
+    for key in sorted(kwargs):
+        value = kwargs[key]
+        sha.update(key.encode("utf-8"))
+        if isinstance(value, pd.DataFrame):
+            sha.update(pd.util.hash_pandas_object(value, index=False).to_numpy().tobytes())
+        elif isinstance(value, np.ndarray) and value.dtype != object:
+            sha.update(np.ascontiguousarray(value).tobytes())
+        else:
+            sha.update(repr(list(value) if isinstance(value, np.ndarray) else value).encode("utf-8"))
+    return sha.hexdigest()
+
+
+def _read_manifest(path: str) -> Dict[str, str]:
+    if not os.path.exists(path):
+        return {}
+    with open(path, mode="r", encoding="utf-8") as file:
+        return json.load(file)
+
+
+def render_plots(jobs: List[PlotJob], output_dir: str, workers: Optional[int] = None) -> List[str]:
+    """
+    Rend les graphiques dans un pool de `workers` processus (os.cpu_count() si None, séquentiel si 1).
+    Les processus sont démarrés en "spawn" : le rendu peut être lancé depuis un thread du planificateur
+    pendant que d'autres threads tiennent des verrous (SQLite, pandas), qu'un fork recopierait.
+    Un graphique dont le fichier existe et dont les données n'ont pas changé depuis le dernier
+    rendu (hash identique dans le manifeste) est ignoré. Retourne les chemins des fichiers générés.
+    """
+    manifest_path = os.path.join(output_dir, PLOT_MANIFEST_FILE)
+    manifest = _read_manifest(manifest_path)
+
+    todo, hashes = [], {}
+    for kind, path, kwargs in jobs:
+        name = os.path.basename(path)
+        hashes[name] = plot_data_hash(kind, kwargs)
+        if manifest.get(name) == hashes[name] and os.path.exists(path):
+            continue
+        todo.append((kind, path, kwargs))
+
+    print(f"Graphiques : {len(todo)} à générer, {len(jobs) - len(todo)} inchangés")
+    workers = min(workers or os.cpu_count() or 1, len(todo))
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+            rendered = list(executor.map(_run_job, todo, chunksize=max(1, len(todo) // (4 * workers))))
+    else:
+        rendered = [_run_job(job) for job in todo]
+
+    manifest.update(hashes)
+    with open(manifest_path, mode="w", encoding="utf-8") as file:
+        json.dump(manifest, file, indent=2, sort_keys=True)
+    return rendered
@@ -0,0 +1,147 @@
+import functools
+import json
+import os
+import sys
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+try:
+    import resource  # indisponible sous Windows
+except ImportError:
+    resource = None
+
+# Journal d'exécution du pipeline : une mesure par étape instrumentée
+# (temps réel, temps CPU du thread, lignes en entrée / sortie, mémoire résidente
+# en fin d'étape et variation pendant l'étape, pic de mémoire résidente du processus).
+# Les mesures sont conservées en mémoire puis exportées en JSON lines (une ligne par étape),
+# ce qui permet de comparer les exécutions successives et de repérer l'étape qui a dérivé.
+
+_RUN_ID = uuid.uuid4().hex[:12]
+_RUN_LOG: List[Dict] = []
+
+
+def new_run() -> str:
+    """
+    Démarre une nouvelle exécution : vide le journal en mémoire et génère un nouvel identifiant.
+    """
+    global _RUN_ID
+    _RUN_ID = uuid.uuid4().hex[:12]
+    _RUN_LOG.clear()
+    return _RUN_ID
+
+
+def get_run_log() -> List[Dict]:
+    """
+    Retourne les mesures de l'exécution courante.
+    """
+    return list(_RUN_LOG)
+
+
+def rss_mb() -> Optional[float]:
+    """
+    Mémoire résidente actuelle du processus, en Mo (Linux : /proc/self/statm ; None si indisponible).
+    Contrairement au pic, elle peut baisser : la différence avant / après une étape lui est attribuable.
+    """
+    try:
+        with open("/proc/self/statm", mode="r") as file:
+            resident_pages = int(file.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+    return round(resident_pages * os.sysconf("SC_PAGE_SIZE") / 1e6, 1)
+
+
+def peak_rss_mb() -> Optional[float]:
+    """
+    Pic de mémoire résidente du processus depuis son démarrage, en Mo (None si indisponible).
+    Valeur cumulée sur toute la vie du processus : elle ne permet pas d'attribuer la mémoire à une étape.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux : kilo-octets, macOS : octets
+    return round(peak / (1e6 if sys.platform == "darwin" else 1e3), 1)
+
+
+@contextmanager
+def measure(stage: str, rows_in: Optional[int] = None):
+    """
+    Mesure un bloc de code et ajoute une ligne au journal d'exécution.
+    Le dictionnaire renvoyé peut être complété dans le bloc (ex. record["rows_out"] = len(df)).
+    """
+    record = {
+        "run_id": _RUN_ID,
+        "stage": stage,
+        "started_at": datetime.now().isoformat(timespec="seconds"),
+        "rows_in": rows_in,
+        "rows_out": None,
+        "status": "ok",
+    }
+    # Temps CPU du thread courant : le planificateur exécute des étapes en parallèle dans des threads,
+    # le temps CPU du processus compterait aussi celui des autres étapes
+    wall, cpu, rss = time.perf_counter(), time.thread_time(), rss_mb()
+    try:
+        yield record
+    except Exception as error:
+        record["status"] = f"error: {type(error).__name__}: {error}"
+        raise
+    finally:
+        record["wall_s"] = round(time.perf_counter() - wall, 4)
+        record["cpu_s"] = round(time.thread_time() - cpu, 4)
+        record["rss_mb"] = rss_mb()
+        record["rss_delta_mb"] = None if rss is None or record["rss_mb"] is None else round(record["rss_mb"] - rss, 1)
+        record["peak_rss_mb"] = peak_rss_mb()
+        _RUN_LOG.append(record)
+
+
+def instrument(stage: str, rows_in: Callable = None, rows_out: Callable = None):
+    """
+    Décorateur de méthode : mesure chaque appel via `measure`.
+    :param stage: nom de l'étape, ex. "etl.extract"
+    :param rows_in: fonction(self) → nombre de lignes en entrée, évaluée avant l'appel
+    :param rows_out: fonction(self) → nombre de lignes en sortie, évaluée après l'appel
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            with measure(stage, _count(rows_in, self)) as record:
+                result = method(self, *args, **kwargs)
+                record["rows_out"] = _count(rows_out, self)
+            return result
+        return wrapper
+    return decorator
+
+
+def _count(func: Callable, obj) -> Optional[int]:
+    """
+    Évalue un compteur de lignes sans jamais faire échouer l'étape mesurée.
+    """
+    if func is None:
+        return None
+    try:
+        return int(func(obj))
+    except Exception:
+        return None
+
+
+def export_run_log(path: str) -> None:
+    """
+    Ajoute les mesures de l'exécution courante au fichier JSON lines `path`.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, mode="a", encoding="utf-8") as file:
+        for record in _RUN_LOG:
+            file.write(json.dumps(record, ensure_ascii=False) + "\n")
+    print(f"Journal d'exécution exporté : {path}")
+
+
+def read_run_log(path: str) -> List[Dict]:
+    """
+    Relit un journal JSON lines (toutes les exécutions enregistrées).
+    """
+    if not os.path.exists(path):
+        return []
+    with open(path, mode="r", encoding="utf-8") as file:
+        return [json.loads(line) for line in file if line.strip()]
@@ -0,0 +1,77 @@
+import hashlib
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+# Couche macroéconomique : séries au format long (Date, Indicator, Value), plusieurs indicateurs
+# (ténors €STR, autres taux, change...). Elles sont pivotées une seule fois en une matrice
+# dates × indicateurs alignée sur le calendrier boursier, avec les variations calculées sur
+# chaque série elle-même, avant toute jointure avec les cours.
+#
+# Nommage des colonnes jointes aux résultats :
+#   indicateur principal (`macro_parameters.primary_indicator`) → Value, Delta_ESTR
+#   autres indicateurs                                          → Value_<indicateur>, Delta_<indicateur>
+
+PRIMARY_VALUE_COLUMN = "Value"
+PRIMARY_DELTA_COLUMN = "Delta_ESTR"
+
+# Mémoïsation de la dernière matrice construite (clé : hash des séries et du calendrier)
+_MATRIX_CACHE: Dict[str, pd.DataFrame] = {}
+
+
+def value_column(indicator: str, primary: str) -> str:
+    return PRIMARY_VALUE_COLUMN if indicator == primary else f"Value_{indicator}"
+
+
+def delta_column(indicator: str, primary: str) -> str:
+    return PRIMARY_DELTA_COLUMN if indicator == primary else f"Delta_{indicator}"
+
+
+def macro_columns(indicators: List[str], primary: str) -> List[str]:
+    """
+    Colonnes de la matrice macro, indicateur principal en premier.
+    """
+    ordered = sorted(indicators, key=lambda ind: ind != primary)
+    return [value_column(ind, primary) for ind in ordered] + [delta_column(ind, primary) for ind in ordered]
+
+
+def _cache_key(macro: pd.DataFrame, dates: np.ndarray, primary: str) -> str:
+    sha = hashlib.sha1(primary.encode("utf-8"))
+    sha.update(pd.util.hash_pandas_object(macro[["Date", "Indicator", "Value"]], index=False).to_numpy().tobytes())
+    sha.update(np.ascontiguousarray(dates).tobytes())
+    return sha.hexdigest()
+
+
+def build_macro_matrix(macro: pd.DataFrame, trading_dates, primary: str) -> pd.DataFrame:
+    """
+    Construit (ou relit du cache) la matrice macro indexée par les dates de séance :
+    - pivot des séries longues en colonnes (une par indicateur)
+    - report de la dernière valeur publiée sur les séances sans publication
+    - variation de chaque série d'une séance à la suivante (0 en l'absence de publication)
+    Les variations sont calculées sur la matrice (dates × indicateurs), jamais sur les lignes jointes.
+    """
+    dates = np.unique(pd.to_datetime(pd.Series(trading_dates)).to_numpy(dtype="datetime64[ns]"))
+    key = _cache_key(macro, dates, primary)
+    if key in _MATRIX_CACHE:
+        return _MATRIX_CACHE[key]
+
+    wide = macro.pivot_table(index="Date", columns="Indicator", values="Value", aggfunc="last", observed=True)
+    wide.index = pd.to_datetime(wide.index)
+    wide.columns = wide.columns.astype(str)
+
+    # Alignement sur le calendrier boursier : dernière valeur publiée à la date ou avant
+    calendar = pd.DatetimeIndex(dates)
+    values = wide.reindex(wide.index.union(calendar)).ffill().reindex(calendar)
+    deltas = values.diff()
+
+    matrix = pd.concat([
+        values.rename(columns=lambda ind: value_column(ind, primary)),
+        deltas.rename(columns=lambda ind: delta_column(ind, primary)),
+    ], axis=1)
+    matrix = matrix[macro_columns(list(wide.columns), primary)]
+    matrix.index.name = "Date"
+
+    _MATRIX_CACHE.clear()
+    _MATRIX_CACHE[key] = matrix
+    return matrix
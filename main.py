@@ -1,103 +1,35 @@
 import os
 import streamlit as st
 
-from etl import Etl
-from model import Model
-from repository import Repository
-from view import View
 from helpers_serialize import get_serialized_data  # à ajouter si pas présent
+from pipeline import App, get_config_path, get_pipeline_fingerprint, run_pipeline
 
-CONFIG_FILE = "config.yaml"
 
-
-def _get_config_path() -> str:
-    """
-    Retourne le chemin absolu vers le fichier de configuration.
-    """
-    return os.path.join(os.getcwd(), CONFIG_FILE)
-
-
-def _get_paths(config: dict) -> tuple[str, str, str, str]:
-    """
-    Génère les chemins complets vers les fichiers d'entrée et de sortie à partir de la configuration.
-    """
-    base_dir = os.getcwd()
-    input_dir = os.path.join(base_dir, config["file_parameters"]["input_dir"])
-    output_dir = os.path.join(base_dir, config["file_parameters"]["output_dir"])
-    os.makedirs(output_dir, exist_ok=True)
-
-    version = config["file_parameters"]["version"]
-
-    full_path_output_excel = os.path.join(
-        output_dir, config["file_parameters"]["output_file_excel"].format(version)
-    )
-    full_path_output_sqlite = os.path.join(
-        output_dir, config["file_parameters"]["output_file_sqlite"].format(version)
-    )
-    full_path_output_excel_final = os.path.join(
-        output_dir, config["file_parameters"]["output_file_excel_final"].format(version)
-    )
-
-    return input_dir, full_path_output_excel, full_path_output_sqlite, full_path_output_excel_final
-
-
-def run_etl(config: dict, input_dir: str, excel_path: str, sqlite_path: str):
-    """
-    Exécute les étapes du pipeline ETL : extract, transform, load, sanity check.
-    """
-    etl = Etl(config, input_dir, excel_path, sqlite_path)
-    etl.extract()
-    etl.transform()
-    etl.load()
-    etl.sanity_check()
-
-
-class App:
+@st.cache_resource(max_entries=1, show_spinner="Exécution du pipeline ETL + Model...")
+def get_cached_app(fingerprint: str, _config: dict) -> App | None:
     """
-    Classe principale qui coordonne le chargement, le traitement et l'affichage des données.
+    Exécute le pipeline une seule fois par empreinte : les reruns Streamlit
+    (changement de widget) réutilisent les résultats en mémoire.
     """
-    def __init__(self, config: dict, db_path: str, output_final: str):
-        self.config = config
-        self.db_path = db_path
-        self.output_final = output_final
-        self.repo = None
-        self.model = None
-        self.view = None
-
-    def run(self):
-        """
-        Lance l'exécution du programme : chargement, traitement et export des résultats.
-        """
-        self.repo = Repository(self.config, self.db_path)
-        self.repo.get_data()
-
-        self.model = Model(self.config, self.repo)
-        self.model.join()
-        self.model.compute()
-        self.model.process_pivots()
-
-        self.view = View(self.config, self.repo, self.model, self.output_final)
-        self.view.export()
+    print(f"Pipeline recalculé (empreinte={fingerprint[:12]})")
+    return run_pipeline(_config, keep_results=True)
 
 
 # Interface Streamlit
 if __name__ == "__main__":
-    config = get_serialized_data(_get_config_path())
-    input_dir, excel_path, db_path, final_excel = _get_paths(config)
-
-    if config["run_mode"]["run_etl"]:
-        run_etl(config, input_dir, excel_path, db_path)
-
-    if config["run_mode"]["run_program"]:
-        app = App(config, db_path, final_excel)
-        app.run()
+    config = get_serialized_data(get_config_path())
+    app = get_cached_app(get_pipeline_fingerprint(config), config)
 
+    if app is not None:
         st.title("Analyse des performances d'entreprises CAC 40")
 
-        tickers = app.model.results["Ticker"].unique()
+        store = app.view.results_store
+        tickers = store.tickers if store is not None else app.model.results["Ticker"].unique()
         selected_ticker = st.selectbox("Choisir une entreprise", tickers)
 
-        df_filtered = app.model.results[app.model.results["Ticker"] == selected_ticker]
+        df_filtered = app.view.get_filtered_results(
+            [selected_ticker], columns=["Date", "Return", "Volatility", "Delta_ESTR"]
+        )
         st.subheader(f"Données pour {selected_ticker}")
         st.dataframe(df_filtered[["Date", "Return", "Volatility", "Delta_ESTR"]].reset_index(drop=True))
 
@@ -119,4 +51,7 @@ if __name__ == "__main__":
                 st.image(path, caption=name)
 
                 # Dashboard interactif
-        app.view.display_interactive_dashboard()
\ No newline at end of file
+        app.view.display_interactive_dashboard()
+
+        # Mesures de performance du pipeline
+        app.view.display_performance_panel()
\ No newline at end of file
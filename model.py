@@ -1,50 +1,128 @@
 import pandas as pd
-import statsmodels.api as sm
 import numpy as np
 
+from helpers_export import dataframes_to_db, read_db_table, upsert_dataframe_to_db
+from helpers_numeric import group_starts, grouped_ols, grouped_pct_change, grouped_rolling_ols, grouped_rolling_std
+from instrumentation import instrument
+from etl import enforce_dtypes
+from correlation import RollingMatrices, returns_matrix, sector_returns_matrix
+from macro import build_macro_matrix
+from pivots import PivotEngine, read_pivot_specs
+
+# Table SQLite conservant, par ticker, les dernières lignes nécessaires au calcul incrémental
+MODEL_STATE_TABLE = "_model_state"
+MODEL_STATE_COLUMNS = ["Ticker", "Date", "Adj Close", "Return", "Volatility"]
+
 class Model:
     def __init__(self, config, repo):
         self.config = config
         self.repo = repo
         self.results = None
-        self.sheets_pivots = dict()
+        self.correlations = {}
+        self.sheets_pivots = PivotEngine(read_pivot_specs(config), lambda: self.results)
+
+    @property
+    def volatility_window(self) -> int:
+        """
+        Fenêtre (en jours de bourse) de la volatilité mobile, définie dans `model_parameters`.
+        """
+        return self.config["model_parameters"]["volatility_window"]
 
     # Jointure des jeux de données
     # Cette méthode effectue deux jointures successives :
-    # - Une jointure temporelle entre les données boursières et les données macroéconomiques (€STR) via la date
-    # - Une jointure structurelle entre les résultats précédents et les données sectorielles via le ticker
-    # Les dates sont préalablement converties pour éviter les problèmes de format.
+    # - Une jointure temporelle "as-of" entre les données boursières et la matrice macro (dates × indicateurs,
+    #   voir macro.py) : chaque séance reçoit la dernière valeur publiée de chaque indicateur
+    #   et sa variation depuis la séance précédente, calculée sur la série macro elle-même
+    # - Une jointure structurelle avec les données sectorielles, par correspondance sur les codes
+    #   catégoriels du ticker (le secteur n'est pas recopié en chaînes sur chaque ligne)
+    # Les dates restent au format datetime64 (typées à la lecture par Repository) : aucune conversion ici.
     # Le résultat final est stocké dans `self.results`, qui servira de base aux analyses et visualisations.
+    @instrument("model.join", rows_in=lambda self: len(self.repo.stock_data), rows_out=lambda self: len(self.results))
     def join(self) -> None:
-        self.repo.stock_data["Date"] = pd.to_datetime(self.repo.stock_data["Date"]).dt.date
-        self.repo.macro_data["Date"] = pd.to_datetime(self.repo.macro_data["Date"]).dt.date
+        results = self.repo.stock_data.copy()
+        primary = self.config["macro_parameters"]["primary_indicator"]
+        matrix = build_macro_matrix(self.repo.macro_data, results["Date"].unique(), primary)
+
+        results["Indicator"] = pd.Categorical([primary] * len(results))
+        for col, values in self._asof_macro(matrix, results["Date"]).items():
+            results[col] = values
+        for col, values in self._lookup_companies(results["Ticker"]).items():
+            results[col] = values
+        self.results = results
+
+    @staticmethod
+    def _asof_macro(matrix: pd.DataFrame, dates: pd.Series) -> dict:
+        """
+        Jointure as-of (direction "backward") des colonnes de la matrice macro sur les dates boursières :
+        équivalent d'un merge_asof sur des données pré-triées, par recherche dichotomique
+        dans l'index trié de la matrice, sans trier ni recopier le DataFrame boursier.
+        """
+        matrix_dates = matrix.index.to_numpy(dtype="datetime64[ns]")
+        position = np.searchsorted(matrix_dates, dates.to_numpy(dtype="datetime64[ns]"), side="right") - 1
+        found = position >= 0
+        taken = np.where(found, position, 0)
 
-        self.results = pd.merge(self.repo.stock_data, self.repo.macro_data, on="Date", how="left")
-        self.results = pd.merge(self.results, self.repo.companies_data, on="Ticker", how="left")
+        columns = {}
+        for col in matrix.columns:
+            values = matrix[col].to_numpy(dtype=float)[taken]
+            columns[col] = pd.Series(np.where(found, values, np.nan), index=dates.index)
+        return columns
+
+    def _lookup_companies(self, tickers: pd.Series) -> dict:
+        """
+        Attributs des entreprises (ex. Sector) par ticker : la table companies est indexée
+        sur les catégories du ticker, puis distribuée sur les lignes via les codes catégoriels.
+        """
+        if not isinstance(tickers.dtype, pd.CategoricalDtype):
+            tickers = tickers.astype("category")
+        companies = self.repo.companies_data.drop_duplicates(subset="Ticker").set_index("Ticker")
+        companies.index = companies.index.astype(str)
+        by_category = companies.reindex(tickers.cat.categories.astype(str))
+
+        codes = tickers.cat.codes.to_numpy()
+        columns = {}
+        for col in by_category.columns:
+            lookup = by_category[col].astype("category")
+            lookup_codes = np.append(lookup.cat.codes.to_numpy(), -1)  # code -1 : ticker manquant
+            columns[col] = pd.Series(
+                pd.Categorical.from_codes(lookup_codes[codes], categories=lookup.cat.categories),
+                index=tickers.index,
+            )
+        return columns
 
     # Calcul des indicateurs financiers
     # Cette méthode enrichit le DataFrame `results` avec trois nouvelles variables clés :
     # - `Return` : rendement journalier des actions, calculé par variation en pourcentage du cours ajusté
-    # - `Delta_ESTR` : variation quotidienne du taux €STR
+    # - `Delta_ESTR` (et `Delta_<indicateur>`) : variation quotidienne des séries macro, déjà calculée
+    #   sur la matrice macro lors de la jointure (voir macro.py)
     # - `Volatility` : volatilité mobile (rolling standard deviation) des rendements sur une fenêtre de 20 jours
+    #   (paramètre `volatility_window`), calculée par pandas ou par le moteur NumPy (paramètre `engine`)
     # Le tri préalable par entreprise et date permet d'assurer la cohérence des calculs dans les groupes.
+    # En mode incrémental, seules les nouvelles dates sont calculées à partir de l'état persisté.
+    @instrument("model.compute", rows_in=lambda self: len(self.results), rows_out=lambda self: len(self.results))
     def compute(self) -> None:
-        self.results = self.results.sort_values(by=["Ticker", "Date"])
-        self.results["Return"] = self.results.groupby("Ticker")["Adj Close"].pct_change()
-        self.results["Delta_ESTR"] = self.results["Value"].diff()
-        self.results["Volatility"] = self.results.groupby("Ticker")["Return"].rolling(window=20).std().reset_index(0, drop=True)
+        self.compute_statistics()
 
-        # Nettoyage des données finales
-        # Suppression des doublons éventuels
-        # Remplacement des valeurs manquantes
-        # `Return` et `Delta_ESTR` par 0 (pas de variation mesurable)
-        # Volatility` par propagation de la dernière valeur connue (forward fill)
-        # Réinitialisation de l’index pour assurer une numérotation propre des lignes
-        self.results.drop_duplicates(inplace=True)
-        self.results["Return"] = self.results["Return"].fillna(0)
-        self.results["Delta_ESTR"] = self.results["Delta_ESTR"].fillna(0)
-        self.results["Volatility"] = self.results["Volatility"].ffill()
-        self.results.reset_index(drop=True, inplace=True)
+        # Régressions par ticker et corrélations glissantes : indépendantes l'une de l'autre
+        # (exécutées en parallèle par le planificateur, cf. scheduler.py)
+        self.compute_ticker_regressions()
+        if self.config["correlation_parameters"]["enabled"]:
+            self.compute_rolling_correlations()
+
+    @instrument("model.statistics", rows_in=lambda self: len(self.results), rows_out=lambda self: len(self.results))
+    def compute_statistics(self) -> None:
+        """
+        Indicateurs (Return, Volatility), corrélation Return / Delta_ESTR et régression globale (feuille `regression`).
+        """
+        if self.config["model_parameters"]["incremental"]:
+            etl_params = self.config["etl_main_parameters"]
+            if etl_params["drop_all_tables"] and not etl_params["incremental"]:
+                print("Attention : calcul incrémental du modèle avec un ETL complet (drop_all_tables) : "
+                      "l'état du modèle est supprimé à chaque chargement, l'historique sera recalculé. "
+                      "Activer etl_main_parameters.incremental pour en profiter.")
+            self._compute_incremental()
+        else:
+            self._compute_indicators()
 
         # Corrélation simple entre Rendement journaliser et la variation du taux €STR
         df_corr = self.results[["Return", "Delta_ESTR"]].dropna()
@@ -56,6 +134,8 @@ class Model:
         df_reg = self.results[["Return", "Delta_ESTR", "Value", "Sector"]].dropna()
         df_reg = pd.get_dummies(df_reg, columns=["Sector"], drop_first=True)
 
+        import statsmodels.api as sm
+
         y = df_reg["Return"].astype(float)
         X = df_reg.drop(columns=["Return"]).astype(float)
         X = sm.add_constant(X)
@@ -93,42 +173,209 @@ class Model:
 
         self.sheets_pivots["regression"] = regression_sheet
 
-    def process_pivots(self) -> None:
+    @instrument("model.ticker_regressions", rows_in=lambda self: len(self.results))
+    def compute_ticker_regressions(self) -> None:
+        """
+        Estime, pour chaque ticker, la régression du Return sur `regression_regressors`
+        (sur tout l'historique, puis sur chaque fenêtre glissante de `regression_windows` jours).
+        Les coefficients, t-statistiques et R² sont obtenus par lots à partir des sommes
+        cumulées des produits croisés (helpers_numeric), sans ajuster un modèle par fenêtre.
+        Feuilles produites : `regression_by_ticker` et `rolling_regression_<fenêtre>`.
+        """
+        params = self.config["model_parameters"]
+        regressors = params["regression_regressors"]
+        labels = ["const"] + regressors
+
+        df = self.results.sort_values(by=["Ticker", "Date"], kind="stable")
+        keys = df["Ticker"].to_numpy()
+        y = df["Return"].to_numpy(dtype=float)
+        X = df[regressors].to_numpy(dtype=float)
+
+        def to_frame(ols, index):
+            frame = pd.DataFrame(index=index)
+            for i, label in enumerate(labels):
+                frame[f"Beta_{label}"] = ols["coef"][:, i]
+                frame[f"T-stat_{label}"] = ols["tstat"][:, i]
+            frame["R-squared"] = ols["r_squared"]
+            frame["N"] = ols["nobs"]
+            return frame
+
+        by_ticker = grouped_ols(y, X, keys)
+        self.sheets_pivots["regression_by_ticker"] = to_frame(by_ticker, pd.Index(by_ticker["keys"], name="Ticker"))
+
+        for window in params["regression_windows"]:
+            rolling = to_frame(grouped_rolling_ols(y, X, keys, window), df.index)
+            rolling.insert(0, "Date", df["Date"])
+            rolling.insert(0, "Ticker", df["Ticker"])
+            self.sheets_pivots[f"rolling_regression_{window}"] = (
+                rolling.dropna(subset=["R-squared"]).reset_index(drop=True)
+            )
+
+    @instrument("model.rolling_correlation", rows_in=lambda self: len(self.results),
+                rows_out=lambda self: len(self.correlations["ticker"].dates))
+    def compute_rolling_correlations(self) -> None:
+        """
+        Matrices glissantes (fenêtre `correlation_parameters.window`) de toutes les paires de tickers
+        et de secteurs (rendement équipondéré des tickers du secteur), voir correlation.py.
+        Les rendements sont pivotés une seule fois en matrice dates × tickers.
+        Feuille produite : `rolling_correlation_sector` (corrélations des paires de secteurs).
+        """
+        params = self.config["correlation_parameters"]
+        returns = returns_matrix(self.results)
+        companies = self.results[["Ticker", "Sector"]].drop_duplicates(subset="Ticker")
+        sectors = pd.Series(companies["Sector"].to_numpy(), index=companies["Ticker"].astype(str))
+        sector_returns = sector_returns_matrix(returns, sectors)
+
+        for level, series in [("ticker", returns), ("sector", sector_returns)]:
+            self.correlations[level] = RollingMatrices.compute(
+                series, params["window"], params["min_periods"], params["matrices"])
+        if "corr" in params["matrices"]:
+            self.sheets_pivots["rolling_correlation_sector"] = self.correlations["sector"].pairs_frame("corr", key="Sector")
+
+    def _compute_indicators(self) -> None:
+        """
+        Calcule Return, Delta_ESTR et Volatility sur l'ensemble de l'historique.
+        """
+        # Doublons éventuels de clé (Ticker, Date) : la dernière ligne est conservée
+        self.results = self.results.drop_duplicates(subset=["Ticker", "Date"], keep="last")
+        if self.config["model_parameters"]["engine"] == "numpy":
+            self._compute_indicators_numpy()
+        else:
+            self.results = self.results.sort_values(by=["Ticker", "Date"])
+            self.results["Return"] = self.results.groupby("Ticker", observed=True)["Adj Close"].pct_change()
+            self.results["Volatility"] = self.results.groupby("Ticker", observed=True)["Return"].rolling(window=self.volatility_window).std().reset_index(0, drop=True)
+
+        # Nettoyage des données finales
+        # Remplacement des valeurs manquantes
+        # `Return` et `Delta_ESTR` par 0 (pas de variation mesurable)
+        # Volatility` par propagation de la dernière valeur connue du même ticker (forward fill groupé,
+        # comme le calcul incrémental : la volatilité d'un ticker ne déborde pas sur le suivant)
+        # Réinitialisation de l’index pour assurer une numérotation propre des lignes
+        self.results["Return"] = self.results["Return"].fillna(0)
+        for col in self._delta_columns():
+            self.results[col] = self.results[col].fillna(0)
+        self.results["Volatility"] = self.results.groupby("Ticker", observed=True)["Volatility"].ffill()
+        self.results.reset_index(drop=True, inplace=True)
+
+    def _delta_columns(self) -> list:
+        """
+        Colonnes de variations macro présentes dans les résultats (Delta_ESTR, Delta_<indicateur>).
+        """
+        return [col for col in self.results.columns if col.startswith("Delta_")]
+
+    def _compute_indicators_numpy(self) -> None:
+        """
+        Moteur NumPy : un seul tri, puis calculs sur des tableaux contigus avec masquage
+        des frontières entre tickers (rendements et volatilité glissante en O(n) par sommes cumulées).
+        Produit les mêmes valeurs que le calcul pandas, aux erreurs d'arrondi près.
+        """
+        self.results = self.results.sort_values(by=["Ticker", "Date"], kind="stable").reset_index(drop=True)
+        starts = group_starts(self.results["Ticker"].to_numpy())
+
+        returns = grouped_pct_change(self.results["Adj Close"].to_numpy(dtype=float), starts)
+        self.results["Return"] = returns
+        self.results["Volatility"] = grouped_rolling_std(returns, starts, self.volatility_window)
+
+    def _compute_incremental(self) -> None:
+        """
+        Calcul incrémental des indicateurs : les résultats déjà calculés sont relus depuis
+        la base SQLite et seules les dates postérieures au dernier calcul sont traitées.
+        L'état par ticker (`_model_state`) conserve les dernières lignes nécessaires :
+        dernier `Adj Close` et derniers rendements (fenêtre de volatilité). Les variations macro
+        sont déjà portées par les lignes jointes (matrice macro) et ne dépendent pas de l'état.
+        """
+        db_path = self.repo.db_path
+        results_table = self.config["files"]["final_sheet"]
+        state = read_db_table(db_path, MODEL_STATE_TABLE)
+        stored = read_db_table(db_path, results_table)
+
+        if state.empty or stored.empty:
+            print("Calcul incrémental : aucun état trouvé, calcul complet de l'historique.")
+            self._compute_indicators()
+            dataframes_to_db(
+                {results_table: self.results},
+                db_path=db_path,
+                dtypes={results_table: self.config["data_types"]["stock"]},
+                indexes=self.config["sqlite_indexes"],
+            )
+            self._save_model_state(self.results)
+            return
+
+        state["Date"] = pd.to_datetime(state["Date"])
+        stored["Date"] = pd.to_datetime(stored["Date"])
+
+        # Lignes postérieures au dernier calcul, par ticker
+        last_dates = state.groupby("Ticker", observed=True)["Date"].max()
+        hwm = self.results["Ticker"].astype(str).map(last_dates)
+        new_rows = self.results[hwm.isna() | (self.results["Date"] > hwm)]
+
+        if not new_rows.empty:
+            new_rows = self._compute_new_rows(state, new_rows, self.volatility_window)[stored.columns]
+            upsert_dataframe_to_db(
+                new_rows,
+                db_path,
+                results_table,
+                keys=["Ticker", "Date"],
+                dtypes=self.config["data_types"]["stock"],
+                indexes=self.config["sqlite_indexes"].get(results_table),
+            )
+            stored = pd.concat([stored, new_rows], ignore_index=True)
+
+        # Les résultats relus depuis SQLite reprennent les types déclarés (catégories, entiers)
+        data_types = self.config["data_types"]
+        self.results = enforce_dtypes(stored, {**data_types["stock"], **data_types["companies"]})
+        self.results = self.results.sort_values(by=["Ticker", "Date"]).reset_index(drop=True)
+        self._save_model_state(self.results)
+        print(f"Calcul incrémental : {len(new_rows)} nouvelles lignes calculées.")
+
+    @staticmethod
+    def _compute_new_rows(state: pd.DataFrame, new_rows: pd.DataFrame, window: int) -> pd.DataFrame:
         """
-        Génère des tableaux croisés (pivots) selon les paramètres du fichier de configuration.
-        Les résultats sont stockés dans self.sheets_pivots.
+        Calcule les indicateurs des nouvelles lignes en les préfixant, pour chaque ticker,
+        par les lignes d'état (graines) : les calculs groupés reprennent ainsi là où
+        le précédent calcul s'était arrêté, sans relire tout l'historique.
         """
-        view_data = zip(
-            self.config["pivots"]["sheet_names"],
-            self.config["pivots"]["view_index"],
-            self.config["pivots"]["view_values"],
-            self.config["pivots"]["view_columns"],
-            self.config["pivots"]["view_aggfunc"],
+        new_rows = new_rows.drop_duplicates(subset=["Ticker", "Date"], keep="last")
+        frame = pd.concat([
+            state.assign(_seed=True),
+            new_rows.assign(_seed=False),
+        ], ignore_index=True).sort_values(by=["Ticker", "Date"], kind="stable")
+        is_new = ~frame["_seed"].astype(bool)
+
+        # Les rendements des graines sont conservés, seuls ceux des nouvelles lignes sont calculés
+        returns = frame.groupby("Ticker", observed=True)["Adj Close"].pct_change()
+        frame["Return"] = frame["Return"].where(~is_new, returns)
+        volatility = frame.groupby("Ticker", observed=True)["Return"].rolling(window=window).std().reset_index(0, drop=True)
+        frame["Volatility"] = frame["Volatility"].where(~is_new, volatility)
+
+        frame["Volatility"] = frame.groupby("Ticker", observed=True)["Volatility"].ffill()
+        frame = frame[is_new].drop(columns="_seed")
+        # Mêmes remplacements que le calcul complet (`_compute_indicators`)
+        frame["Return"] = frame["Return"].fillna(0)
+        for col in [col for col in frame.columns if col.startswith("Delta_")]:
+            frame[col] = frame[col].fillna(0)
+        return frame[new_rows.columns.tolist() + ["Return", "Volatility"]]
+
+    def _save_model_state(self, results: pd.DataFrame) -> None:
+        """
+        Persiste les dernières lignes de chaque ticker (fenêtre de volatilité) dans `_model_state`.
+        """
+        state = results.groupby("Ticker", observed=True).tail(self.volatility_window)[MODEL_STATE_COLUMNS]
+        dataframes_to_db(
+            {MODEL_STATE_TABLE: state},
+            db_path=self.repo.db_path,
+            dtypes={MODEL_STATE_TABLE: self.config["data_types"]["stock"]},
         )
 
-        for sh, index, values, columns, aggfunc in view_data:
-            if sh == "mean_by_sector":
-                self.sheets_pivots[sh] = (
-                    self.results
-                    .groupby("Sector")[["Return", "Volatility"]]
-                    .mean()
-                    .sort_values(by="Return")
-                )
-            elif not index:
-                print(f"Pivot sheet '{sh}' ignoré car aucun index spécifié.")
-                continue
-            elif columns:
-                self.sheets_pivots[sh] = pd.pivot_table(
-                    data=self.results,
-                    values=values,
-                    index=index,
-                    columns=columns,
-                    aggfunc=aggfunc,
-                )
-            else:
-                self.sheets_pivots[sh] = pd.pivot_table(
-                    data=self.results,
-                    values=values,
-                    index=index,
-                    aggfunc=aggfunc,
-                )
+    @instrument("model.process_pivots", rows_in=lambda self: len(self.results), rows_out=lambda self: len(self.sheets_pivots))
+    def process_pivots(self) -> None:
+        """
+        Prépare les tableaux croisés (pivots) définis dans le fichier de configuration.
+        Les pivots sont calculés à la demande, au premier accès à self.sheets_pivots[nom]
+        (export, dashboard), puis mémorisés tant que `results` n'est pas recalculé.
+        """
+        self.sheets_pivots.invalidate()
+        for sh in self.sheets_pivots.order:
+            if sh not in self.sheets_pivots:
+                print(f"Pivot sheet '{sh}' sans index et non produite par le modèle : ignorée.")
+        print(f"Pivots déclarés : {list(self.sheets_pivots.specs)}")
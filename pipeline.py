@@ -0,0 +1,280 @@
+import os
+from typing import Iterable, List, Optional
+
+from correlation import RollingMatrices
+from etl import Etl
+from model import Model
+from repository import Repository
+from view import View
+from helpers_cache import input_files, pipeline_fingerprint
+from helpers_plot import PLOT_MANIFEST_FILE
+from instrumentation import export_run_log, new_run
+from results_store import CURRENT_FILE
+from scheduler import Scheduler, Stage
+
+# Pipeline batch (ETL → Model → Export), sans dépendance à l'interface Streamlit.
+# Utilisé par le dashboard (main.py) et par la ligne de commande (cli.py).
+# Les bibliothèques lourdes (statsmodels, matplotlib, seaborn, streamlit) ne sont importées
+# que par les étapes qui en ont besoin.
+
+CONFIG_FILE = "config.yaml"
+STAGES = ["etl", "model", "export"]
+# Résultats du modèle conservés en mémoire pour le dashboard
+MODEL_ARTIFACTS = ["model:results", "model:regressions", "model:correlations"]
+# Étapes qui écrivent les tables de l'ETL (stock, macro, companies) dans la base / les datasets
+ETL_LOAD_STAGES = ["etl.load", "etl.load_sqlite", "etl.load_parquet"]
+
+
+def get_config_path() -> str:
+    """
+    Retourne le chemin absolu vers le fichier de configuration.
+    """
+    return os.path.join(os.getcwd(), CONFIG_FILE)
+
+
+def _get_paths(config: dict) -> tuple[str, str, str, str]:
+    """
+    Génère les chemins complets vers les fichiers d'entrée et de sortie à partir de la configuration.
+    """
+    base_dir = os.getcwd()
+    input_dir = os.path.join(base_dir, config["file_parameters"]["input_dir"])
+    output_dir = os.path.join(base_dir, config["file_parameters"]["output_dir"])
+    os.makedirs(output_dir, exist_ok=True)
+
+    version = config["file_parameters"]["version"]
+
+    full_path_output_excel = os.path.join(
+        output_dir, config["file_parameters"]["output_file_excel"].format(version)
+    )
+    full_path_output_sqlite = os.path.join(
+        output_dir, config["file_parameters"]["output_file_sqlite"].format(version)
+    )
+    full_path_output_excel_final = os.path.join(
+        output_dir, config["file_parameters"]["output_file_excel_final"].format(version)
+    )
+
+    return input_dir, full_path_output_excel, full_path_output_sqlite, full_path_output_excel_final
+
+
+def _get_parquet_path(config: dict) -> str:
+    """
+    Retourne le répertoire racine des datasets Parquet.
+    """
+    output_dir = os.path.join(os.getcwd(), config["file_parameters"]["output_dir"])
+    version = config["file_parameters"]["version"]
+    return os.path.join(output_dir, config["file_parameters"]["output_dir_parquet"].format(version))
+
+
+def run_etl(config: dict, input_dir: str, excel_path: str, sqlite_path: str, parquet_path: str = None):
+    """
+    Exécute les étapes du pipeline ETL : extract, transform, load, sanity check.
+    """
+    etl = Etl(config, input_dir, excel_path, sqlite_path, parquet_path)
+    etl.extract()
+    etl.transform()
+    etl.validate()
+    etl.load()
+    etl.sanity_check()
+
+
+class App:
+    """
+    Classe principale qui coordonne le chargement, le traitement et l'affichage des données.
+    """
+    def __init__(self, config: dict, db_path: str, output_final: str, parquet_path: str = None):
+        self.config = config
+        self.db_path = db_path
+        self.output_final = output_final
+        self.parquet_path = parquet_path
+        self.repo = None
+        self.model = None
+        self.view = None
+
+    def run(self):
+        """
+        Lance l'exécution du programme : chargement, traitement et export des résultats.
+        """
+        self.load_data()
+        self.model.join()
+        self.model.compute()
+        self.model.process_pivots()
+        self.view.export()
+
+    def load_data(self):
+        """
+        Chargement des données depuis la base (ou les datasets Parquet) et création du modèle et de la vue.
+        """
+        self.repo = Repository(self.config, self.db_path, self.parquet_path)
+        self.repo.get_data()
+        self.model = Model(self.config, self.repo)
+        self.view = View(self.config, self.repo, self.model, self.output_final)
+
+    def compute_statistics(self):
+        self.model.compute_statistics()
+        self.model.process_pivots()
+
+    def use_shared_results(self):
+        """
+        Remplace les résultats et les matrices glissantes en mémoire par leurs versions enregistrées
+        à l'export, relues en mémoire mappée : les pages sont partagées entre processus via le cache
+        du système et ne sont lues qu'à l'accès (mémoire propre au processus quasi constante).
+        """
+        store = self.view.open_results_store()
+        if store is not None:
+            self.model.results = store.frame()
+            print(f"Résultats relus en mémoire mappée : {store.directory} ({len(store)} lignes)")
+
+        root = os.path.join(self.config["file_parameters"]["output_dir"],
+                            self.config["correlation_parameters"]["output_dir"])
+        for level in list(self.model.correlations):
+            if os.path.exists(os.path.join(root, level, "index.json")):
+                self.model.correlations[level] = RollingMatrices.load(os.path.join(root, level))
+
+
+def default_stages(config: dict) -> List[str]:
+    """
+    Étapes exécutées par défaut selon les options `run_mode`.
+    """
+    stages = []
+    if config["run_mode"]["run_etl"]:
+        stages.append("etl")
+    if config["run_mode"]["run_program"]:
+        stages += ["model", "export"]
+    return stages
+
+
+def resolve_stages(stages: Iterable[str]) -> List[str]:
+    """
+    Valide et ordonne les étapes demandées. L'export s'appuie sur les résultats du modèle
+    en mémoire : demander `export` sans `model` ajoute l'étape `model`.
+    """
+    stages = set(stages)
+    unknown = stages - set(STAGES)
+    if unknown:
+        raise ValueError(f"Étape(s) inconnue(s) : {sorted(unknown)} (étapes disponibles : {STAGES})")
+    if "export" in stages and "model" not in stages:
+        print("L'étape export nécessite les résultats du modèle : ajout de l'étape model")
+        stages.add("model")
+    return [stage for stage in STAGES if stage in stages]
+
+
+def build_stages(config: dict, etl: Etl, app: App) -> List[Stage]:
+    """
+    Graphe des étapes du pipeline (cf. scheduler.py). Les étapes sont préfixées par leur groupe
+    (etl., model., export.) et déclarent les artefacts lus et produits :
+    - ETL : extract → transform → validate, puis exports Excel / SQLite / Parquet et rapport de types
+      en parallèle (chargement complet), ou chargement unique en mode streaming / incrémental
+    - Model : chargement → jointure → statistiques, puis régressions par ticker et corrélations glissantes
+      en parallèle
+    - Export : classeur final, graphiques et persistance pour le dashboard en parallèle
+    """
+    input_dir, excel_path, db_path, final_excel = _get_paths(config)
+    storage = config["etl_main_parameters"]
+    output_dir = config["file_parameters"]["output_dir"]
+    report_path = os.path.join(input_dir, config["files"]["report_file"])
+    loaded = "etl:parquet" if storage["storage_backend"] == "parquet" else "etl:sqlite"
+    store = config["dashboard_parameters"]["results_store"]
+    store = os.path.join(output_dir, store) if store else None
+
+    stages = [
+        Stage("etl.extract", etl.extract, inputs=input_files(config, input_dir), outputs=["etl:raw"]),
+        Stage("etl.transform", etl.transform, inputs=["etl:raw"], outputs=["etl:typed"]),
+        Stage("etl.validate", etl.validate, inputs=["etl:typed"], outputs=["etl:valid"]),
+    ]
+    if etl.is_split_load():
+        if storage["to_excel"]:
+            stages.append(Stage("etl.load_excel", etl.load_excel, inputs=["etl:valid"], outputs=["etl:excel"],
+                                files=[excel_path], persistent=True))
+        if storage["to_sqlite"]:
+            stages.append(Stage("etl.load_sqlite", etl.load_sqlite, inputs=["etl:valid"], outputs=["etl:sqlite"],
+                                files=[db_path], persistent=True))
+        if storage["to_parquet"]:
+            stages.append(Stage("etl.load_parquet", etl.load_parquet, inputs=["etl:valid"], outputs=["etl:parquet"],
+                                files=[_get_parquet_path(config)], persistent=True))
+        report_inputs = ["etl:valid"]
+    else:
+        stages.append(Stage("etl.load", etl.load, inputs=["etl:valid"], outputs=["etl:sqlite", "etl:parquet"],
+                            persistent=True))
+        report_inputs = ["etl:valid", "etl:sqlite"]
+    stages.append(Stage("etl.sanity_check", etl.sanity_check, inputs=report_inputs, outputs=["etl:report"],
+                        files=[report_path], persistent=True))
+
+    stages += [
+        Stage("model.load", app.load_data, inputs=[loaded], outputs=["model:data"]),
+        Stage("model.join", lambda: app.model.join(), inputs=["model:data"], outputs=["model:joined"]),
+        Stage("model.statistics", app.compute_statistics, inputs=["model:joined"], outputs=["model:results"]),
+        Stage("model.ticker_regressions", lambda: app.model.compute_ticker_regressions(),
+              inputs=["model:results"], outputs=["model:regressions"]),
+    ]
+    sheets = ["model:results", "model:regressions"]
+    if config["correlation_parameters"]["enabled"]:
+        stages.append(Stage("model.rolling_correlation", lambda: app.model.compute_rolling_correlations(),
+                            inputs=["model:results"], outputs=["model:correlations"]))
+        sheets.append("model:correlations")
+
+    stages += [
+        Stage("export.excel", lambda: app.view.export_excel(), inputs=sheets, outputs=["export:excel"],
+              files=[final_excel] if config["export_parameters"]["to_excel"] else [], persistent=True),
+        Stage("export.plots", lambda: app.view.export_plots(), inputs=["model:results"], outputs=["export:plots"],
+              files=[os.path.join(output_dir, PLOT_MANIFEST_FILE)], persistent=True),
+        Stage("export.persist", lambda: app.view.persist(), inputs=sheets, outputs=["export:persist"],
+              files=[os.path.join(store, CURRENT_FILE)] if store else [], persistent=True),
+    ]
+    return stages
+
+
+def run_pipeline(config: dict, stages: Optional[Iterable[str]] = None, start_run: bool = True,
+                 keep_results: bool = False, force: bool = False) -> App | None:
+    """
+    Exécute les étapes demandées du pipeline (par défaut selon les options `run_mode`) avec le planificateur :
+    les étapes indépendantes tournent en parallèle et celles dont les sorties sont à jour sont sautées
+    (`scheduler_parameters`).
+    Retourne l'application, ou None si l'étape `model` n'est pas sélectionnée.
+    :param start_run: démarre un nouveau journal d'exécution (False si l'appelant l'a déjà fait)
+    :param keep_results: calcule les résultats du modèle en mémoire même si les exports sont à jour (dashboard) ;
+        avec l'export, ils sont ensuite remplacés par le stockage en colonnes relu en mémoire mappée
+    :param force: exécute toutes les étapes sélectionnées, même à jour
+    """
+    stages = resolve_stages(default_stages(config) if stages is None else stages)
+    input_dir, excel_path, db_path, final_excel = _get_paths(config)
+    parquet_path = _get_parquet_path(config)
+    output_dir = config["file_parameters"]["output_dir"]
+    run_log_path = os.path.join(output_dir, config["file_parameters"]["run_log"])
+    params = config["scheduler_parameters"]
+    if start_run:
+        new_run()
+
+    etl = Etl(config, input_dir, excel_path, db_path, parquet_path)
+    app = App(config, db_path, final_excel, parquet_path)
+    scheduler = Scheduler(
+        build_stages(config, etl, app),
+        stamp_dir=os.path.join(output_dir, params["stamp_dir"]),
+        signature=pipeline_fingerprint(config, []),
+        workers=params["workers"],
+    )
+    selected = [name for name in scheduler.stages if name.split(".")[0] in stages]
+    # Sans export, demander l'étape model revient à vouloir ses résultats : ils sont calculés
+    targets = MODEL_ARTIFACTS if "model" in stages and (keep_results or "export" not in stages) else []
+    scheduler.run(selected, targets=targets, force=force or not params["skip_fresh"])
+    if keep_results and "export" in stages:
+        # export.persist vient d'écrire (ou a validé) le stockage en colonnes de ces résultats
+        app.use_shared_results()
+
+    export_run_log(run_log_path)
+    return app if "model" in stages else None
+
+
+def get_pipeline_fingerprint(config: dict) -> str:
+    """
+    Clé de cache du pipeline : empreinte des fichiers sources et de la configuration.
+    Si l'ETL n'est pas exécuté, ce sont les témoins des étapes de chargement de l'ETL qui sont
+    surveillés : la base SQLite et les datasets Parquet reçoivent aussi les résultats du modèle
+    à chaque exécution, leur empreinte changerait donc à chaque rerun.
+    """
+    input_dir = _get_paths(config)[0]
+    if config["run_mode"]["run_etl"]:
+        return pipeline_fingerprint(config, input_files(config, input_dir))
+
+    stamp_dir = os.path.join(config["file_parameters"]["output_dir"], config["scheduler_parameters"]["stamp_dir"])
+    stamps = [os.path.join(stamp_dir, f"{name}.stamp") for name in ETL_LOAD_STAGES]
+    return pipeline_fingerprint(config, stamps)
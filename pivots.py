@@ -0,0 +1,167 @@
+import threading
+from collections.abc import MutableMapping
+from typing import Callable, Dict, Iterator, List, Optional
+
+import pandas as pd
+
+from instrumentation import measure
+
+# Moteur de tableaux croisés (section `pivots` de config.yaml).
+# Chaque pivot configuré est un nœud paresseux : il n'est calculé qu'au premier accès
+# (export par View, affichage Streamlit) puis mémorisé tant que `results` ne change pas.
+# Les pivots qui partagent les mêmes clés de regroupement (index + colonnes, filtre, regroupement
+# des dates) sont agrégés en une seule passe groupby, pour toutes leurs colonnes et fonctions.
+#
+# Paramètres par pivot (listes parallèles, une position par feuille) :
+#   sheet_names       nom de la feuille
+#   view_index        colonne(s) en lignes ; null = feuille produite par le modèle (ex. regression)
+#   view_values       colonne(s) agrégées
+#   view_columns      colonne(s) en colonnes (null = aucune)
+#   view_aggfunc      fonction ou liste de fonctions (mean, sum, std, count...)
+#   view_filters      filtre pandas appliqué avant agrégation, ex. "Sector in ['Banque', 'Luxe']"
+#   view_date_bucket  regroupement de la colonne Date : daily | weekly | monthly
+#   view_sort_by      colonne(s) de tri du résultat
+
+DATE_BUCKETS = {"daily": "D", "weekly": "W", "monthly": "M"}
+
+PIVOT_PARAMETERS = ["view_index", "view_values", "view_columns", "view_aggfunc",
+                    "view_filters", "view_date_bucket", "view_sort_by"]
+
+
+def _as_list(value) -> List:
+    if value is None:
+        return []
+    return list(value) if isinstance(value, (list, tuple)) else [value]
+
+
+def read_pivot_specs(config: dict) -> Dict[str, dict]:
+    """
+    Lit la section `pivots` (listes parallèles) et retourne une spécification par feuille.
+    Les paramètres absents de la configuration valent null pour toutes les feuilles.
+    """
+    params = config["pivots"]
+    names = params["sheet_names"]
+    specs = {}
+    for i, name in enumerate(names):
+        spec = {key: (params.get(key) or [None] * len(names))[i] for key in PIVOT_PARAMETERS}
+        specs[name] = {
+            "index": _as_list(spec["view_index"]),
+            "values": _as_list(spec["view_values"]),
+            "columns": _as_list(spec["view_columns"]),
+            "aggfunc": _as_list(spec["view_aggfunc"]) or ["mean"],
+            "filters": spec["view_filters"],
+            "date_bucket": spec["view_date_bucket"],
+            "sort_by": _as_list(spec["view_sort_by"]),
+        }
+    return specs
+
+
+class PivotEngine(MutableMapping):
+    """
+    Dictionnaire des feuilles de synthèse : pivots configurés (calculés à la demande)
+    et feuilles déposées par le modèle (ex. `regression`), dans l'ordre de la configuration.
+    """
+    def __init__(self, specs: Dict[str, dict], get_results: Callable[[], pd.DataFrame]):
+        self.specs = {name: spec for name, spec in specs.items() if spec["index"]}
+        self.order = list(specs)
+        self.get_results = get_results
+        self._sheets: Dict[str, pd.DataFrame] = {}
+        self._memo: Dict[str, pd.DataFrame] = {}
+        self._groups: Dict[tuple, pd.DataFrame] = {}
+        self._source: Optional[pd.DataFrame] = None
+        self._lock = threading.RLock()
+
+    def invalidate(self) -> None:
+        """
+        Oublie les pivots calculés (à appeler lorsque `results` est recalculé).
+        """
+        with self._lock:
+            self._memo.clear()
+            self._groups.clear()
+            self._source = None
+
+    def __contains__(self, name) -> bool:
+        # Sans calcul : un pivot configuré est présent même s'il n'a pas encore été évalué
+        return name in self._sheets or name in self.specs
+
+    def __getitem__(self, name: str) -> pd.DataFrame:
+        if name in self._sheets:
+            return self._sheets[name]
+        if name not in self.specs:
+            raise KeyError(name)
+
+        with self._lock:
+            results = self.get_results()
+            if self._source is not results:
+                self.invalidate()
+                self._source = results
+            if name not in self._memo:
+                with measure(f"pivot.{name}", rows_in=len(results)) as record:
+                    self._memo[name] = self._compute(name, results)
+                    record["rows_out"] = len(self._memo[name])
+            return self._memo[name]
+
+    def __setitem__(self, name: str, df: pd.DataFrame) -> None:
+        self._sheets[name] = df
+
+    def __delitem__(self, name: str) -> None:
+        if name in self._sheets:
+            del self._sheets[name]
+        elif name in self.specs:
+            del self.specs[name]
+            self._memo.pop(name, None)
+        else:
+            raise KeyError(name)
+
+    def __iter__(self) -> Iterator[str]:
+        # Ordre de la configuration, puis feuilles ajoutées par le modèle hors configuration
+        declared = [name for name in self.order if name in self.specs or name in self._sheets]
+        return iter(declared + [name for name in self._sheets if name not in self.order])
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def _group_key(self, spec: dict) -> tuple:
+        return tuple(spec["index"] + spec["columns"]), spec["filters"], spec["date_bucket"]
+
+    def _grouped(self, spec: dict, results: pd.DataFrame) -> pd.DataFrame:
+        """
+        Agrégat partagé par tous les pivots de mêmes clés : une seule passe groupby
+        calcule l'ensemble des (colonne, fonction) demandés par ces pivots.
+        """
+        key = self._group_key(spec)
+        if key in self._groups:
+            return self._groups[key]
+
+        siblings = [s for s in self.specs.values() if self._group_key(s) == key]
+        aggregations: Dict[str, List[str]] = {}
+        for sibling in siblings:
+            for col in sibling["values"]:
+                funcs = aggregations.setdefault(col, [])
+                funcs += [f for f in sibling["aggfunc"] if f not in funcs]
+
+        keys = list(key[0])
+        selected = list(dict.fromkeys(keys + list(aggregations)))
+        if spec["filters"]:
+            df = results.loc[results.eval(spec["filters"]), selected]
+        else:
+            df = results[selected]
+        if spec["date_bucket"] and "Date" in keys:
+            df = df.assign(Date=pd.to_datetime(df["Date"]).dt.to_period(DATE_BUCKETS[spec["date_bucket"]]).dt.start_time)
+
+        self._groups[key] = df.groupby(keys, observed=True, sort=True).agg(aggregations)
+        return self._groups[key]
+
+    def _compute(self, name: str, results: pd.DataFrame) -> pd.DataFrame:
+        spec = self.specs[name]
+        grouped = self._grouped(spec, results)
+
+        selected = [(col, func) for col in spec["values"] for func in spec["aggfunc"]]
+        df = grouped[selected]
+        if len(spec["aggfunc"]) == 1:
+            df = df.droplevel(1, axis=1)
+        if spec["columns"]:
+            df = df.unstack(spec["columns"]).dropna(axis=1, how="all")
+        if spec["sort_by"]:
+            df = df.sort_values(by=spec["sort_by"])
+        return df
@@ -0,0 +1,182 @@
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from helpers_numeric import group_starts, grouped_pct_change
+
+# Contrôles de qualité des données avant chargement, vectorisés (une passe NumPy par jeu de données).
+# Chaque règle produit un masque booléen sur les lignes :
+#   - règles bloquantes ("reject") : la ligne est retirée des données chargées
+#   - règles d'alerte ("flag")     : la ligne est conservée mais signalée
+# Les lignes concernées sont recopiées dans la table de quarantaine (une ligne par règle déclenchée)
+# et le nombre de lignes par règle est enregistré dans le journal d'exécution.
+
+QUARANTINE_TABLE = "_quarantine"
+QUARANTINE_COLUMNS = ["Source", "Rule", "Action", "Key", "Date", "Value"]
+
+STOCK_RULES = {
+    "duplicate_key": "reject",       # (Ticker, Date) déjà présent plus loin dans le fichier (la dernière ligne est gardée)
+    "missing_price": "reject",       # Adj Close manquant
+    "non_positive_price": "reject",  # Adj Close <= 0
+    "invalid_volume": "reject",      # Volume manquant, nul ou négatif
+    "return_outlier": "flag",        # |z-score du rendement| > return_z_threshold (par ticker)
+}
+MACRO_RULES = {
+    "duplicate_key": "reject",       # (Indicator, Date) déjà présent plus loin dans le fichier
+    "missing_value": "reject",       # Value manquante
+    "publication_gap": "flag",       # plus de macro_max_gap_days jours depuis la publication précédente
+}
+
+ValidationResult = Tuple[pd.DataFrame, pd.DataFrame, Dict[str, int]]
+
+
+def _group_codes(keys: pd.Series) -> np.ndarray:
+    if isinstance(keys.dtype, pd.CategoricalDtype):
+        return keys.cat.codes.to_numpy()
+    return pd.factorize(keys)[0]
+
+
+def _sorted_order(codes: np.ndarray, dates: np.ndarray) -> np.ndarray:
+    """
+    Ordre (clé, date) stable : à clé et date égales, l'ordre du fichier est conservé.
+    """
+    return np.lexsort((dates, codes))
+
+
+def _duplicates(codes: np.ndarray, dates: np.ndarray, order: np.ndarray) -> np.ndarray:
+    """
+    Masque des doublons de clé (code, date), la dernière occurrence du fichier n'étant pas marquée.
+    """
+    c, d = codes[order], dates[order]
+    sorted_dup = np.zeros(len(order), dtype=bool)
+    sorted_dup[:-1] = (c[1:] == c[:-1]) & (d[1:] == d[:-1])
+    duplicates = np.zeros(len(order), dtype=bool)
+    duplicates[order] = sorted_dup
+    return duplicates
+
+
+def superseded_keys(keys: pd.Series, dates: pd.Series) -> np.ndarray:
+    """
+    Masque des lignes dont la clé (clé, date) réapparaît plus loin : même règle que `duplicate_key`
+    (la dernière occurrence est gardée), appliquée à un fichier lu par blocs dont on ne garde que les clés.
+    """
+    codes = _group_codes(keys)
+    duplicated = pd.DataFrame({"key": codes, "date": dates.to_numpy(dtype="datetime64[ns]")}).duplicated(keep="last")
+    # Comme `_duplicates`, une date manquante n'est jamais un doublon
+    return duplicated.to_numpy() & dates.notna().to_numpy()
+
+
+def _return_outliers(codes: np.ndarray, prices: np.ndarray, order: np.ndarray, z_threshold: float) -> np.ndarray:
+    """
+    Sauts de cours : rendement dont l'écart à la moyenne du ticker dépasse `z_threshold` écarts-types.
+    `order` ne contient que les lignes conservées, triées par (ticker, date).
+    """
+    outliers = np.zeros(len(codes), dtype=bool)
+    if len(order) < 2:
+        return outliers
+
+    starts = group_starts(codes[order])
+    returns = grouped_pct_change(prices[order], starts)
+    group = np.cumsum(starts) - 1
+
+    valid = ~np.isnan(returns)
+    r = np.where(valid, returns, 0.0)
+    n = np.bincount(group, weights=valid)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = np.bincount(group, weights=r) / n
+        var = np.bincount(group, weights=r * r) / n - mean ** 2
+        z = (returns - mean[group]) / np.sqrt(var * n / (n - 1))[group]
+    outliers[order] = np.abs(np.nan_to_num(z)) > z_threshold
+    return outliers
+
+
+def _publication_gaps(codes: np.ndarray, dates: np.ndarray, order: np.ndarray, max_gap_days: int) -> np.ndarray:
+    """
+    Publications intervenant plus de `max_gap_days` jours après la précédente du même indicateur.
+    """
+    gaps = np.zeros(len(codes), dtype=bool)
+    if len(order) < 2:
+        return gaps
+
+    starts = group_starts(codes[order])
+    days = np.diff(dates[order]).astype("timedelta64[D]").astype(np.int64)
+    sorted_gaps = np.zeros(len(order), dtype=bool)
+    sorted_gaps[1:] = (days > max_gap_days) & ~starts[1:]
+    gaps[order] = sorted_gaps
+    return gaps
+
+
+def _split(df: pd.DataFrame, masks: Dict[str, np.ndarray], rules: Dict[str, str], source: str,
+           key_col: str, value_col: str) -> ValidationResult:
+    """
+    Retire les lignes des règles bloquantes et construit la quarantaine et les compteurs.
+    """
+    rejected = np.zeros(len(df), dtype=bool)
+    parts, counts = [], {}
+    for rule, mask in masks.items():
+        counts[f"{source}.{rule}"] = int(mask.sum())
+        if rules[rule] == "reject":
+            rejected |= mask
+        if mask.any():
+            rows = df.loc[mask, [key_col, "Date", value_col]]
+            parts.append(pd.DataFrame({
+                "Source": source,
+                "Rule": rule,
+                "Action": rules[rule],
+                "Key": rows[key_col].astype(str).to_numpy(),
+                "Date": rows["Date"].to_numpy(),
+                "Value": rows[value_col].to_numpy(dtype=float),
+            }))
+    counts[f"{source}.rejected"] = int(rejected.sum())
+
+    quarantine = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=QUARANTINE_COLUMNS)
+    return df[~rejected], quarantine, counts
+
+
+def validate_stock(df: pd.DataFrame, z_threshold: float,
+                   superseded: Optional[np.ndarray] = None) -> ValidationResult:
+    """
+    Contrôle les cours (Ticker, Date, Adj Close, Volume) et retourne
+    (lignes conservées, lignes en quarantaine, nombre de lignes par règle).
+    Les sauts de cours sont mesurés sur les lignes conservées après les règles bloquantes.
+    :param superseded: pour un contrôle bloc par bloc (mode streaming), masque des lignes du bloc
+        dont la clé réapparaît dans un bloc suivant (cf. `superseded_keys`) : elles sont rejetées comme doublons,
+        les lignes conservées sont donc les mêmes qu'en lecture complète. Les z-scores restent calculés par bloc.
+    """
+    codes = _group_codes(df["Ticker"])
+    dates = df["Date"].to_numpy(dtype="datetime64[ns]")
+    prices = pd.to_numeric(df["Adj Close"], errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+    volumes = pd.to_numeric(df["Volume"], errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+
+    order = _sorted_order(codes, dates)
+    masks = {
+        "duplicate_key": _duplicates(codes, dates, order),
+        "missing_price": np.isnan(prices),
+        "non_positive_price": prices <= 0,
+        "invalid_volume": np.isnan(volumes) | (volumes <= 0),
+    }
+    if superseded is not None:
+        masks["duplicate_key"] |= superseded
+    rejected = np.logical_or.reduce(list(masks.values()))
+    masks["return_outlier"] = _return_outliers(codes, prices, order[~rejected[order]], z_threshold)
+    return _split(df, masks, STOCK_RULES, "stock", "Ticker", "Adj Close")
+
+
+def validate_macro(df: pd.DataFrame, max_gap_days: int) -> ValidationResult:
+    """
+    Contrôle les séries macro (Date, Indicator, Value) et retourne
+    (lignes conservées, lignes en quarantaine, nombre de lignes par règle).
+    """
+    codes = _group_codes(df["Indicator"])
+    dates = df["Date"].to_numpy(dtype="datetime64[ns]")
+    values = pd.to_numeric(df["Value"], errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+
+    order = _sorted_order(codes, dates)
+    masks = {
+        "duplicate_key": _duplicates(codes, dates, order),
+        "missing_value": np.isnan(values),
+    }
+    rejected = np.logical_or.reduce(list(masks.values()))
+    masks["publication_gap"] = _publication_gaps(codes, dates, order[~rejected[order]], max_gap_days)
+    return _split(df, masks, MACRO_RULES, "macro", "Indicator", "Value")
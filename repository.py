@@ -1,26 +1,178 @@
+import os
+from typing import List, Optional
+
 import pandas as pd
-from sqlalchemy import create_engine
+from sqlalchemy import bindparam, create_engine, inspect, text
+
+from etl import enforce_dtypes
+from instrumentation import instrument
 
 class Repository:
-    def __init__(self, config, db_path: str):
+    def __init__(self, config, db_path: str, parquet_path: str = None):
         """
-        Initialise le repository avec la configuration et le chemin de la base de données.
+        Initialise le repository avec la configuration et le chemin de la base de données
+        (et, le cas échéant, le répertoire des datasets Parquet).
         """
         self.config = config
         self.db_path = db_path
+        self.parquet_path = parquet_path
         self.stock_data = None
         self.macro_data = None
         self.companies_data = None
 
-    def get_data(self):
+    @instrument("repository.get_data", rows_out=lambda self: len(self.stock_data))
+    def get_data(self, tickers: Optional[List[str]] = None, start=None, end=None, columns: Optional[List[str]] = None):
         """
-        Récupère les données stockées dans la base SQLite (stock, macro, entreprises).
+        Récupère les données stockées (stock, macro, entreprises) depuis la base SQLite
+        ou les datasets Parquet, selon `storage_backend` dans la configuration.
+        Les filtres sont appliqués à la lecture : seules les lignes demandées sont chargées.
+        :param tickers: tickers à charger (tous si None)
+        :param start: date de début incluse (aucune borne si None)
+        :param end: date de fin incluse (aucune borne si None)
+        :param columns: colonnes de la table stock à charger (toutes si None)
         """
-        engine = create_engine(f"sqlite:///{self.db_path}")
-
-        self.stock_data = pd.read_sql(f"SELECT * FROM {self.config['files']['stock_sheet_name']}", engine)
-        self.macro_data = pd.read_sql(f"SELECT * FROM {self.config['files']['macro_sheet_name']}", engine)
-        self.companies_data = pd.read_sql(f"SELECT * FROM {self.config['files']['static_companies_sheet_name']}", engine)
+        files = self.config["files"]
+        self.stock_data = self.query(files["stock_sheet_name"], tickers, start, end, columns)
+        self.macro_data = self.query(files["macro_sheet_name"], start=start, end=end)
+        self.companies_data = self.query(files["static_companies_sheet_name"], tickers)
 
         print(f"stock_data.shape = {self.stock_data.shape}")
         print(f"macro_data.shape = {self.macro_data.shape}")
+
+    def get_results(self, tickers: Optional[List[str]] = None, start=None, end=None,
+                    columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        Lit les résultats du modèle persistés lors de l'export (table `final_sheet`),
+        avec les mêmes filtres que `get_data`.
+        """
+        return self.query(self.config["files"]["final_sheet"], tickers, start, end, columns)
+
+    def get_aggregates(self, level: str, granularity: str, keys: Optional[List[str]] = None,
+                       start=None, end=None) -> pd.DataFrame:
+        """
+        Lit une table d'agrégats (`agg_<level>_<granularity>`, cf. aggregates.py) restreinte
+        aux clés (tickers ou secteurs selon le niveau) et à la période demandées.
+        """
+        table_name = f"agg_{level}_{granularity}"
+        if level == "sector":
+            return self.query(table_name, start=start, end=end, sectors=keys)
+        return self.query(table_name, keys, start, end)
+
+    def has_table(self, table_name: str) -> bool:
+        """
+        Indique si la table existe dans le stockage sélectionné par `storage_backend`.
+        """
+        if self._use_parquet():
+            return os.path.exists(os.path.join(self.parquet_path, table_name))
+        if not os.path.exists(self.db_path):
+            return False
+        return inspect(create_engine(f"sqlite:///{self.db_path}")).has_table(table_name)
+
+    def query(self, table_name: str, tickers: Optional[List[str]] = None, start=None, end=None,
+              columns: Optional[List[str]] = None, sectors: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        Lit une table en appliquant les filtres à la source :
+        requête SQL paramétrée (SQLite) ou filtres de lecture (Parquet).
+        Les filtres sur une colonne absente de la table (ex. `Date` pour companies) sont ignorés.
+        """
+        if self._use_parquet():
+            df = self._query_parquet(table_name, tickers, start, end, columns, sectors)
+        else:
+            df = self._query_sqlite(table_name, tickers, start, end, columns, sectors)
+
+        if "Date" in df.columns:
+            df["Date"] = pd.to_datetime(df["Date"])
+        return enforce_dtypes(df, self._table_dtypes(table_name))
+
+    def _table_dtypes(self, table_name: str) -> dict:
+        """
+        Types déclarés (`data_types`) à appliquer à la lecture d'une table :
+        les DataFrames chargés ont les mêmes types compacts qu'à l'ingestion.
+        """
+        files = self.config["files"]
+        data_types = self.config["data_types"]
+        return {
+            files["stock_sheet_name"]: data_types["stock"],
+            files["macro_sheet_name"]: data_types["macro"],
+            files["static_companies_sheet_name"]: data_types["companies"],
+            files["final_sheet"]: {**data_types["stock"], **data_types["companies"]},
+        }.get(table_name, {})
+
+    def _use_parquet(self) -> bool:
+        return self.config["etl_main_parameters"]["storage_backend"] == "parquet"
+
+    def _query_sqlite(self, table_name, tickers, start, end, columns, sectors=None) -> pd.DataFrame:
+        """
+        Construit une requête SELECT paramétrée : les valeurs (tickers, dates) sont passées
+        en paramètres liés, seuls les noms de table / colonnes (non paramétrables) sont cités.
+        """
+        engine = create_engine(f"sqlite:///{self.db_path}")
+        with engine.connect() as con:
+            table_columns = [c["name"] for c in inspect(con).get_columns(table_name)]
+
+            selected = ", ".join(_quote(c) for c in columns) if columns else "*"
+            clauses, params = [], {}
+            if tickers is not None and "Ticker" in table_columns:
+                clauses.append('"Ticker" IN :tickers')
+                params["tickers"] = list(tickers)
+            if sectors is not None and "Sector" in table_columns:
+                clauses.append('"Sector" IN :sectors')
+                params["sectors"] = list(sectors)
+            if start is not None and "Date" in table_columns:
+                clauses.append('"Date" >= :start')
+                params["start"] = pd.Timestamp(start).strftime("%Y-%m-%d")
+            if end is not None and "Date" in table_columns:
+                # Borne exclusive au lendemain : couvre aussi les dates stockées avec une heure
+                clauses.append('"Date" < :end')
+                params["end"] = (pd.Timestamp(end) + pd.Timedelta(days=1)).strftime("%Y-%m-%d")
+
+            sql = f"SELECT {selected} FROM {_quote(table_name)}"
+            if clauses:
+                sql += " WHERE " + " AND ".join(clauses)
+
+            statement = text(sql)
+            for name in ("tickers", "sectors"):
+                if name in params:
+                    statement = statement.bindparams(bindparam(name, expanding=True))
+            return pd.read_sql(statement, con, params=params)
+
+    def _query_parquet(self, table_name, tickers, start, end, columns, sectors=None) -> pd.DataFrame:
+        """
+        Lecture d'un dataset Parquet partitionné avec projection des colonnes et filtres
+        appliqués à la lecture (seules les partitions Ticker / Year concernées sont ouvertes).
+        Les colonnes de partition sont remises au type texte et la colonne technique `Year`
+        est retirée, pour retrouver le schéma de la table source.
+        """
+        import pyarrow.dataset as ds
+
+        path = os.path.join(self.parquet_path, table_name)
+        partitions = self.config["parquet_partitions"].get(table_name) or []
+        table_columns = ds.dataset(path, partitioning="hive").schema.names
+
+        filters = []
+        if tickers is not None and "Ticker" in table_columns:
+            filters.append(("Ticker", "in", list(tickers)))
+        if sectors is not None and "Sector" in table_columns:
+            filters.append(("Sector", "in", list(sectors)))
+        if start is not None and "Date" in table_columns:
+            start = pd.Timestamp(start)
+            filters += [("Year", ">=", start.year), ("Date", ">=", start)]
+        if end is not None and "Date" in table_columns:
+            end = pd.Timestamp(end)
+            filters += [("Year", "<=", end.year), ("Date", "<=", end)]
+
+        df = pd.read_parquet(path, columns=columns, filters=filters or None)
+
+        for col in partitions:
+            if col in df.columns and isinstance(df[col].dtype, pd.CategoricalDtype):
+                df[col] = df[col].astype(str)
+        if "Year" in df.columns and not (columns and "Year" in columns):
+            df = df.drop(columns="Year")
+        return df
+
+
+def _quote(identifier: str) -> str:
+    """
+    Cite un nom de table ou de colonne SQL (les identifiants ne peuvent pas être paramétrés).
+    """
+    return '"' + str(identifier).replace('"', '""') + '"'
@@ -0,0 +1,190 @@
+import json
+import os
+import shutil
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Stockage en colonnes des résultats du modèle, relu en mémoire mappée.
+# Chaque colonne est un fichier .npy (codes entiers + libellés pour les catégories et les chaînes),
+# les lignes sont triées par (Ticker, Date) et l'index JSON donne la plage de lignes de chaque ticker.
+# Toutes les sessions du dashboard (et tous les processus) ouvrent les mêmes fichiers en lecture seule :
+# les pages lues sont partagées via le cache du système, et la sélection d'un ticker sur une période
+# est une simple vue des tableaux (aucune copie).
+#
+# Chaque écriture crée une nouvelle génération (sous-répertoire) puis met à jour `current.json` :
+# les sessions ouvertes sur la génération précédente continuent de la lire sans erreur.
+
+CURRENT_FILE = "current.json"
+INDEX_FILE = "index.json"
+KEY_COLUMN = "Ticker"
+DATE_COLUMN = "Date"
+
+
+def _encode(series: pd.Series) -> Tuple[np.ndarray, dict]:
+    """
+    Tableau NumPy à enregistrer et description de la colonne (type, libellés des catégories).
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series.cat.codes.to_numpy(), {"kind": "category", "categories": [str(c) for c in series.cat.categories]}
+    if pd.api.types.is_datetime64_any_dtype(series.dtype):
+        return series.to_numpy(dtype="datetime64[ns]"), {"kind": "datetime"}
+    if pd.api.types.is_numeric_dtype(series.dtype):
+        if isinstance(series.dtype, np.dtype):
+            return series.to_numpy(), {"kind": "numeric"}
+        # Types nullables (Int64, Float64...) : float64, NaN pour les valeurs manquantes
+        return series.to_numpy(dtype=float, na_value=np.nan), {"kind": "numeric"}
+    # Chaînes et objets : codés comme des catégories (valeurs manquantes = code -1)
+    codes, categories = pd.factorize(series.astype("string"), sort=True)
+    return codes.astype(np.int32), {"kind": "category", "categories": [str(c) for c in categories]}
+
+
+def write_results_store(results: pd.DataFrame, path: str) -> str:
+    """
+    Enregistre les résultats (colonnes .npy + index des plages par ticker) dans une nouvelle génération
+    du répertoire `path` et la désigne comme courante. Les générations précédentes sont supprimées
+    lorsque c'est possible (un fichier encore ouvert sous Windows est conservé jusqu'à l'écriture suivante).
+    Retourne le répertoire de la génération écrite.
+    """
+    key_codes, keys = pd.factorize(results[KEY_COLUMN].astype(str), sort=True)
+    dates = results[DATE_COLUMN].to_numpy(dtype="datetime64[ns]")
+    order = np.lexsort((dates, key_codes))
+    is_sorted = bool((order == np.arange(len(order))).all())
+
+    previous = _read_current(path)
+    generation = f"g{(previous or {}).get('generation', 0) + 1:06d}"
+    directory = os.path.join(path, generation)
+    os.makedirs(directory, exist_ok=True)
+
+    columns = []
+    for i, name in enumerate(results.columns):
+        values, meta = _encode(results[name])
+        np.save(os.path.join(directory, f"{i:03d}.npy"), values if is_sorted else values[order])
+        columns.append({"name": str(name), "file": f"{i:03d}.npy", **meta})
+
+    sorted_codes = key_codes if is_sorted else key_codes[order]
+    bounds = np.searchsorted(sorted_codes, np.arange(len(keys) + 1))
+    sorted_dates = dates if is_sorted else dates[order]
+    with open(os.path.join(directory, INDEX_FILE), mode="w", encoding="utf-8") as file:
+        json.dump({
+            "rows": len(results),
+            "columns": columns,
+            "tickers": {str(t): [int(bounds[i]), int(bounds[i + 1])] for i, t in enumerate(keys)},
+            "min_date": str(sorted_dates.min()) if len(sorted_dates) else None,
+            "max_date": str(sorted_dates.max()) if len(sorted_dates) else None,
+        }, file)
+
+    # Bascule sur la nouvelle génération (remplacement atomique du pointeur)
+    tmp = os.path.join(path, CURRENT_FILE + ".tmp")
+    with open(tmp, mode="w", encoding="utf-8") as file:
+        json.dump({"generation": int(generation[1:]), "directory": generation}, file)
+    os.replace(tmp, os.path.join(path, CURRENT_FILE))
+
+    for entry in os.listdir(path):
+        if entry != generation and entry.startswith("g") and os.path.isdir(os.path.join(path, entry)):
+            shutil.rmtree(os.path.join(path, entry), ignore_errors=True)
+    return directory
+
+
+def _read_current(path: str) -> Optional[dict]:
+    current = os.path.join(path, CURRENT_FILE)
+    if not os.path.exists(current):
+        return None
+    with open(current, mode="r", encoding="utf-8") as file:
+        return json.load(file)
+
+
+class ResultsStore:
+    """
+    Résultats enregistrés par `write_results_store`, ouverts en lecture seule (mémoire mappée).
+    """
+    def __init__(self, directory: str, index: dict, arrays: Dict[str, np.ndarray]):
+        self.directory = directory
+        self.rows = index["rows"]
+        self.columns = [col["name"] for col in index["columns"]]
+        self.ranges = {ticker: tuple(bounds) for ticker, bounds in index["tickers"].items()}
+        self.min_date = pd.Timestamp(index["min_date"]) if index["min_date"] else None
+        self.max_date = pd.Timestamp(index["max_date"]) if index["max_date"] else None
+        self._dtypes = {
+            col["name"]: pd.CategoricalDtype(col["categories"])
+            for col in index["columns"] if col["kind"] == "category"
+        }
+        self._arrays = arrays
+
+    @classmethod
+    def exists(cls, path: str) -> bool:
+        return _read_current(path) is not None
+
+    @classmethod
+    def open(cls, path: str) -> "ResultsStore":
+        """
+        Ouvre la génération courante du répertoire `path` ; les colonnes ne sont lues qu'à l'accès.
+        """
+        current = _read_current(path)
+        if current is None:
+            raise FileNotFoundError(f"Aucun stockage de résultats dans {path}")
+        directory = os.path.join(path, current["directory"])
+        with open(os.path.join(directory, INDEX_FILE), mode="r", encoding="utf-8") as file:
+            index = json.load(file)
+        arrays = {
+            col["name"]: np.load(os.path.join(directory, col["file"]), mmap_mode="r")
+            for col in index["columns"]
+        }
+        return cls(directory, index, arrays)
+
+    @property
+    def tickers(self) -> List[str]:
+        return list(self.ranges)
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def _row_ranges(self, tickers, start, end) -> List[Tuple[int, int]]:
+        """
+        Plages de lignes [début, fin) des tickers demandés, restreintes à la période par recherche dichotomique
+        sur les dates (triées à l'intérieur de chaque ticker). Les plages contiguës sont fusionnées.
+        """
+        if tickers is None:
+            bounds = sorted(self.ranges.values())
+        else:
+            bounds = sorted(self.ranges[str(t)] for t in tickers if str(t) in self.ranges)
+
+        dates = self._arrays[DATE_COLUMN]
+        ranges = []
+        for first, last in bounds:
+            if start is not None:
+                first += int(np.searchsorted(dates[first:last], np.datetime64(pd.Timestamp(start), "ns")))
+            if end is not None:
+                last = first + int(np.searchsorted(dates[first:last], np.datetime64(pd.Timestamp(end), "ns"),
+                                                   side="right"))
+            if first >= last:
+                continue
+            if ranges and ranges[-1][1] == first:
+                ranges[-1] = (ranges[-1][0], last)
+            else:
+                ranges.append((first, last))
+        return ranges
+
+    def _column(self, name: str, ranges: List[Tuple[int, int]]):
+        array = self._arrays[name]
+        if len(ranges) == 1:
+            values = array[ranges[0][0]:ranges[0][1]]  # vue sur le fichier mappé
+        elif ranges:
+            values = np.concatenate([array[first:last] for first, last in ranges])
+        else:
+            values = array[:0]
+        if name in self._dtypes:
+            return pd.Categorical.from_codes(values, dtype=self._dtypes[name], validate=False)
+        return values
+
+    def frame(self, tickers: Optional[List[str]] = None, start=None, end=None,
+              columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        Résultats restreints aux tickers et à la période demandés (bornes incluses), triés par (Ticker, Date).
+        Une sélection contiguë (un ticker, ou tous les tickers sans filtre de date) est une vue sans copie ;
+        sinon, seules les lignes retenues sont copiées.
+        """
+        ranges = self._row_ranges(tickers, start, end)
+        names = columns or self.columns
+        return pd.DataFrame({name: self._column(name, ranges) for name in names}, copy=False)
@@ -1,8 +1,9 @@
 import os
+import subprocess
+import sys
 
 APP_ENTRY_POINT = 'main.py'
 
-dir_path = os.path.dirname(__file__)
+dir_path = os.path.dirname(os.path.abspath(__file__))
 path = os.path.join(dir_path, APP_ENTRY_POINT)
-os.system(f"streamlit run {path}")
-
+sys.exit(subprocess.run([sys.executable, "-m", "streamlit", "run", path]).returncode)
@@ -0,0 +1,236 @@
+import multiprocessing
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Iterable, List, Optional
+
+from instrumentation import measure
+
+# Planificateur d'étapes du pipeline (graphe orienté acyclique).
+# Chaque étape déclare les artefacts qu'elle lit (`inputs`) et produit (`outputs`) : les dépendances
+# s'en déduisent, et les étapes indépendantes sont exécutées en parallèle (pool de threads, ou de
+# processus pour les fonctions picklables).
+#
+# Artefacts :
+#   - produits par une étape : nom logique (ex. "etl:sqlite", "model:results")
+#   - sources : chemins de fichiers, datés par leur mtime
+# Les étapes "persistantes" (écriture sur disque) laissent un fichier témoin dans `stamp_dir` après succès,
+# contenant la signature de la configuration. Elles sont sautées si leurs fichiers de sortie existent
+# et que le témoin est plus récent que toutes leurs entrées (avec la même signature).
+# Les étapes "en mémoire" ne sont exécutées que si une étape exécutée (ou une cible) a besoin de leur résultat.
+
+RUN = "run"
+SKIP = "skip"
+EXCLUDED = "excluded"
+
+
+class Stage:
+    def __init__(self, name: str, func: Callable, inputs: Iterable[str] = (), outputs: Iterable[str] = (),
+                 files: Iterable[str] = (), persistent: bool = False, pool: str = "thread"):
+        """
+        :param func: fonction sans argument (picklable si `pool="process"`)
+        :param files: fichiers écrits par l'étape, qui doivent exister pour qu'elle soit sautée
+        :param persistent: l'étape écrit sur disque (témoin d'exécution, saut si à jour)
+        :param pool: "thread" ou "process"
+        """
+        self.name = name
+        self.func = func
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.files = list(files)
+        self.persistent = persistent
+        self.pool = pool
+
+
+class Scheduler:
+    def __init__(self, stages: List[Stage], stamp_dir: str, signature: str = "", workers: Optional[int] = None):
+        self.stages = {stage.name: stage for stage in stages}
+        self.stamp_dir = stamp_dir
+        self.signature = signature
+        self.workers = workers or os.cpu_count() or 1
+        self.producers = {output: stage.name for stage in stages for output in stage.outputs}
+        self.order = self._topological_order()
+        self.durations: Dict[str, float] = {}
+
+    def dependencies(self, name: str) -> List[str]:
+        return [self.producers[i] for i in self.stages[name].inputs if i in self.producers]
+
+    def _topological_order(self) -> List[str]:
+        order, visiting, visited = [], set(), set()
+
+        def visit(name):
+            if name in visited:
+                return
+            if name in visiting:
+                raise ValueError(f"Cycle de dépendances au niveau de l'étape {name}")
+            visiting.add(name)
+            for dependency in self.dependencies(name):
+                visit(dependency)
+            visiting.discard(name)
+            visited.add(name)
+            order.append(name)
+
+        for name in self.stages:
+            visit(name)
+        return order
+
+    def _stamp_path(self, name: str) -> str:
+        return os.path.join(self.stamp_dir, f"{name}.stamp")
+
+    def _stamp_time(self, name: str) -> Optional[float]:
+        """
+        Date du témoin d'exécution, ou None s'il est absent ou d'une autre configuration.
+        """
+        path = self._stamp_path(name)
+        if not os.path.exists(path):
+            return None
+        with open(path, mode="r", encoding="utf-8") as file:
+            if file.read() != self.signature:
+                return None
+        return os.path.getmtime(path)
+
+    def plan(self, selected: Optional[Iterable[str]] = None, targets: Iterable[str] = (),
+             force: bool = False) -> Dict[str, str]:
+        """
+        Décide, pour chaque étape, si elle est exécutée (run), sautée car à jour (skip)
+        ou exclue de la sélection (excluded).
+        :param selected: étapes sélectionnées (toutes si None) ; les autres ne sont jamais exécutées
+        :param targets: artefacts en mémoire dont l'appelant a besoin (leurs producteurs sont exécutés)
+        :param force: exécute toutes les étapes sélectionnées sans tenir compte des témoins
+        """
+        selected = set(self.stages if selected is None else selected)
+        times: Dict[str, float] = {}
+        decision: Dict[str, str] = {}
+
+        # Passe avant : datation des artefacts et décision des étapes persistantes
+        # (un artefact qui va être réécrit est daté +inf : ses consommateurs sont à refaire)
+        for name in self.order:
+            stage = self.stages[name]
+            input_time = max([self._artifact_time(i, times) for i in stage.inputs], default=0.0)
+            if not stage.persistent:
+                decision[name] = EXCLUDED if name not in selected else SKIP
+                for output in stage.outputs:
+                    times[output] = input_time
+                continue
+
+            stamp = self._stamp_time(name)
+            stale = (force or stamp is None or input_time > stamp
+                     or not all(os.path.exists(path) for path in stage.files))
+            decision[name] = EXCLUDED if name not in selected else (RUN if stale else SKIP)
+            for output in stage.outputs:
+                times[output] = float("inf") if decision[name] == RUN else (stamp or 0.0)
+
+        # Passe arrière : étapes en mémoire nécessaires à une étape exécutée ou à une cible
+        needed = {self.producers[t] for t in targets if t in self.producers}
+        for name in reversed(self.order):
+            if decision[name] == RUN or name in needed:
+                for dependency in self.dependencies(name):
+                    if not self.stages[dependency].persistent:
+                        needed.add(dependency)
+        for name in needed:
+            if not self.stages[name].persistent:
+                if decision[name] == EXCLUDED:
+                    raise ValueError(f"L'étape {name} est nécessaire mais n'est pas sélectionnée")
+                decision[name] = RUN
+        return decision
+
+    def _artifact_time(self, artifact: str, times: Dict[str, float]) -> float:
+        if artifact in times:
+            return times[artifact]
+        if os.path.exists(artifact):
+            return os.path.getmtime(artifact)
+        return 0.0
+
+    def run(self, selected: Optional[Iterable[str]] = None, targets: Iterable[str] = (),
+            force: bool = False) -> Dict[str, str]:
+        """
+        Exécute les étapes planifiées : une étape démarre dès que ses dépendances sont terminées,
+        dans la limite de `workers` étapes simultanées. Affiche le chemin critique en fin d'exécution.
+        """
+        decision = self.plan(selected, targets, force)
+        to_run = [name for name in self.order if decision[name] == RUN]
+        skipped = [name for name in self.order if decision[name] == SKIP]
+        fresh = [name for name in skipped if self.stages[name].persistent]
+        print(f"Planification : {len(to_run)} étape(s) à exécuter, {len(fresh)} à jour"
+              + (f" ({', '.join(fresh)})" if fresh else "")
+              + f", {len(skipped) - len(fresh)} non nécessaire(s)")
+
+        os.makedirs(self.stamp_dir, exist_ok=True)
+        self.durations = {}
+        with measure("scheduler.run") as record:
+            self._execute(to_run)
+            path, length = self.critical_path()
+            record["rows_out"] = len(to_run)
+            record["critical_path"] = path
+            record["critical_path_s"] = round(length, 4)
+            record["serial_s"] = round(sum(self.durations.values()), 4)
+            record["skipped"] = skipped
+
+        print(f"Chemin critique : {' → '.join(path) or '-'} ({length:.2f} s ; "
+              f"somme des étapes {sum(self.durations.values()):.2f} s, {self.workers} worker(s))")
+        return decision
+
+    def _execute(self, to_run: List[str]) -> None:
+        pending = list(to_run)
+        done = {name for name in self.stages if name not in to_run}
+        running, started = {}, {}
+
+        threads = ThreadPoolExecutor(max_workers=self.workers)
+        processes = None
+        try:
+            while pending or running:
+                for name in [n for n in pending if all(d in done for d in self.dependencies(n))]:
+                    if len(running) >= self.workers:
+                        break
+                    stage = self.stages[name]
+                    if stage.pool == "process":
+                        # "spawn" : pas de fork d'un processus dont d'autres threads exécutent des étapes
+                        processes = processes or ProcessPoolExecutor(
+                            max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+                        executor = processes
+                    else:
+                        executor = threads
+                    if stage.persistent and os.path.exists(self._stamp_path(name)):
+                        os.remove(self._stamp_path(name))
+                    pending.remove(name)
+                    started[name] = time.perf_counter()
+                    running[executor.submit(stage.func)] = name
+
+                if not running:
+                    raise RuntimeError(f"Étapes bloquées (dépendances non exécutées) : {pending}")
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    name = running.pop(future)
+                    self.durations[name] = time.perf_counter() - started[name]
+                    future.result()  # propage l'erreur de l'étape
+                    if self.stages[name].persistent:
+                        with open(self._stamp_path(name), mode="w", encoding="utf-8") as file:
+                            file.write(self.signature)
+                    done.add(name)
+        finally:
+            threads.shutdown(wait=True, cancel_futures=True)
+            if processes is not None:
+                processes.shutdown(wait=True, cancel_futures=True)
+
+    def critical_path(self):
+        """
+        Plus longue chaîne de dépendances parmi les étapes exécutées (durée cumulée) :
+        borne inférieure du temps total, quel que soit le nombre de workers.
+        """
+        finish, previous = {}, {}
+        for name in self.order:
+            if name not in self.durations:
+                continue
+            before = [d for d in self.dependencies(name) if d in finish]
+            best = max(before, key=lambda d: finish[d], default=None)
+            finish[name] = self.durations[name] + (finish[best] if best else 0.0)
+            previous[name] = best
+
+        if not finish:
+            return [], 0.0
+        name = max(finish, key=finish.get)
+        length, path = finish[name], []
+        while name is not None:
+            path.append(name)
+            name = previous[name]
+        return path[::-1], length
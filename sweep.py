@@ -0,0 +1,218 @@
+import copy
+import itertools
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from helpers_export import dataframes_to_excel
+from instrumentation import export_run_log, measure
+from model import Model
+from pipeline import App, _get_parquet_path, _get_paths, run_pipeline
+from results_store import ResultsStore, write_results_store
+
+# Balayage de paramètres : plusieurs variantes de configuration évaluées sur un seul chargement des données.
+# Les données sont chargées depuis la base (Repository) et jointes une seule fois, puis enregistrées en colonnes
+# (results_store.py). Chaque processus du pool ouvre ces colonnes en mémoire mappée (pages partagées,
+# aucun DataFrame sérialisé entre processus), applique sa variante et exécute Model.compute() / process_pivots().
+# Seules les feuilles de synthèse (régressions, pivots) reviennent au processus principal,
+# qui les rassemble dans un classeur comparatif (une ligne par variante et par variable / clé).
+#
+# Une variante est un dictionnaire de surcharges de la configuration, en clés pointées :
+#   {"name": "vol_60", "model_parameters.volatility_window": 60, "start_date": "2022-01-01"}
+# Clé propre au balayage : `sector_groups` regroupe des secteurs ({groupe: [secteur, ...]}) avant le calcul.
+
+SWEEP_KEYS = ["sector_groups"]
+BASE_VARIANT = "base"
+
+# Configuration et colonnes ouvertes une fois par processus (cf. _init_worker)
+_CONFIG: Optional[dict] = None
+_STORE: Optional[ResultsStore] = None
+
+
+def apply_overrides(config: dict, overrides: dict) -> dict:
+    """
+    Copie de la configuration avec les surcharges d'une variante (clés pointées, `name` ignoré).
+    Une clé absente de la configuration lève une ValueError (faute de frappe dans le fichier de variantes).
+    """
+    config = copy.deepcopy(config)
+    for key, value in overrides.items():
+        if key == "name":
+            continue
+        if key in SWEEP_KEYS:
+            config[key] = value
+            continue
+        *parents, last = key.split(".")
+        node = config
+        for part in parents:
+            if not isinstance(node.get(part), dict):
+                raise ValueError(f"Paramètre inconnu dans la variante : {key}")
+            node = node[part]
+        if last not in node:
+            raise ValueError(f"Paramètre inconnu dans la variante : {key}")
+        node[last] = value
+    return config
+
+
+def _variant_name(overrides: dict) -> str:
+    if "name" in overrides:
+        return str(overrides["name"])
+    return ", ".join(f"{key.split('.')[-1]}={value}" for key, value in overrides.items()) or BASE_VARIANT
+
+
+def build_variants(config: dict, params: dict) -> List[dict]:
+    """
+    Variantes du balayage : la configuration de base, les variantes explicites (`variants`)
+    puis le produit cartésien de la grille (`grid` : clé pointée → liste de valeurs).
+    Chaque variante est validée sur la configuration ; les noms en double sont numérotés.
+    """
+    variants = [{"name": BASE_VARIANT}] + list(params.get("variants") or [])
+    grid = params.get("grid") or {}
+    for values in itertools.product(*grid.values()):
+        variants.append(dict(zip(grid.keys(), values)))
+
+    named, seen = [], {}
+    for overrides in variants:
+        apply_overrides(config, overrides)
+        name = _variant_name(overrides)
+        seen[name] = seen.get(name, 0) + 1
+        if seen[name] > 1:
+            name = f"{name} ({seen[name]})"
+        named.append({**overrides, "name": name})
+    return named
+
+
+def regroup_sectors(sectors: pd.Series, groups: Dict[str, List[str]]) -> pd.Series:
+    """
+    Remplace chaque secteur par son groupe ; les secteurs hors groupe sont conservés.
+    """
+    mapping = {str(sector): group for group, members in groups.items() for sector in members}
+    return sectors.astype(str).map(lambda sector: mapping.get(sector, sector)).astype("category")
+
+
+def _init_worker(store_path: str, config: dict) -> None:
+    global _CONFIG, _STORE
+    _CONFIG = config
+    _STORE = ResultsStore.open(store_path)
+
+
+def _run_variant(overrides: dict) -> dict:
+    """
+    Évalue une variante dans le processus courant et retourne ses feuilles de synthèse.
+    Le calcul incrémental (qui écrit dans la base) et les corrélations glissantes (non comparées) sont désactivés.
+    """
+    started = time.perf_counter()
+    config = apply_overrides(_CONFIG, overrides)
+    config["model_parameters"]["incremental"] = False
+    config["correlation_parameters"]["enabled"] = False
+
+    results = _STORE.frame(start=config.get("start_date"), end=config.get("end_date"))
+    if config.get("sector_groups"):
+        results["Sector"] = regroup_sectors(results["Sector"], config["sector_groups"])
+
+    model = Model(config, repo=None)
+    model.results = results
+    model.compute()
+    model.process_pivots()
+
+    regression = model.sheets_pivots["regression"]
+    regression = regression[regression["Coefficient"].notna()].rename(columns={" ": "Variable"}).set_index("Variable")
+    sheets = {
+        "regression": regression,
+        "regression_by_ticker": model.sheets_pivots["regression_by_ticker"],
+        **{name: model.sheets_pivots[name] for name in model.sheets_pivots.specs},
+    }
+    return {
+        "name": overrides["name"],
+        "overrides": {key: value for key, value in overrides.items() if key != "name"},
+        "rows": len(model.results),
+        "r_squared": float(regression.loc["R-squared", "Coefficient"]),
+        "wall_s": round(time.perf_counter() - started, 4),
+        "sheets": sheets,
+    }
+
+
+def _flat(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Index remis en colonnes et en-têtes multi-niveaux aplatis (ex. ("Return", "Banque") → "Return_Banque").
+    """
+    df = df.reset_index()
+    if isinstance(df.columns, pd.MultiIndex):
+        df.columns = ["_".join(str(part) for part in col if str(part)) for col in df.columns]
+    return df
+
+
+def compare(outcomes: List[dict]) -> Dict[str, pd.DataFrame]:
+    """
+    Classeur comparatif : une feuille `variants` (surcharges, lignes, R², durée) puis, pour chaque feuille
+    de synthèse, les tables de toutes les variantes empilées (index remis en colonnes, première colonne : Variant).
+    Les index des pivots peuvent différer d'une variante à l'autre (ex. regroupement par date) :
+    les colonnes absentes d'une variante restent vides.
+    """
+    sheets = {"variants": pd.DataFrame({
+        "Variant": [o["name"] for o in outcomes],
+        "Overrides": [json.dumps(o["overrides"], ensure_ascii=False, default=str) for o in outcomes],
+        "Rows": [o["rows"] for o in outcomes],
+        "R-squared": [o["r_squared"] for o in outcomes],
+        "wall_s": [o["wall_s"] for o in outcomes],
+    })}
+    names = list(dict.fromkeys(name for o in outcomes for name in o["sheets"]))
+    for name in names:
+        frames = [_flat(o["sheets"][name]).assign(Variant=o["name"]) for o in outcomes if name in o["sheets"]]
+        frame = pd.concat(frames, ignore_index=True)
+        sheets[f"sweep_{name}"[:31]] = frame[["Variant"] + [col for col in frame.columns if col != "Variant"]]
+    return sheets
+
+
+def run_sweep(config: dict, params: Optional[dict] = None, workers: Optional[int] = None) -> Dict[str, pd.DataFrame]:
+    """
+    Exécute le balayage (`sweep_parameters`, ou `params` s'il est fourni) et écrit le classeur comparatif
+    dans `output_dir/<output_file>`. L'ETL est exécuté au préalable s'il est activé dans `run_mode`
+    (étapes sautées si la base est à jour). Retourne les feuilles du classeur.
+    """
+    params = {**config["sweep_parameters"], **(params or {})}
+    variants = build_variants(config, params)
+    workers = min(workers or params["workers"] or os.cpu_count() or 1, len(variants))
+    output_dir = config["file_parameters"]["output_dir"]
+    store_path = os.path.join(output_dir, params["input_store"])
+
+    if config["run_mode"]["run_etl"]:
+        run_pipeline(config, ["etl"], start_run=False)
+
+    # Chargement et jointure uniques, enregistrés en colonnes pour les processus de calcul
+    with measure("sweep.load") as record:
+        _, _, db_path, final_excel = _get_paths(config)
+        app = App(config, db_path, final_excel, _get_parquet_path(config))
+        app.load_data()
+        app.model.join()
+        write_results_store(app.model.results, store_path)
+        record["rows_out"] = len(app.model.results)
+        del app
+
+    print(f"Balayage : {len(variants)} variante(s), {workers} processus")
+    with measure("sweep.compute") as record:
+        if workers > 1:
+            # "spawn" comme helpers_plot.py : pas de fork d'un processus où pandas / SQLAlchemy
+            # (et éventuellement des threads du planificateur) sont déjà chargés
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(store_path, config),
+                                     mp_context=multiprocessing.get_context("spawn")) as executor:
+                outcomes = list(executor.map(_run_variant, variants))
+        else:
+            _init_worker(store_path, config)
+            outcomes = [_run_variant(variant) for variant in variants]
+        record["rows_out"] = len(outcomes)
+        record["serial_s"] = round(sum(o["wall_s"] for o in outcomes), 4)
+
+    sheets = compare(outcomes)
+    path = os.path.join(output_dir, params["output_file"].format(config["file_parameters"]["version"]))
+    dataframes_to_excel(sheets, path, max_rows=config["export_parameters"]["excel_max_rows"],
+                        oversized_format=config["export_parameters"]["oversized_format"])
+    print(sheets["variants"].to_string(index=False))
+    print(f"Comparaison des variantes → {path}")
+
+    export_run_log(os.path.join(output_dir, config["file_parameters"]["run_log"]))
+    return sheets
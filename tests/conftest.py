@@ -0,0 +1,44 @@
+import copy
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# Les modules du projet sont à la racine du dépôt (pas de paquet installable)
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from helpers_serialize import get_serialized_data  # noqa: E402
+
+
+@pytest.fixture
+def config() -> dict:
+    """
+    Configuration du dépôt (config.yaml), copiée pour pouvoir être modifiée par chaque test.
+    """
+    return copy.deepcopy(get_serialized_data(os.path.join(ROOT_DIR, "config.yaml")))
+
+
+@pytest.fixture
+def joined_results() -> pd.DataFrame:
+    """
+    Résultats joints synthétiques (avant calcul des indicateurs) : 4 tickers × 120 séances,
+    avec des variations macro manquantes pour exercer les remplacements.
+    """
+    rng = np.random.default_rng(0)
+    tickers, dates = ["AAA.PA", "BBB.PA", "CCC.PA", "DDD.PA"], pd.bdate_range("2023-01-02", periods=120)
+    n = len(tickers) * len(dates)
+
+    delta = rng.normal(0, 0.01, n)
+    delta[rng.choice(n, size=20, replace=False)] = np.nan
+    return pd.DataFrame({
+        "Date": np.tile(dates.to_numpy(), len(tickers)),
+        "Ticker": pd.Categorical(np.repeat(tickers, len(dates))),
+        "Adj Close": 100 * np.exp(np.cumsum(rng.normal(0, 0.02, n))),
+        "Volume": rng.integers(1_000, 100_000, n).astype("int64"),
+        "Value": rng.normal(3, 0.1, n),
+        "Delta_ESTR": delta,
+        "Sector": pd.Categorical(np.repeat(["Banque", "Banque", "Luxe", "Energie"], len(dates))),
+    })
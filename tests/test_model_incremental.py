@@ -0,0 +1,39 @@
+import numpy as np
+import pandas as pd
+
+from model import MODEL_STATE_COLUMNS, Model
+
+
+def _compute_full(config: dict, results: pd.DataFrame) -> pd.DataFrame:
+    model = Model(config, repo=None)
+    model.results = results.copy()
+    model._compute_indicators()
+    return model.results
+
+
+def test_incremental_rows_match_full_recompute(config, joined_results):
+    window = config["model_parameters"]["volatility_window"]
+    split = joined_results["Date"].sort_values().unique()[60]
+
+    full = _compute_full(config, joined_results)
+    history = _compute_full(config, joined_results[joined_results["Date"] <= split])
+    state = history.groupby("Ticker", observed=True).tail(window)[MODEL_STATE_COLUMNS]
+
+    new_rows = Model._compute_new_rows(state, joined_results[joined_results["Date"] > split], window)
+    new_rows = new_rows.sort_values(["Ticker", "Date"]).reset_index(drop=True)
+    expected = full[full["Date"] > split].sort_values(["Ticker", "Date"]).reset_index(drop=True)
+
+    assert len(new_rows) == len(expected)
+    np.testing.assert_array_equal(new_rows["Date"].to_numpy(), expected["Date"].to_numpy())
+    for col in ["Return", "Volatility", "Delta_ESTR"]:
+        np.testing.assert_allclose(new_rows[col].to_numpy(dtype=float), expected[col].to_numpy(dtype=float),
+                                   rtol=1e-10, err_msg=col)
+
+
+def test_volatility_forward_fill_stays_within_ticker(config, joined_results):
+    window = config["model_parameters"]["volatility_window"]
+    full = _compute_full(config, joined_results)
+
+    # Les premières séances de chaque ticker n'ont pas de volatilité (pas de report depuis le ticker précédent)
+    first_rows = full.groupby("Ticker", observed=True).head(window - 1)
+    assert first_rows["Volatility"].isna().all()
@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from helpers_numeric import group_starts, grouped_ols, grouped_rolling_ols, grouped_rolling_std
+from model import Model
+
+
+def _lstsq(y: np.ndarray, X: np.ndarray):
+    """
+    Régression de référence (constante ajoutée) : coefficients et R².
+    """
+    design = np.column_stack([np.ones(len(y)), X])
+    beta = np.linalg.lstsq(design, y, rcond=None)[0]
+    residuals = y - design @ beta
+    return beta, 1 - residuals @ residuals / ((y - y.mean()) @ (y - y.mean()))
+
+
+def _computed(config: dict, results: pd.DataFrame, engine: str) -> pd.DataFrame:
+    config["model_parameters"]["engine"] = engine
+    model = Model(config, repo=None)
+    model.results = results.copy()
+    model._compute_indicators()
+    return model.results
+
+
+def test_numpy_engine_matches_pandas_engine(config, joined_results):
+    expected = _computed(config, joined_results, "pandas")
+    actual = _computed(config, joined_results, "numpy")
+
+    np.testing.assert_array_equal(actual["Date"].to_numpy(), expected["Date"].to_numpy())
+    for col in ["Return", "Delta_ESTR", "Volatility"]:
+        np.testing.assert_allclose(actual[col].to_numpy(dtype=float), expected[col].to_numpy(dtype=float),
+                                   rtol=1e-8, atol=1e-12, err_msg=col)
+
+
+@pytest.mark.parametrize("window", [2, 5, 20])
+def test_grouped_rolling_std_matches_pandas(window):
+    rng = np.random.default_rng(1)
+    keys = np.repeat(["A", "B", "C"], [30, 7, 50])
+    values = rng.normal(0, 0.02, len(keys))
+    values[[3, 40, 41]] = np.nan
+
+    expected = pd.Series(values).groupby(keys).rolling(window).std().reset_index(0, drop=True).sort_index()
+    actual = grouped_rolling_std(values, group_starts(keys), window)
+    np.testing.assert_allclose(actual, expected.to_numpy(), rtol=1e-8, atol=1e-12)
+
+
+def test_grouped_ols_matches_per_ticker_fit(joined_results):
+    df = joined_results.sort_values(["Ticker", "Date"], kind="stable")
+    y = df["Adj Close"].pct_change().to_numpy()
+    X = df[["Delta_ESTR", "Value"]].to_numpy(dtype=float)
+    keys = df["Ticker"].to_numpy()
+
+    ols = grouped_ols(y, X, keys)
+    for i, ticker in enumerate(ols["keys"]):
+        rows = (keys == ticker) & np.isfinite(y) & np.isfinite(X).all(axis=1)
+        beta, r_squared = _lstsq(y[rows], X[rows])
+        np.testing.assert_allclose(ols["coef"][i], beta, rtol=1e-7, atol=1e-10)
+        assert ols["r_squared"][i] == pytest.approx(r_squared, rel=1e-7, abs=1e-10)
+        assert ols["nobs"][i] == rows.sum()
+
+
+def test_grouped_rolling_ols_matches_window_fits(joined_results):
+    window = 30
+    df = joined_results.sort_values(["Ticker", "Date"], kind="stable").reset_index(drop=True)
+    y = df["Adj Close"].pct_change().to_numpy()
+    X = df[["Delta_ESTR", "Value"]].to_numpy(dtype=float)
+    keys = df["Ticker"].to_numpy()
+
+    rolling = grouped_rolling_ols(y, X, keys, window)
+    valid = np.isfinite(y) & np.isfinite(X).all(axis=1)
+    checked = 0
+    for row in np.flatnonzero(np.isfinite(rolling["r_squared"]))[::17]:
+        rows = np.flatnonzero((keys == keys[row]) & valid & (np.arange(len(y)) <= row))[-window:]
+        beta, r_squared = _lstsq(y[rows], X[rows])
+        np.testing.assert_allclose(rolling["coef"][row], beta, rtol=1e-6, atol=1e-9)
+        assert rolling["r_squared"][row] == pytest.approx(r_squared, rel=1e-6, abs=1e-9)
+        checked += 1
+    assert checked > 0
@@ -0,0 +1,27 @@
+import numpy as np
+import pandas as pd
+
+from quality import superseded_keys, validate_stock
+
+
+def test_chunked_validation_keeps_the_same_rows_as_a_full_load():
+    df = pd.DataFrame({
+        "Ticker": pd.Categorical(["A", "A", "B", "A", "B", "A", "B"]),
+        "Date": pd.to_datetime(["2024-01-01", "2024-01-02", "2024-01-01", "2024-01-01",
+                                "2024-01-02", "2024-01-03", "2024-01-01"]),
+        "Adj Close": [10.0, 10.5, 20.0, 11.0, 20.5, 10.8, 19.0],
+        "Volume": [100, 100, 200, 100, 200, 100, 200],
+    })
+    full, _, full_counts = validate_stock(df, z_threshold=3.0)
+
+    superseded = superseded_keys(df["Ticker"], df["Date"])
+    kept, duplicates = [], 0
+    for chunk in [df.iloc[:3], df.iloc[3:5], df.iloc[5:]]:
+        chunk_kept, _, counts = validate_stock(chunk, 3.0, superseded[chunk.index.to_numpy()])
+        kept.append(chunk_kept)
+        duplicates += counts["stock.duplicate_key"]
+
+    streamed = pd.concat(kept)
+    assert streamed.index.tolist() == full.index.tolist() == [1, 3, 4, 5, 6]
+    assert duplicates == full_counts["stock.duplicate_key"] == 2
+    np.testing.assert_array_equal(streamed["Adj Close"].to_numpy(), full["Adj Close"].to_numpy())
@@ -1,10 +1,13 @@
 import os
-import matplotlib.pyplot as plt
 import pandas as pd
-import seaborn as sns
-import streamlit as st
 
-from helpers_export import dataframes_to_excel
+from aggregates import (
+    build_aggregates, build_all_aggregates, choose_granularity, combine, correlation_from_sums, table_indexes,
+    table_name,
+)
+from helpers_export import dataframes_to_db, dataframes_to_excel, dataframes_to_parquet
+from instrumentation import instrument, read_run_log
+from results_store import ResultsStore, write_results_store
 
 class View:
     def __init__(self, config, repo, model, full_path_output_excel_final):
@@ -12,145 +15,278 @@ class View:
         self.repo = repo
         self.model = model
         self.full_path_output_excel_final = full_path_output_excel_final
+        self.rendered_plots = []
+        self._aggregates = {}
+        self.results_store = None
 
+    @instrument("view.export", rows_in=lambda self: len(self.model.results))
     def export(self) -> None:
-        # Résultat principal (jointure + calculs)
+        # Export Excel, graphiques et persistance sont indépendants (exécutés en parallèle par scheduler.py)
+        self.export_excel()
+        self.export_plots()
+        self.persist()
+
+    @instrument("view.export_excel", rows_in=lambda self: len(self.model.results))
+    def export_excel(self) -> None:
+        """
+        Classeur final : résultat principal (jointure + calculs) et tables croisées (pivots).
+        """
         results = {self.config["files"]["final_sheet"]: self.model.results}
 
         # Tables croisées (pivots)
         print(f"Export columns={list(self.model.sheets_pivots.keys())}")
-        sheets = results | self.model.sheets_pivots
-
-        # Génération du graphique s'il y a la feuille mean_by_sector
+        sheets = {**results, **self.model.sheets_pivots}
+
+        # Export final dans Excel (optionnel)
+        export_params = self.config["export_parameters"]
+        if export_params["to_excel"]:
+            dataframes_to_excel(
+                sheets,
+                self.full_path_output_excel_final,
+                max_rows=export_params["excel_max_rows"],
+                oversized_format=export_params["oversized_format"],
+            )
+            print(f"Export terminé → {self.full_path_output_excel_final}")
+
+    def export_plots(self) -> None:
+        """
+        Graphiques PNG (pool de processus), dont l'histogramme par secteur s'il y a la feuille mean_by_sector.
+        """
+        df_mean = None
         if "mean_by_sector" in self.model.sheets_pivots:
             df_mean = self.model.sheets_pivots["mean_by_sector"].reset_index()
-            self._export_sector_plot(df_mean)
+        self._render_plots(df_mean)
 
-        # Export final dans Excel
-        dataframes_to_excel(sheets, self.full_path_output_excel_final)
-        print(f"Export terminé → {self.full_path_output_excel_final}")
-
-        # Graphiques additionnels
-        self._plot_return_time_series()
-        self._plot_volatility_time_series()
+    def persist(self) -> None:
+        """
+        Persistance des résultats, agrégats et matrices glissantes pour les lectures filtrées (dashboard).
+        """
+        self._persist_results()
+        self._persist_results_store()
+        self._persist_aggregates()
+        self._persist_correlations()
 
-    def _export_sector_plot(self, df_sector):
+    def _persist_results(self) -> None:
         """
-        Crée un histogramme des rendements et volatilités moyens par secteur
-        et l’enregistre en PNG dans le dossier output.
+        Enregistre `model.results` dans la base SQLite et / ou en Parquet (table `final_sheet`)
+        afin que le dashboard puisse relire uniquement les tickers et dates sélectionnés.
+        En mode incrémental, la table SQLite est déjà tenue à jour par le modèle.
         """
-        bar_width = 0.35
-        x = range(len(df_sector))
+        table = self.config["files"]["final_sheet"]
+        storage = self.config["etl_main_parameters"]
+
+        if storage["to_sqlite"] and not self.config["model_parameters"]["incremental"]:
+            dataframes_to_db(
+                {table: self.model.results},
+                db_path=self.repo.db_path,
+                dtypes={table: self.config["data_types"]["stock"]},
+                indexes=self.config["sqlite_indexes"],
+            )
+        if storage["to_parquet"]:
+            dataframes_to_parquet(
+                {table: self.model.results},
+                self.repo.parquet_path,
+                partition_cols=self.config["parquet_partitions"],
+            )
+
+    def results_store_path(self) -> str | None:
+        """
+        Répertoire du stockage en colonnes des résultats (`dashboard_parameters.results_store`), ou None.
+        """
+        directory = self.config["dashboard_parameters"]["results_store"]
+        if not directory:
+            return None
+        return os.path.join(self.config["file_parameters"]["output_dir"], directory)
 
-        fig, ax = plt.subplots(figsize=(10, 6))
-        ax.bar([p - bar_width / 2 for p in x], df_sector["Return"], width=bar_width, label="Return")
-        ax.bar([p + bar_width / 2 for p in x], df_sector["Volatility"], width=bar_width, label="Volatility")
+    @instrument("view.results_store", rows_in=lambda self: len(self.model.results))
+    def _persist_results_store(self) -> None:
+        """
+        Enregistre `model.results` en colonnes .npy (cf. results_store.py), relues en mémoire mappée
+        par toutes les sessions du dashboard.
+        """
+        path = self.results_store_path()
+        if path is None:
+            return
+        directory = write_results_store(self.model.results, path)
+        print(f"Résultats enregistrés en colonnes : {directory}")
 
-        ax.set_xticks(list(x))
-        ax.set_xticklabels(df_sector["Sector"], rotation=45, ha="right")
-        ax.set_ylabel("Values")
-        ax.set_title("Average Return and Volatility by Sector")
-        ax.legend()
+    def open_results_store(self) -> ResultsStore | None:
+        """
+        Ouvre (une fois) le stockage en colonnes des résultats s'il a été écrit, sinon retourne None.
+        """
+        path = self.results_store_path()
+        if self.results_store is None and path is not None and ResultsStore.exists(path):
+            self.results_store = ResultsStore.open(path)
+        return self.results_store
 
-        output_path = os.path.join(self.config["file_parameters"]["output_dir"], "histogram_sector_stats.png")
-        os.makedirs(os.path.dirname(output_path), exist_ok=True)
-        plt.tight_layout()
-        plt.savefig(output_path)
-        plt.close()
-        print(f"Graphique enregistré : {output_path}")
+    @instrument("view.aggregates", rows_in=lambda self: len(self.model.results))
+    def _persist_aggregates(self) -> None:
+        """
+        Matérialise les agrégats journaliers / hebdomadaires / mensuels par ticker et par secteur
+        (cf. aggregates.py) dans la base SQLite et / ou en Parquet, pour le dashboard.
+        Les tables sont recalculées sur l'ensemble des résultats, y compris en mode incrémental.
+        """
+        if not self.config["dashboard_parameters"]["aggregates"]:
+            return
+
+        storage = self.config["etl_main_parameters"]
+        self._aggregates = build_all_aggregates(self.model.results)
+        if storage["to_sqlite"]:
+            dataframes_to_db(self._aggregates, db_path=self.repo.db_path, indexes=table_indexes())
+        if storage["to_parquet"]:
+            dataframes_to_parquet(self._aggregates, self.repo.parquet_path)
+        print(f"Agrégats enregistrés : {', '.join(self._aggregates)}")
+
+    def _persist_correlations(self) -> None:
+        """
+        Enregistre les matrices glissantes du modèle (.npy relus en mémoire mappée, cf. correlation.py)
+        dans `output_dir/<correlation_parameters.output_dir>/<niveau>`.
+        """
+        root = os.path.join(self.config["file_parameters"]["output_dir"],
+                            self.config["correlation_parameters"]["output_dir"])
+        for level, matrices in self.model.correlations.items():
+            matrices.save(os.path.join(root, level))
+            print(f"Matrices glissantes enregistrées : {os.path.join(root, level)}")
 
-    def _plot_return_time_series(self):
+    def get_aggregates(self, level, granularity, keys, start=None, end=None) -> pd.DataFrame:
         """
-        Génère 4 graphiques PNG pour DG.PA, BNP.PA, SAN.PA, CA.PA montrant l’évolution du Return.
+        Retourne les agrégats d'un niveau (ticker / sector) et d'une granularité, restreints aux clés
+        et à la période demandées. Lecture dans la table matérialisée à l'export ; à défaut,
+        les agrégats sont calculés une fois à partir des résultats en mémoire.
         """
-        df = self.model.results.copy()
-        df["Date"] = pd.to_datetime(df["Date"])
-        df.sort_values(["Ticker", "Date"], inplace=True)
+        name = table_name(level, granularity)
+        if self.repo.has_table(name):
+            return self.repo.get_aggregates(level, granularity, keys, start, end)
+
+        if name not in self._aggregates:
+            self._aggregates[name] = build_aggregates(self.model.results, level, granularity)
+        df = self._aggregates[name]
+        mask = df.iloc[:, 0].isin(keys)
+        if start is not None:
+            mask &= df["Date"] >= pd.Timestamp(start)
+        if end is not None:
+            mask &= df["Date"] <= pd.Timestamp(end)
+        return df[mask]
+
+    @instrument("view.render_plots", rows_out=lambda self: len(self.rendered_plots))
+    def _render_plots(self, df_sector=None):
+        """
+        Génère les graphiques PNG (histogramme par secteur, Return de chaque ticker de `model.results`,
+        Volatilité par entreprise) dans un pool de processus (`export_parameters.plot_workers`).
+        Les graphiques dont les données n'ont pas changé depuis le dernier export ne sont pas redessinés.
+        """
+        from helpers_plot import render_plots
 
         output_dir = self.config["file_parameters"]["output_dir"]
         os.makedirs(output_dir, exist_ok=True)
 
-        tickers_to_plot = ["DG.PA", "BNP.PA", "SAN.PA", "CA.PA"]
-
-        for ticker in tickers_to_plot:
-            df_ticker = df[df["Ticker"] == ticker]
-            if df_ticker.empty:
-                print(f"Aucune donnée pour {ticker}")
-                continue
-
-            plt.figure(figsize=(10, 4))
-            plt.plot(df_ticker["Date"], df_ticker["Return"], label=ticker, linewidth=1.2)
-            plt.title(f"Évolution du Return – {ticker}")
-            plt.xlabel("Date")
-            plt.ylabel("Return")
-            plt.grid(True)
-            plt.tight_layout()
-            plt.legend()
-
-            filename = f"return_{ticker.replace('.', '_')}.png"
-            path = os.path.join(output_dir, filename)
-            plt.savefig(path)
-            plt.close()
-
+        jobs = []
+        if df_sector is not None:
+            jobs.append(("sector", os.path.join(output_dir, "histogram_sector_stats.png"), {
+                "sectors": df_sector["Sector"].astype(str).tolist(),
+                "returns": df_sector["Return"].to_numpy(),
+                "volatilities": df_sector["Volatility"].to_numpy(),
+            }))
+        jobs += self._return_plot_jobs(output_dir)
+        jobs.append(self._volatility_plot_job(output_dir))
+
+        self.rendered_plots = render_plots(jobs, output_dir, workers=self.config["export_parameters"]["plot_workers"])
+        for path in self.rendered_plots:
             print(f"Graphique enregistré : {path}")
 
-    def _plot_volatility_time_series(self):
+    def _return_plot_jobs(self, output_dir):
         """
-        Trace l’évolution de la Volatilité par entreprise dans le temps
+        Une tâche de rendu par ticker : évolution du Return.
         """
-        df = self.model.results.dropna(subset=["Volatility"]).copy()
+        df = self.model.results[["Ticker", "Date", "Return"]].copy()
         df["Date"] = pd.to_datetime(df["Date"])
+        df.sort_values(["Ticker", "Date"], inplace=True)
 
-        plt.figure(figsize=(12, 6))
-        sns.lineplot(data=df, x="Date", y="Volatility", hue="Ticker")
-        plt.title("Évolution de la Volatilité par entreprise")
-        plt.xlabel("Date")
-        plt.ylabel("Volatility")
-        plt.legend(title="Ticker", bbox_to_anchor=(1.05, 1), loc='upper left')
-        plt.tight_layout()
+        jobs = []
+        for ticker, df_ticker in df.groupby("Ticker", sort=True, observed=True):
+            filename = f"return_{ticker.replace('.', '_')}.png"
+            jobs.append(("return", os.path.join(output_dir, filename), {
+                "ticker": ticker,
+                "dates": df_ticker["Date"].to_numpy(),
+                "returns": df_ticker["Return"].to_numpy(),
+            }))
+        return jobs
+
+    def _volatility_plot_job(self, output_dir):
+        """
+        Tâche de rendu de l’évolution de la Volatilité par entreprise dans le temps.
+        """
+        df = self.model.results.loc[self.model.results["Volatility"].notna(), ["Date", "Ticker", "Volatility"]].copy()
+        df["Date"] = pd.to_datetime(df["Date"])
+        df.reset_index(drop=True, inplace=True)
+        return "volatility", os.path.join(output_dir, "volatility_time_series.png"), {"df": df}
 
-        path = os.path.join(self.config["file_parameters"]["output_dir"], "volatility_time_series.png")
-        plt.savefig(path)
-        plt.close()
-        print(f"Graphique Volatility enregistré → {path}")
+    def get_filtered_results(self, tickers, start=None, end=None, columns=None) -> pd.DataFrame:
+        """
+        Retourne les résultats restreints aux tickers et à la période demandés.
+        La lecture est faite dans le stockage en colonnes (vue sur les fichiers mappés, sans copie),
+        sinon dans la table des résultats persistés (filtres appliqués en SQL / Parquet) ;
+        à défaut, les résultats en mémoire sont filtrés sans copie intégrale.
+        """
+        if self.results_store is not None:
+            return self.results_store.frame(tickers, start, end, columns)
+        if self.repo.has_table(self.config["files"]["final_sheet"]):
+            return self.repo.get_results(tickers=tickers, start=start, end=end, columns=columns)
+
+        results = self.model.results
+        dates = pd.to_datetime(results["Date"])
+        mask = results["Ticker"].isin(tickers)
+        if start is not None:
+            mask &= dates >= pd.Timestamp(start)
+        if end is not None:
+            mask &= dates <= pd.Timestamp(end)
+        df = results.loc[mask, columns or results.columns].copy()
+        df["Date"] = pd.to_datetime(df["Date"])
+        return df
 
     def display_interactive_dashboard(self):
         """
         Affiche une interface Streamlit avec filtres, graphiques et heatmap
         pour explorer les données par secteur et période.
+        Les graphiques et la heatmap sont construits à partir des agrégats par secteur, à la granularité
+        la plus fine qui reste sous `dashboard_parameters.max_points` points sur la période choisie.
         """
-        df = self.model.results.copy()
-        df["Date"] = pd.to_datetime(df["Date"])
+        import matplotlib.pyplot as plt
+        import seaborn as sns
+        import streamlit as st
 
         st.sidebar.header("Filtres")
 
         secteurs = self.repo.companies_data["Sector"].unique()
         selected_sectors = st.sidebar.multiselect("Secteurs", secteurs, default=list(secteurs))
 
-        min_date = df["Date"].min()
-        max_date = df["Date"].max()
+        if self.results_store is not None:
+            min_date, max_date = self.results_store.min_date, self.results_store.max_date
+        else:
+            min_date = pd.to_datetime(self.model.results["Date"].min())
+            max_date = pd.to_datetime(self.model.results["Date"].max())
         date_range = st.sidebar.date_input("Plage de dates", [min_date, max_date], min_value=min_date,
                                            max_value=max_date)
+        if len(date_range) < 2:
+            st.info("Sélectionner une date de début et une date de fin.")
+            return
 
-        df_filtered = df[
-            (df["Date"] >= pd.to_datetime(date_range[0])) &
-            (df["Date"] <= pd.to_datetime(date_range[1]))
-            ]
-        df_filtered = df_filtered[df_filtered["Sector"].isin(selected_sectors)]
+        granularity = choose_granularity(date_range[0], date_range[1], self.config["dashboard_parameters"]["max_points"])
+        df_agg = self.get_aggregates("sector", granularity, [str(s) for s in selected_sectors],
+                                     date_range[0], date_range[1])
 
         st.subheader("Dashboard interactif")
-        st.dataframe(
-            df_filtered[["Date", "Ticker", "Sector", "Return", "Volatility", "Delta_ESTR"]].reset_index(drop=True))
+        st.caption(f"Granularité : {granularity}")
+        st.dataframe(df_agg[["Date", "Sector", "N", "Return", "Volatility", "Delta_ESTR"]].reset_index(drop=True))
 
-        st.line_chart(df_filtered.set_index("Date")[["Return", "Volatility"]])
+        # Moyennes pondérées par le nombre d'observations, tous secteurs sélectionnés confondus
+        if not df_agg.empty:
+            st.line_chart(combine(df_agg, ["Date"])[["Return", "Volatility"]])
 
-        # Heatmap de corrélation
+        # Heatmap de corrélation (calculée à partir des sommes et produits croisés agrégés)
         st.subheader("Corrélations entre variables")
-        corr_cols = ["Return", "Volatility", "Delta_ESTR"]
-        df_corr = df_filtered[corr_cols].dropna()
-
-        if df_corr.shape[0] >= 2:  # Minimum 2 lignes pour calculer une corrélation
-            corr_matrix = df_corr.corr()
+        if df_agg["N"].sum() >= 2:  # Minimum 2 lignes pour calculer une corrélation
+            corr_matrix = correlation_from_sums(df_agg)
 
             fig, ax = plt.subplots(figsize=(5, 4))
             sns.heatmap(corr_matrix, annot=True, cmap="coolwarm", fmt=".2f", square=True, ax=ax)
@@ -159,3 +295,46 @@ class View:
         else:
             st.info("Pas assez de données pour afficher la heatmap.")
 
+        # Corrélations glissantes entre secteurs, à la date choisie (matrices pré-calculées par le modèle)
+        sector_matrices = self.model.correlations.get("sector")
+        if sector_matrices is not None and "corr" in sector_matrices.matrices:
+            dates = sector_matrices.dates
+            dates = dates[(dates >= pd.Timestamp(date_range[0])) & (dates <= pd.Timestamp(date_range[1]))]
+            selected = {str(sector) for sector in selected_sectors}
+            labels = [label for label in sector_matrices.labels if label in selected]
+            if len(dates) and len(labels) >= 2:
+                st.subheader(f"Corrélations glissantes entre secteurs ({sector_matrices.window} jours)")
+                date = st.select_slider("Date", options=list(dates.date), value=dates[-1].date())
+                corr_matrix = sector_matrices.at(date).loc[labels, labels]
+
+                fig, ax = plt.subplots(figsize=(6, 5))
+                sns.heatmap(corr_matrix, annot=True, cmap="coolwarm", fmt=".2f", square=True, vmin=-1, vmax=1, ax=ax)
+                ax.set_title(f"Corrélations au {date}")
+                st.pyplot(fig)
+
+    def display_performance_panel(self):
+        """
+        Affiche le panneau "Performance" : mesures par étape de la dernière exécution
+        (temps réel, CPU, lignes, mémoire) et évolution des durées sur les exécutions précédentes.
+        """
+        import streamlit as st
+
+        st.subheader("Performance")
+        path = os.path.join(self.config["file_parameters"]["output_dir"], self.config["file_parameters"]["run_log"])
+        records = read_run_log(path)
+        if not records:
+            st.info("Aucun journal d'exécution disponible.")
+            return
+
+        df_log = pd.DataFrame(records)
+        df_last = df_log[df_log["run_id"] == df_log["run_id"].iloc[-1]]
+        st.dataframe(
+            df_last.reindex(columns=["stage", "wall_s", "cpu_s", "rows_in", "rows_out", "rss_delta_mb", "rss_mb",
+                                     "peak_rss_mb", "status"]).reset_index(drop=True))
+        st.bar_chart(df_last.groupby("stage", sort=False)["wall_s"].sum())
+
+        # Durée de chaque étape au fil des exécutions (repère l'étape qui dérive)
+        started = df_log.groupby("run_id")["started_at"].min()
+        history = df_log.pivot_table(index="run_id", columns="stage", values="wall_s", aggfunc="sum")
+        history.index = pd.to_datetime(started.loc[history.index])
+        st.line_chart(history.sort_index())